@@ -0,0 +1,32 @@
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required, verify_jwt_in_request
+
+from models import db, User
+
+
+def is_operator():
+    """Whether the request is authenticated as a user listed in ADMIN_USERNAMES."""
+    operators = current_app.config['ADMIN_USERNAMES']
+    if not operators:
+        return False
+    try:
+        verify_jwt_in_request(optional=True)
+    except Exception:
+        return False
+    identity = get_jwt_identity()
+    if identity is None:
+        return False
+    user = db.session.get(User, int(identity))
+    return user is not None and user.username in operators
+
+
+def operator_required(view):
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not is_operator():
+            return jsonify({'message': 'Operators only'}), 403
+        return view(*args, **kwargs)
+    return wrapper
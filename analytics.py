@@ -0,0 +1,290 @@
+"""Cross-game analytics over game history with NumPy.
+
+History events, and the final property ownership of every finished game,
+are loaded in bulk into column arrays. Each report is a few vectorized
+passes over those columns rather than a series of ORM queries per game.
+The columns are cached in an .npz file (ANALYTICS_CACHE_PATH, default
+instance/analytics.npz) and later runs load only the events added since.
+Run with:
+
+    flask --app main analytics report
+"""
+import json
+import os
+
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import AppGroup
+
+from board import SQUARES
+from events import EVENT_TYPES
+from models import db, GameHistory, Property
+from rent import GROUPS, GROUP_SIZES, MAX_HOUSES, MAX_OWNED, TABLE, UTILITIES
+
+FORMAT_VERSION = 1
+BATCH_SIZE = 50000
+
+CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+EVENT_DTYPES = {
+    'id': np.int64,
+    'game_id': np.int32,
+    'player_id': np.int32,   # -1 for game-level events
+    'action': np.int16,      # code in EVENT_TYPES
+    'amount': np.int32,      # 0 when not set
+    'position': np.int16,    # -1 when not set
+    'created_at': 'datetime64[s]',
+}
+PROPERTY_DTYPES = {
+    'game_id': np.int32,
+    'owner_id': np.int32,    # -1 when unowned
+    'position': np.int16,
+    'houses': np.int16,
+    'is_mortgaged': np.bool_,
+}
+
+GROUP_NAMES = sorted(GROUP_SIZES)
+POSITION_GROUP = np.array([GROUP_NAMES.index(group) if group else -1 for group in GROUPS], dtype=np.int16)
+GROUP_SIZE = np.array([GROUP_SIZES[group] for group in GROUP_NAMES], dtype=np.int16)
+IS_UTILITY = np.isin(np.arange(len(GROUPS)), list(UTILITIES))
+RENTS = np.array(TABLE, dtype=np.int32).reshape(len(GROUPS), MAX_HOUSES + 1, 2, MAX_OWNED + 1)
+
+
+def _empty(dtypes):
+    return {name: np.empty(0, dtype) for name, dtype in dtypes.items()}
+
+
+class HistoryColumns:
+    """Events and finished-game ownership as NumPy columns, grown incrementally."""
+
+    def __init__(self):
+        self.events = _empty(EVENT_DTYPES)
+        self.properties = _empty(PROPERTY_DTYPES)
+        self.last_id = 0
+
+    @classmethod
+    def load(cls, path):
+        """Columns from the cache file, or empty ones if it is missing or stale."""
+        columns = cls()
+        if not os.path.exists(path):
+            return columns
+        try:
+            with np.load(path) as data:
+                if int(data['format_version']) != FORMAT_VERSION:
+                    return columns
+                columns.events = {name: data['events_' + name] for name in EVENT_DTYPES}
+                columns.properties = {name: data['properties_' + name] for name in PROPERTY_DTYPES}
+                columns.last_id = int(data['last_id'])
+        except (OSError, KeyError, ValueError):
+            return cls()
+        return columns
+
+    def save(self, path):
+        arrays = {'events_' + name: values for name, values in self.events.items()}
+        arrays.update({'properties_' + name: values for name, values in self.properties.items()})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            np.savez_compressed(file, format_version=FORMAT_VERSION, last_id=self.last_id, **arrays)
+        os.replace(tmp_path, path)
+
+    def refresh(self, batch_size=BATCH_SIZE):
+        """Append events newer than the cache; returns how many were added."""
+        batches = []
+        while True:
+            rows = db.session.execute(
+                db.select(
+                    GameHistory.id,
+                    GameHistory.game_id,
+                    db.func.coalesce(GameHistory.player_id, -1),
+                    # Raw codes, skipping the name lookup of the Code type
+                    db.type_coerce(GameHistory.action, db.Integer),
+                    db.func.coalesce(GameHistory.amount, 0),
+                    db.func.coalesce(GameHistory.position, -1),
+                    GameHistory.created_at
+                ).where(GameHistory.id > self.last_id)
+                .order_by(GameHistory.id)
+                .limit(batch_size)
+            ).all()
+            db.session.commit()
+            if not rows:
+                break
+            batches.append(_columns(rows, EVENT_DTYPES))
+            self.last_id = rows[-1][0]
+        if not batches:
+            return 0
+
+        new = _concat(batches)
+        self.events = _concat([self.events, new])
+
+        # A finished game's ownership no longer changes, so it is read once
+        ended = np.unique(new['game_id'][new['action'] == CODES['game_ended']])
+        batches = []
+        for start in range(0, len(ended), 500):
+            rows = db.session.execute(
+                db.select(
+                    Property.game_id,
+                    db.func.coalesce(Property.owner_id, -1),
+                    Property.position,
+                    db.func.coalesce(Property.houses, 0),
+                    db.func.coalesce(Property.is_mortgaged, False)
+                ).where(Property.game_id.in_(ended[start:start + 500].tolist()))
+            ).all()
+            if rows:
+                batches.append(_columns(rows, PROPERTY_DTYPES))
+        db.session.commit()
+        self.properties = _concat([self.properties] + batches)
+        return len(new['id'])
+
+
+def _columns(rows, dtypes):
+    return {
+        name: np.array(values, dtype=dtype)
+        for (name, dtype), values in zip(dtypes.items(), zip(*rows))
+    }
+
+
+def _concat(parts):
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def _finished(events):
+    """Game ids and winner player ids (-1 without a winner) of finished games."""
+    ended = events['action'] == CODES['game_ended']
+    return events['game_id'][ended], events['player_id'][ended]
+
+
+def win_rate_by_first_color(columns):
+    """Share of finished games won, by color group of each player's first purchase."""
+    events = columns.events
+    games, winners = _finished(events)
+    buys = (
+        (events['action'] == CODES['property_purchased'])
+        & (events['position'] >= 0)
+        & np.isin(events['game_id'], games)
+    )
+    # Events are in id order, so return_index finds each player's first purchase
+    players, first = np.unique(events['player_id'][buys], return_index=True)
+    groups = POSITION_GROUP[events['position'][buys][first]]
+    won = np.isin(players, winners[winners >= 0])
+
+    known = groups >= 0
+    counts = np.bincount(groups[known], minlength=len(GROUP_NAMES))
+    wins = np.bincount(groups[known], weights=won[known], minlength=len(GROUP_NAMES))
+    return {
+        name: {'players': int(counts[i]), 'wins': int(wins[i]), 'win_rate': round(float(wins[i] / counts[i]), 4)}
+        for i, name in enumerate(GROUP_NAMES) if counts[i]
+    }
+
+
+def game_lengths(columns):
+    """Duration and number of events of finished games."""
+    events = columns.events
+    games, _ = _finished(events)
+    started = events['action'] == CODES['game_started']
+    start_games, first = np.unique(events['game_id'][started], return_index=True)
+    end_games, last = np.unique(games, return_index=True)
+    common, in_start, in_end = np.intersect1d(start_games, end_games, assume_unique=True, return_indices=True)
+    if not len(common):
+        return {'games': 0}
+
+    ended_at = events['created_at'][events['action'] == CODES['game_ended']][last[in_end]]
+    started_at = events['created_at'][started][first[in_start]]
+    seconds = (ended_at - started_at).astype(np.int64)
+    counts = np.bincount(events['game_id'], minlength=int(common.max()) + 1)[common]
+    return {
+        'games': len(common),
+        'mean_seconds': round(float(seconds.mean()), 1),
+        'median_seconds': round(float(np.median(seconds)), 1),
+        'mean_events': round(float(counts.mean()), 1),
+    }
+
+
+def rent_by_square(columns, dice_total=7):
+    """Average rent each square charges at the end of a finished game.
+
+    Rent is due on landing but not recorded as an event, so this is the
+    rent the final ownership and houses would charge, per finished game.
+    """
+    properties = columns.properties
+    games = len(np.unique(_finished(columns.events)[0]))
+    owned = properties['owner_id'] >= 0
+    positions = properties['position'][owned].astype(np.intp)
+    groups = POSITION_GROUP[positions]
+
+    # Properties of the same owner and color group, as rent.holdings counts them
+    keys = properties['owner_id'][owned].astype(np.int64) * len(GROUP_NAMES) + groups
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    held = counts[inverse.ravel()]
+
+    rents = RENTS[
+        positions,
+        np.minimum(properties['houses'][owned], MAX_HOUSES),
+        (held == GROUP_SIZE[groups]).astype(np.intp),
+        np.minimum(held, MAX_OWNED)
+    ]
+    rents = np.where(IS_UTILITY[positions], rents * dice_total, rents)
+    rents[properties['is_mortgaged'][owned]] = 0
+
+    totals = np.bincount(positions, weights=rents, minlength=len(SQUARES))
+    owners = np.bincount(positions, minlength=len(SQUARES))
+    return [
+        {
+            'position': square['position'],
+            'name': square['name'],
+            'mean_rent': round(float(totals[square['position']] / games), 2) if games else 0,
+            'owned_share': round(float(owners[square['position']] / games), 4) if games else 0,
+        }
+        for square in SQUARES if square['price']
+    ]
+
+
+def bankruptcy_causes(columns):
+    """Bankruptcies counted by the bankrupt player's previous event."""
+    events = columns.events
+    order = np.lexsort((events['id'], events['player_id']))
+    players = events['player_id'][order]
+    actions = events['action'][order]
+    found = np.flatnonzero((actions == CODES['declared_bankruptcy']) & (players >= 0))
+    previous = found[(found > 0) & (players[found - 1] == players[found])] - 1
+
+    counts = np.bincount(actions[previous], minlength=len(EVENT_TYPES))
+    causes = {EVENT_TYPES[code]: int(counts[code]) for code in np.argsort(-counts, kind='stable') if counts[code]}
+    if len(found) > len(previous):
+        causes['none'] = len(found) - len(previous)
+    return causes
+
+
+def report(columns):
+    return {
+        'events': len(columns.events['id']),
+        'finished_games': len(np.unique(_finished(columns.events)[0])),
+        'game_length': game_lengths(columns),
+        'win_rate_by_first_color': win_rate_by_first_color(columns),
+        'rent_by_square': rent_by_square(columns),
+        'bankruptcy_causes': bankruptcy_causes(columns),
+    }
+
+
+def load_columns(path=None, rebuild=False):
+    """Columns brought up to date with the database, saving the cache if it changed."""
+    path = path or current_app.config['ANALYTICS_CACHE_PATH'] or os.path.join(
+        current_app.instance_path, 'analytics.npz'
+    )
+    columns = HistoryColumns() if rebuild else HistoryColumns.load(path)
+    if columns.refresh() or rebuild:
+        columns.save(path)
+    return columns
+
+
+analytics_cli = AppGroup('analytics', help='Cross-game analytics over game history.')
+
+
+@analytics_cli.command('report')
+@click.option('--cache', 'path', type=click.Path(dir_okay=False), help='Column cache file (default instance/analytics.npz)')
+@click.option('--rebuild', is_flag=True, help='Reload every event instead of only new ones')
+def analytics_report(path, rebuild):
+    """Print win rates, game lengths, rents and bankruptcy causes as JSON."""
+    columns = load_columns(path, rebuild)
+    click.echo(json.dumps(report(columns), indent=2))
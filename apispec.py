@@ -0,0 +1,43 @@
+import json
+import os
+
+import click
+from flask import current_app, send_file
+from flask.cli import AppGroup
+from flasgger import Swagger
+
+
+def spec_path(app):
+    return app.config.get('APISPEC_PATH') or os.path.join(app.root_path, 'static', 'apispec.json')
+
+
+class PrecompiledSwagger(Swagger):
+    """Swagger UI backed by a spec compiled ahead of time.
+
+    When the compiled spec exists it is sent as a static file, so the route
+    docstrings are never parsed by a running worker. Without it flasgger
+    falls back to building the spec from the docstrings on request.
+    """
+
+    def register_views(self, app):
+        super().register_views(app)
+        path = spec_path(app)
+        if os.path.exists(path):
+            endpoint = self.config.get('endpoint', 'flasgger') + '.' + self.DEFAULT_ENDPOINT
+            app.view_functions[endpoint] = lambda: send_file(
+                path, mimetype='application/json', max_age=3600
+            )
+
+
+spec_cli = AppGroup('spec', help='Manage the precompiled API spec.')
+
+
+@spec_cli.command('build')
+def build_spec():
+    """Parse the route docstrings once and write the API spec file."""
+    path = spec_path(current_app)
+    spec = Swagger.get_apispecs(current_app.swag, Swagger.DEFAULT_ENDPOINT)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(spec, file, separators=(',', ':'))
+    click.echo(f'Wrote {path}')
@@ -0,0 +1,233 @@
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from models import db, Auction, Player, Property, GameHistory
+from cache import cache
+from scheduler import scheduler
+from trades import trade_index
+from stats import count
+
+
+class LiveAuction:
+    def __init__(self, auction, balances, deadline):
+        self.id = auction.id
+        self.game_id = auction.game_id
+        self.property_id = auction.property_id
+        self.current_bid = auction.current_bid
+        self.current_bidder_id = auction.current_bidder_id
+        self.deadline = deadline
+        self.balances = balances  # player_id -> balance when the auction was opened
+        self.settling = False
+        # (player_id, amount, placed_at), written to the history on settlement
+        self.bids = []
+        if auction.current_bidder_id:
+            # Placed before this worker loaded the auction
+            self.bids.append((auction.current_bidder_id, auction.current_bid, datetime.utcnow()))
+
+
+class AuctionBook:
+    """Bid book for active auctions, held in memory until settlement.
+
+    Bids are validated against the balances cached when the auction was
+    opened and kept in memory; placing one writes nothing to the database.
+    A bid in the last ``AUCTION_EXTENSION`` seconds pushes the deadline
+    back by that window. At the deadline (or on an explicit end) the
+    auction, its bids and the property transfer are written in a single
+    transaction. Auctions still active after a restart are opened again
+    with a fresh clock; their bids in memory are lost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._auctions = {}
+
+    def _open(self, auction):
+        balances = dict(db.session.query(Player.id, Player.balance).filter_by(
+            game_id=auction.game_id, is_bankrupt=False
+        ))
+        live = LiveAuction(auction, balances, time.time() + current_app.config['AUCTION_DURATION'])
+        self._auctions[auction.id] = live
+        self._schedule(live)
+        return live
+
+    def _schedule(self, live):
+        scheduler.schedule(
+            ('auction', live.id), max(0, live.deadline - time.time()),
+            self.settle, live.id
+        )
+
+    def open(self, auction):
+        with self._lock:
+            return self._open(auction)
+
+    def get(self, auction):
+        """The live auction for an active Auction row, loading it if needed.
+
+        A settled auction leaves the book only after its commit, so before
+        opening one the row's status is read again: a request that loaded
+        the row before settlement must not open an orphaned book for it.
+        """
+        with self._lock:
+            live = self._auctions.get(auction.id)
+            if live is None and auction.status == 'active':
+                if db.session.query(Auction.status).filter_by(id=auction.id).scalar() == 'active':
+                    live = self._open(auction)
+            return live
+
+    def active_for_game(self, game_id):
+        """Active auctions of a game, in one query and without loading them.
+
+        Auctions this worker has not loaded are shown from their row, with
+        no deadline, rather than being opened (which would restart their
+        clock).
+        """
+        auctions = Auction.query.filter_by(game_id=game_id, status='active').order_by(Auction.id).all()
+        with self._lock:
+            books = [self._auctions.get(auction.id) for auction in auctions]
+        return [{
+            'id': auction.id,
+            'property_id': auction.property_id,
+            'current_bid': max(auction.current_bid, live.current_bid) if live else auction.current_bid,
+            'current_bidder_id': live.current_bidder_id if live and live.current_bid >= auction.current_bid
+                                 else auction.current_bidder_id,
+            'ends_at': datetime.utcfromtimestamp(live.deadline).isoformat() if live else None
+        } for auction, live in zip(auctions, books)]
+
+    def bid(self, auction, player_id, amount):
+        live = self.get(auction)
+        if live is None:
+            return {'message': 'Auction not active'}, 400
+        with self._lock:
+            if live.settling or time.time() >= live.deadline:
+                return {'message': 'Auction not active'}, 400
+            # The row's bid is higher when it was stored before this worker loaded it
+            if amount <= max(live.current_bid, auction.current_bid):
+                return {'message': 'Bid must be higher than current bid'}, 400
+            if live.balances.get(player_id, 0) < amount:
+                return {'message': 'Insufficient funds'}, 400
+
+            live.current_bid = amount
+            live.current_bidder_id = player_id
+            live.bids.append((player_id, amount, datetime.utcnow()))
+
+            extension = current_app.config['AUCTION_EXTENSION']
+            if live.deadline - time.time() < extension:
+                live.deadline = time.time() + extension
+                self._schedule(live)
+        # Nothing is committed, so bump the game version right away
+        cache.bump(['game:%d' % live.game_id])
+        return {
+            'message': 'Bid placed',
+            'current_bid': amount,
+            'ends_at': datetime.utcfromtimestamp(live.deadline).isoformat()
+        }, 200
+
+    def settle(self, auction_id, force=False):
+        """Close an auction and persist it. Returns (payload, status).
+
+        The auction stays in the book until the settlement is committed, so
+        a failed commit is retried rather than losing the bids.
+        """
+        with self._lock:
+            live = self._auctions.get(auction_id)
+            if live is None:
+                return {'message': 'Auction not found'}, 404
+            if live.settling:
+                return {'message': 'Auction already ending'}, 400
+            if not force and time.time() < live.deadline:
+                # Extended after this timer was set; the new timer will fire
+                return {'message': 'Auction still running'}, 400
+            live.settling = True
+        scheduler.cancel(('auction', auction_id))
+
+        try:
+            result = self._settle(live)
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                live.settling = False
+            scheduler.schedule(('auction', auction_id), current_app.config['AUCTION_EXTENSION'], self.settle, auction_id)
+            raise
+        with self._lock:
+            self._auctions.pop(auction_id, None)
+        return result
+
+    def _settle(self, live):
+        auction_id = live.id
+        # Close the row before reading the top bid: a bid committed earlier
+        # is read below, a later one no longer matches status 'active'
+        closed = db.session.execute(
+            db.update(Auction)
+            .where(Auction.id == auction_id, Auction.status == 'active')
+            .values(status='completed')
+        ).rowcount
+        if not closed:
+            db.session.rollback()
+            return {'message': 'Auction already ended'}, 400
+        auction = db.session.get(Auction, auction_id, populate_existing=True)
+        property = Property.query.get(auction.property_id)
+
+        # The stored top bid may have been placed through another worker
+        bids = list(live.bids)
+        if auction.current_bidder_id and (auction.current_bidder_id, auction.current_bid) not in {
+            (player_id, amount) for player_id, amount, _ in bids
+        }:
+            bids.append((auction.current_bidder_id, auction.current_bid, datetime.utcnow()))
+
+        # Balances may have changed since the bids were checked, so the
+        # highest bid that can still be paid wins
+        bidders = {p.id: p for p in Player.query.filter(
+            Player.id.in_({player_id for player_id, *_ in bids})
+        )}
+        winner = None
+        if not property.owner_id:
+            for player_id, amount, _ in sorted(bids, key=lambda b: b[1], reverse=True):
+                if bidders[player_id].balance >= amount:
+                    winner = bidders[player_id]
+                    break
+
+        rows = [{
+            'game_id': live.game_id,
+            'player_id': player_id,
+            'action': 'auction_bid',
+            'amount': amount,
+            'position': property.position,
+            'ref_id': auction_id,
+            'created_at': placed_at
+        } for player_id, amount, placed_at in bids]
+
+        auction.current_bidder_id = None
+        if winner:
+            auction.current_bid = amount
+            auction.current_bidder_id = winner.id
+            winner.balance -= amount
+            property.owner_id = winner.id
+            trade_index.properties_changed(live.game_id, [property.id])
+            count(live.game_id, winner.id, auctions_won=1)
+            rows.append({
+                'game_id': live.game_id,
+                'player_id': winner.id,
+                'action': 'auction_won',
+                'amount': amount,
+                'position': property.position,
+                'ref_id': auction_id,
+                'created_at': datetime.utcnow()
+            })
+        if rows:
+            db.session.execute(db.insert(GameHistory), rows)
+        db.session.commit()
+
+        if not winner:
+            return {'message': 'Auction ended with no winner'}, 200
+        return {
+            'message': 'Auction ended',
+            'winner_id': winner.id,
+            'property_id': property.id,
+            'amount': amount
+        }, 200
+
+
+auction_book = AuctionBook()
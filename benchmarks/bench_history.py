@@ -0,0 +1,137 @@
+"""Compare free-text history rows with typed event rows.
+
+Builds the same synthetic history twice in SQLite, once with the old
+string action/details columns and once with the GameHistory table from
+models.py (integer action code, typed payload columns), and reports the
+size per row and the speed of indexed filtering and a simple aggregate.
+Run from the repository root:
+
+    python benchmarks/bench_history.py
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy.dialects import sqlite  # noqa: E402
+from sqlalchemy.schema import CreateIndex, CreateTable  # noqa: E402
+
+from board import SQUARES  # noqa: E402
+from events import EVENT_TYPES, describe  # noqa: E402
+from models import GameHistory  # noqa: E402
+
+ROWS = 200000
+GAMES = 2000
+NUMBER = 200
+
+LEGACY_DDL = [
+    '''CREATE TABLE game_history (
+        id INTEGER PRIMARY KEY, game_id INTEGER NOT NULL, player_id INTEGER,
+        action VARCHAR(50) NOT NULL, details VARCHAR(200), created_at DATETIME
+    )''',
+    'CREATE INDEX ix_game_history_game_action ON game_history (game_id, action)',
+]
+TYPED_DDL = [str(CreateTable(GameHistory.__table__).compile(dialect=sqlite.dialect()))] + [
+    str(CreateIndex(index).compile(dialect=sqlite.dialect()))
+    for index in GameHistory.__table__.indexes if index.name == 'ix_game_history_game_action'
+]
+
+PURCHASABLE = [square['position'] for square in SQUARES if square['price']]
+
+
+class Event:
+    def __init__(self, **fields):
+        self.note = None
+        self.amount = self.position = self.counterparty_id = self.ref_id = None
+        self.__dict__.update(fields)
+
+
+def make_events():
+    rng = random.Random(7)
+    start = datetime(2026, 1, 1)
+    weighted = ['passed_go'] * 4 + ['property_purchased'] * 3 + ['auction_bid'] * 3 + ['trade_created', 'house_built']
+    for i in range(ROWS):
+        action = rng.choice(weighted)
+        if action == 'passed_go':
+            fields = {'amount': 200}
+        elif action == 'auction_bid':
+            fields = {'amount': rng.randint(10, 400)}
+        elif action == 'trade_created':
+            fields = {'counterparty_id': rng.randint(1, 4 * GAMES)}
+        else:
+            position = rng.choice(PURCHASABLE)
+            fields = {'position': position, 'amount': SQUARES[position]['price']}
+        yield Event(
+            id=i + 1, game_id=rng.randint(1, GAMES), player_id=rng.randint(1, 4 * GAMES),
+            action=action, created_at=start + timedelta(seconds=i * 13), **fields
+        )
+
+
+def build(path, ddl, rows, sql):
+    connection = sqlite3.connect(path)
+    for statement in ddl:
+        connection.execute(statement)
+    connection.executemany(sql, rows)
+    connection.commit()
+    connection.execute('VACUUM')
+    return connection
+
+
+def size_per_row(connection, name):
+    # Needs SQLite built with the dbstat virtual table (the default in CPython builds)
+    size = connection.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = ?', (name,)).fetchone()[0]
+    return size / ROWS
+
+
+def report(name, func):
+    seconds = timeit.timeit(func, number=NUMBER) / NUMBER
+    print(f'  {name:<32} {seconds * 1e3:8.3f} ms')
+
+
+def main():
+    events = list(make_events())
+    codes = {name: code for code, name in enumerate(EVENT_TYPES)}
+    tmpdir = tempfile.mkdtemp()
+
+    legacy = build(
+        os.path.join(tmpdir, 'legacy.db'), LEGACY_DDL,
+        [(e.id, e.game_id, e.player_id, e.action, describe(e), e.created_at.isoformat(' ')) for e in events],
+        'INSERT INTO game_history VALUES (?, ?, ?, ?, ?, ?)'
+    )
+    typed = build(
+        os.path.join(tmpdir, 'typed.db'), TYPED_DDL,
+        [(e.id, e.game_id, e.player_id, codes[e.action], e.amount, e.position,
+          e.counterparty_id, e.ref_id, None, e.created_at.isoformat(' ')) for e in events],
+        'INSERT INTO game_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+    )
+
+    print(f'{ROWS} events over {GAMES} games')
+    for name in ('game_history', 'ix_game_history_game_action'):
+        print(f'  bytes per row in {name:<28} legacy {size_per_row(legacy, name):6.1f}   typed {size_per_row(typed, name):6.1f}')
+
+    game_ids = [random.randint(1, GAMES) for _ in range(50)]
+    print('Purchases of 50 games (indexed on game_id, action):')
+    report('legacy', lambda: [legacy.execute(
+        'SELECT count(*) FROM game_history WHERE game_id = ? AND action = ?', (g, 'property_purchased')
+    ).fetchone() for g in game_ids])
+    report('typed', lambda: [typed.execute(
+        'SELECT count(*) FROM game_history WHERE game_id = ? AND action = ?', (g, codes['property_purchased'])
+    ).fetchone() for g in game_ids])
+
+    print('Total bid volume (string parsing vs typed column):')
+    report('legacy', lambda: legacy.execute(
+        "SELECT SUM(CAST(substr(details, 8) AS INTEGER)) FROM game_history WHERE action = 'auction_bid'"
+    ).fetchone())
+    report('typed', lambda: typed.execute(
+        'SELECT SUM(amount) FROM game_history WHERE action = ?', (codes['auction_bid'],)
+    ).fetchone())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compare payload size and encode time of the game state serializers.
+
+Run from the repository root:
+
+    python benchmarks/bench_serializers.py
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+
+from board import CATALOG
+from codec import encode_game_state, encode_history
+from state import render_game_state
+
+NUMBER = 2000
+
+
+def make_game(player_count=4):
+    rng = random.Random(42)
+    players = [SimpleNamespace(
+        id=i + 1, user_id=100 + i, balance=rng.randint(0, 3000),
+        position=rng.randint(0, 39), in_jail=False, is_bankrupt=False,
+        username='player_%d' % i
+    ) for i in range(player_count)]
+    properties = [SimpleNamespace(
+        id=1000 + prop['position'], name=prop['name'], position=prop['position'],
+        price=prop.get('price', 0), color_group=prop.get('color_group', ''),
+        owner_id=rng.choice([None] + [p.id for p in players]),
+        is_mortgaged=rng.random() < 0.1, houses=rng.randint(0, 4)
+    ) for prop in CATALOG]
+    game = SimpleNamespace(status='active', current_player_id=1, max_players=player_count)
+    history = [SimpleNamespace(
+        id=i, player_id=rng.choice([None, 1, 2]), action='property_purchased',
+        details='Boardwalk', created_at=datetime(2024, 1, 1)
+    ) for i in range(200)]
+    return game, players, properties, history
+
+
+def jsonify_state(game, players, properties):
+    # The pre-split get_game_state response
+    return jsonify({
+        'status': game.status,
+        'current_player_id': game.current_player_id,
+        'max_players': game.max_players,
+        'players': [{
+            'id': p.id, 'user_id': p.user_id, 'balance': p.balance,
+            'position': p.position, 'in_jail': p.in_jail,
+            'is_bankrupt': p.is_bankrupt, 'username': p.username
+        } for p in players],
+        'properties': [{
+            'id': prop.id, 'name': prop.name, 'position': prop.position,
+            'price': prop.price, 'owner_id': prop.owner_id,
+            'is_mortgaged': prop.is_mortgaged, 'houses': prop.houses,
+            'color_group': prop.color_group
+        } for prop in properties]
+    }).get_data()
+
+
+def jsonify_history(history):
+    return jsonify([{
+        'id': h.id, 'player_id': h.player_id, 'action': h.action,
+        'details': h.details, 'timestamp': h.created_at.isoformat()
+    } for h in history]).get_data()
+
+
+def report(name, func):
+    size = len(func())
+    seconds = timeit.timeit(func, number=NUMBER) / NUMBER
+    print('%-28s %8d bytes %10.1f us' % (name, size, seconds * 1e6))
+
+
+def main():
+    app = Flask(__name__)
+    game, players, properties, history = make_game()
+    with app.app_context():
+        print('game state (4 players, 40 squares)')
+        report('jsonify (full properties)', lambda: jsonify_state(game, players, properties))
+        report('json templates', lambda: render_game_state(game, players, properties))
+        report('binary', lambda: encode_game_state(game, players, properties))
+        print('history (200 events)')
+        report('jsonify', lambda: jsonify_history(history))
+        report('binary', lambda: encode_history(history))
+
+
+if __name__ == '__main__':
+    main()
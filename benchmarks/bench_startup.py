@@ -0,0 +1,56 @@
+"""Measure how long a worker takes to boot and serve its first requests.
+
+Each sample runs in a fresh interpreter, like a newly forked worker.
+Run from the repository root (build the spec first to measure the
+precompiled path):
+
+    flask --app main spec build
+    python benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = 5
+
+PROBE = '''
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app(%(config)r)
+created = time.perf_counter()
+client = app.test_client()
+client.get('/board')
+first_request = time.perf_counter()
+if app.config['SWAGGER_ENABLED']:
+    client.get('/apispec_1.json')
+spec = time.perf_counter()
+print(imported - start, created - imported, first_request - created, spec - first_request)
+'''
+
+SCENARIOS = [
+    ('all extensions, spec from docstrings', {'APISPEC_PATH': os.devnull + '.missing'}),
+    ('all extensions, precompiled spec', {}),
+    ('api only (no migrate, no swagger)', {'MIGRATE_ENABLED': False, 'SWAGGER_ENABLED': False}),
+]
+
+
+def run(config):
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE % {'config': config}], cwd=ROOT
+    )
+    return [float(value) for value in output.split()]
+
+
+def main():
+    print('%-40s %9s %9s %9s %9s %9s' % ('scenario', 'import', 'create', '1st req', 'spec', 'total'))
+    for name, config in SCENARIOS:
+        samples = [run(config) for _ in range(SAMPLES)]
+        best = [min(column) * 1000 for column in zip(*samples)]
+        print('%-40s %7.1fms %7.1fms %7.1fms %7.1fms %7.1fms' % (name, *best, sum(best)))
+
+
+if __name__ == '__main__':
+    main()
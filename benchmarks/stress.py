@@ -0,0 +1,286 @@
+"""Race concurrent requests against one game and check the invariants.
+
+Each round sets up a fresh game, releases a burst of racing requests
+from many threads at once through the app, then checks that:
+
+- money is conserved apart from transfers to and from the bank,
+- every property has at most one owner and nobody paid twice for it,
+- the turn belongs to a player still in the game.
+
+Scenarios: roll (simultaneous /roll), buy (duplicate /buy), auction
+(bids racing /end) and trade (accept racing /player/bankrupt).
+Throughput and conflict rates are reported per scenario, so concurrency
+changes can be compared on the same races. Run from the repository root:
+
+    python benchmarks/stress.py
+    python benchmarks/stress.py --rounds 50 --threads 16 buy auction
+    python benchmarks/stress.py --db postgresql://localhost/monopoly_stress
+
+The default database is a throwaway SQLite file. Every table of the
+target database is dropped and recreated.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from main import create_app  # noqa: E402
+from models import db, User, Game, Player, Property, GameHistory, Auction  # noqa: E402
+from provisioning import provision_games  # noqa: E402
+
+BANK_FLOWS = {'passed_go': 200, 'paid_income_tax': -80}
+
+
+class Round:
+    """One fresh game plus a client and token per seat."""
+
+    def __init__(self, app, seats):
+        self.app = app
+        with app.app_context():
+            users = [User(username=f'stress_{time.monotonic_ns()}_{i}', password='x') for i in range(seats)]
+            db.session.add_all(users)
+            db.session.flush()
+            [(game, players)] = provision_games([users])
+            db.session.commit()
+            self.game_id = game.id
+            self.player_ids = [p.id for p in players]
+            self.headers = [
+                {'Authorization': 'Bearer ' + create_access_token(identity=str(u.id))}
+                for u in users
+            ]
+
+    def url(self, path):
+        return f'/games/{self.game_id}{path}'
+
+    def balances(self):
+        return dict(db.session.query(Player.id, Player.balance).filter_by(game_id=self.game_id))
+
+    def history_since(self, history_id, actions):
+        return GameHistory.query.filter(
+            GameHistory.game_id == self.game_id,
+            GameHistory.id > history_id,
+            GameHistory.action.in_(actions)
+        ).all()
+
+
+def race(app, calls):
+    """Fire ``calls`` [(headers, path, json)] at once.
+
+    Returns the (status, body) of each call and the wall time of the burst.
+    """
+    results = [None] * len(calls)
+    barrier = threading.Barrier(len(calls))
+
+    def worker(index, headers, path, body):
+        client = app.test_client()
+        barrier.wait()
+        try:
+            response = client.post(path, headers=headers, json=body)
+            results[index] = (response.status_code, response.get_json(silent=True) or {})
+        except Exception as error:
+            results[index] = (599, {'message': repr(error)})
+
+    threads = [threading.Thread(target=worker, args=(i,) + call) for i, call in enumerate(calls)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def check_turn(game_id):
+    game = db.session.get(Game, game_id)
+    if game.status != 'active':
+        return []
+    player = db.session.get(Player, game.current_player_id) if game.current_player_id else None
+    if not player or player.game_id != game_id or player.is_bankrupt:
+        return [f'game {game_id}: turn held by invalid player {game.current_player_id}']
+    return []
+
+
+def scenario_roll(app, threads):
+    rnd = Round(app, 3)
+    with app.app_context():
+        game = db.session.get(Game, rnd.game_id)
+        seat = rnd.player_ids.index(game.current_player_id)
+        before = rnd.balances()
+        mark = db.session.query(db.func.max(GameHistory.id)).scalar() or 0
+
+    results, seconds = race(app, [(rnd.headers[seat], rnd.url('/roll'), {})] * threads)
+
+    violations = []
+    rolls = [body for status, body in results if status == 200 and 'new_position' in body]
+    # Only the current player rolls, so only doubles may grant another roll
+    if len(rolls) > 1 + sum(1 for body in rolls if body['is_double']):
+        violations.append(f'game {rnd.game_id}: {len(rolls)} rolls accepted for one turn')
+    with app.app_context():
+        after = rnd.balances()
+        for player_id in rnd.player_ids:
+            flows = sum(BANK_FLOWS[h.action] for h in rnd.history_since(mark, BANK_FLOWS) if h.player_id == player_id)
+            if after[player_id] != before[player_id] + flows:
+                violations.append(f'player {player_id}: balance {after[player_id]}, expected {before[player_id] + flows}')
+        violations += check_turn(rnd.game_id)
+    return results, violations, seconds
+
+
+def scenario_buy(app, threads):
+    rnd = Round(app, 4)
+    with app.app_context():
+        property = Property.query.filter_by(game_id=rnd.game_id, position=random.choice([1, 6, 11, 21, 39])).first()
+        Player.query.filter_by(game_id=rnd.game_id).update({'position': property.position})
+        db.session.commit()
+        property_id, price = property.id, property.price
+        before = rnd.balances()
+
+    calls = [(rnd.headers[i % 4], rnd.url(f'/property/{property_id}/buy'), None) for i in range(threads)]
+    results, seconds = race(app, calls)
+
+    violations = []
+    bought = sum(1 for status, _ in results if status == 200)
+    if bought != 1:
+        violations.append(f'property {property_id}: {bought} successful buys')
+    with app.app_context():
+        owner_id = db.session.get(Property, property_id).owner_id
+        spent = {pid: before[pid] - balance for pid, balance in rnd.balances().items() if balance != before[pid]}
+        if spent != ({owner_id: price} if owner_id else {}):
+            violations.append(f'property {property_id}: owner {owner_id}, payments {spent}')
+        violations += check_turn(rnd.game_id)
+    return results, violations, seconds
+
+
+def scenario_auction(app, threads):
+    rnd = Round(app, 4)
+    client = app.test_client()
+    with app.app_context():
+        property_id = Property.query.filter_by(game_id=rnd.game_id, position=random.choice([3, 8, 16, 24, 37])).first().id
+    auction_id = client.post(rnd.url('/auction'), headers=rnd.headers[0], json={'property_id': property_id, 'starting_bid': 0}).get_json()['auction_id']
+    with app.app_context():
+        before = rnd.balances()
+
+    calls = [
+        (rnd.headers[i % 4], rnd.url(f'/auction/{auction_id}/bid'), {'amount': 10 + 10 * i})
+        for i in range(threads - 1)
+    ]
+    calls.insert(threads // 2, (rnd.headers[0], rnd.url(f'/auction/{auction_id}/end'), None))
+    results, seconds = race(app, calls)
+    client.post(rnd.url(f'/auction/{auction_id}/end'), headers=rnd.headers[0])
+
+    violations = []
+    with app.app_context():
+        auction = db.session.get(Auction, auction_id)
+        owner_id = db.session.get(Property, property_id).owner_id
+        if owner_id != auction.current_bidder_id:
+            violations.append(f'auction {auction_id}: property owner {owner_id}, winner {auction.current_bidder_id}')
+        spent = {pid: before[pid] - balance for pid, balance in rnd.balances().items() if balance != before[pid]}
+        if spent != ({owner_id: auction.current_bid} if owner_id else {}):
+            violations.append(f'auction {auction_id}: won at {auction.current_bid}, payments {spent}')
+        # An acknowledged bid above the final price was lost
+        lost = [call[2]['amount'] for call, (status, _) in zip(calls, results)
+                if status == 200 and call[2] and call[2]['amount'] > (auction.current_bid if owner_id else 0)]
+        if lost:
+            violations.append(f'auction {auction_id}: accepted bids {lost} lost to {auction.current_bid}')
+        violations += check_turn(rnd.game_id)
+    return results, violations, seconds
+
+
+def scenario_trade(app, threads):
+    rnd = Round(app, 3)
+    client = app.test_client()
+    sender, receiver = rnd.player_ids[0], rnd.player_ids[1]
+    with app.app_context():
+        property = Property.query.filter_by(game_id=rnd.game_id, position=random.choice([5, 13, 26, 34])).first()
+        property.owner_id = sender
+        db.session.commit()
+        property_id = property.id
+    trade_id = client.post(rnd.url('/trade'), headers=rnd.headers[0], json={
+        'sender_id': sender, 'receiver_id': receiver,
+        'offer': [{'type': 'property', 'property_id': property_id}, {'type': 'money', 'amount': 100}],
+        'request': []
+    }).get_json()['trade_id']
+    with app.app_context():
+        total = sum(rnd.balances().values())
+
+    calls = [(rnd.headers[1], rnd.url(f'/trade/{trade_id}/accept'), None)] * (threads - 1)
+    calls.insert(threads // 2, (rnd.headers[0], rnd.url('/player/bankrupt'), None))
+    results, seconds = race(app, calls)
+
+    violations = []
+    accepted = sum(1 for call, (status, _) in zip(calls, results) if status == 200 and 'accept' in call[1])
+    if accepted > 1:
+        violations.append(f'trade {trade_id}: accepted {accepted} times')
+    with app.app_context():
+        if sum(rnd.balances().values()) != total:
+            violations.append(f'game {rnd.game_id}: money not conserved by trade {trade_id}')
+        owner = db.session.get(Player, db.session.get(Property, property_id).owner_id or 0)
+        if owner and owner.is_bankrupt:
+            violations.append(f'property {property_id}: owned by bankrupt player {owner.id}')
+        violations += check_turn(rnd.game_id)
+    return results, violations, seconds
+
+
+SCENARIOS = {
+    'roll': scenario_roll,
+    'buy': scenario_buy,
+    'auction': scenario_auction,
+    'trade': scenario_trade,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('scenarios', nargs='*', help='any of: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', help='SQLAlchemy database URI (default: temporary SQLite file)')
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error('unknown scenario: ' + ', '.join(sorted(unknown)))
+    random.seed(args.seed)
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.db or 'sqlite:///' + os.path.join(tmpdir, 'stress.db'),
+        'SCHEDULER_ENABLED': False,
+        'CACHE_BACKEND': None,
+        'SWAGGER_ENABLED': False,
+        'MIGRATE_ENABLED': False,
+        'LEADERBOARD_SNAPSHOT_PATH': os.path.join(tmpdir, 'leaderboard.json'),
+    })
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    print(f'{"scenario":<10} {"requests":>8} {"req/s":>8} {"ok":>6} {"conflict":>9} {"error":>7} {"violations":>10}')
+    failed = False
+    for name in args.scenarios or list(SCENARIOS):
+        statuses = Counter()
+        violations = []
+        elapsed = 0.0
+        for _ in range(args.rounds):
+            results, found, seconds = SCENARIOS[name](app, args.threads)
+            elapsed += seconds
+            statuses.update(status // 100 for status, _ in results)
+            violations += found
+        requests = sum(statuses.values())
+        print(f'{name:<10} {requests:>8} {requests / elapsed:>8.0f} {statuses[2]:>6} '
+              f'{statuses[4] / requests:>9.1%} {statuses[5] / requests:>7.1%} {len(violations):>10}')
+        for violation in violations[:5]:
+            print(f'    {violation}')
+        failed = failed or bool(violations)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+
+PROPERTIES_FILE_PATH = os.path.join(os.path.dirname(__file__), 'properties.json')
+
+with open(PROPERTIES_FILE_PATH, 'rb') as file:
+    _raw = file.read()
+
+# Static board catalog, shared by every game
+CATALOG = sorted(json.loads(_raw), key=lambda prop: prop['position'])
+
+# Changes whenever properties.json changes, so clients can cache /board forever
+BOARD_VERSION = hashlib.sha1(_raw).hexdigest()[:12]
+
+# Pre-serialized GET /board payload
+BOARD_JSON = json.dumps(
+    {'version': BOARD_VERSION, 'properties': CATALOG},
+    separators=(',', ':')
+).encode('utf-8')
+
+del _raw
+
+
+def _amount(value):
+    # Utility rents are written as e.g. "4x dice roll"; keep the multiplier
+    if isinstance(value, str):
+        return int(value.split('x', 1)[0])
+    return value
+
+
+# Rows of the board_square table: the static fields of every square
+SQUARES = [{
+    'position': prop['position'],
+    'name': prop['name'],
+    'price': prop.get('price', 0),
+    'rent': _amount(prop.get('rent', 0)),
+    'mortgage_value': prop.get('mortgage_value', 0),
+    'color_group': prop.get('color_group', ''),
+    'house_price': prop.get('house_price', 0)
+} for prop in CATALOG]
+
+# Board positions of each color group, for queries over a whole set
+GROUP_POSITIONS = {}
+for _square in SQUARES:
+    if _square['color_group']:
+        GROUP_POSITIONS.setdefault(_square['color_group'], []).append(_square['position'])
+del _square
@@ -0,0 +1,214 @@
+import logging
+import secrets
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Game, Player, Property, Auction
+from board import CATALOG
+from rules import take_roll, purchase_property, build_house_on, advance_turn
+from auctions import auction_book
+from timeouts import arm_game_timers, on_turn_change
+
+logger = logging.getLogger(__name__)
+
+# Cash a bot keeps in hand after buying or building, by color group:
+# cheap sets are bought eagerly, expensive ones only with a cushion
+RESERVE = {
+    'brown': 50, 'light blue': 50, 'pink': 100, 'orange': 100, 'red': 150,
+    'yellow': 150, 'green': 200, 'dark blue': 200, 'railroad': 100, 'utility': 250
+}
+DEFAULT_RESERVE = 150
+
+# Highest auction bid, as a multiple of the list price
+BID_FACTOR = {
+    'brown': 0.8, 'light blue': 0.9, 'pink': 1.0, 'orange': 1.2, 'red': 1.1,
+    'yellow': 1.0, 'green': 0.9, 'dark blue': 1.0, 'railroad': 1.0, 'utility': 0.6
+}
+BID_STEP = 10
+
+# Properties needed for a complete set
+SET_SIZES = Counter(prop['color_group'] for prop in CATALOG if prop.get('color_group'))
+
+# Rolls a bot makes per job before yielding (doubles keep the turn)
+MAX_ROLLS_PER_JOB = 10
+
+
+def wants_to_buy(player, property):
+    reserve = RESERVE.get(property.color_group, DEFAULT_RESERVE)
+    return property.price > 0 and player.balance - property.price >= reserve
+
+
+def build_one_house(game, player):
+    owned = Property.query.filter_by(game_id=game.id, owner_id=player.id).all()
+    groups = Counter(prop.color_group for prop in owned)
+    candidates = [
+        prop for prop in owned
+        if prop.house_price and not prop.is_mortgaged
+        and groups[prop.color_group] == SET_SIZES.get(prop.color_group)
+        and prop.houses < 4
+        and player.balance - prop.house_price >= RESERVE.get(prop.color_group, DEFAULT_RESERVE)
+    ]
+    if candidates:
+        # Build evenly, cheapest first
+        target = min(candidates, key=lambda prop: (prop.houses, prop.house_price))
+        build_house_on(game.id, player, target)
+
+
+def play_turns(game_id):
+    """Play while it is a bot's turn in the game."""
+    game = Game.query.get(game_id)
+    for _ in range(MAX_ROLLS_PER_JOB):
+        if not game or game.status != 'active':
+            return game
+        player = Player.query.get(game.current_player_id)
+        if not player or not player.is_bot:
+            return game
+
+        response, status = take_roll(game, player)
+        if status != 200:
+            # Stuck in jail without the fine; give up the turn
+            db.session.rollback()
+            advance_turn(game, player.id)
+            db.session.commit()
+            continue
+
+        square = response.get('property')
+        if square and square.get('can_buy'):
+            property = Property.query.get(square['id'])
+            if wants_to_buy(player, property):
+                purchase_property(game.id, player, property)
+        build_one_house(game, player)
+    return game
+
+
+def place_bids(game_id, auction_id):
+    """Let every bot in the game raise an auction up to its limit."""
+    auction = Auction.query.get(auction_id)
+    if not auction or auction.status != 'active':
+        return
+    property = Property.query.get(auction.property_id)
+    factor = BID_FACTOR.get(property.color_group, 1.0)
+    reserve = RESERVE.get(property.color_group, DEFAULT_RESERVE)
+    for bot in Player.query.filter_by(game_id=game_id, is_bot=True, is_bankrupt=False):
+        live = auction_book.get(auction)
+        if live is None:
+            return
+        if live.current_bidder_id == bot.id:
+            continue
+        limit = min(int(property.price * factor), bot.balance - reserve)
+        amount = live.current_bid + BID_STEP
+        if amount <= limit:
+            auction_book.bid(auction, bot.id, amount)
+
+
+def bot_user(game_id):
+    """A bot account that is not seated in the game yet.
+
+    Bot accounts are shared between games. Names taken by people are
+    skipped, and an account created by a concurrent request is used
+    instead of failing on the username key.
+    """
+    seated = {user_id for user_id, in db.session.query(Player.user_id).filter_by(game_id=game_id)}
+    n = 1
+    while True:
+        user = User.query.filter_by(username=f'bot_{n}').first()
+        if not user:
+            try:
+                with db.session.begin_nested():
+                    user = User(username=f'bot_{n}', password=secrets.token_hex(16), is_bot=True)
+                    db.session.add(user)
+            except IntegrityError:
+                continue
+            return user
+        if user.is_bot and user.id not in seated:
+            return user
+        n += 1
+
+
+class BotPool:
+    """Bounded thread pool that runs bot turns and bids off the request path."""
+
+    def __init__(self):
+        self.app = None
+        self.size = 4
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._latencies = deque(maxlen=1000)
+        self._jobs = 0
+        self._errors = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.size = app.config.get('BOT_POOL_SIZE', self.size)
+
+    def submit(self, key, func, *args):
+        """Queue a job unless an identical one is already waiting or running."""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='bot')
+        self._executor.submit(self._run, key, func, args, time.perf_counter())
+        return True
+
+    def _run(self, key, func, args, queued_at):
+        started = time.perf_counter()
+        with self.app.app_context():
+            try:
+                result = func(*args)
+            except Exception:
+                logger.exception('Bot job %r failed', key)
+                db.session.rollback()
+                result = None
+                with self._lock:
+                    self._errors += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                    self._jobs += 1
+                    self._latencies.append((started - queued_at, time.perf_counter() - started))
+            # Hand over the turn (or queue the next bot job) after the
+            # key is released, so a following bot turn is not dropped
+            if isinstance(result, Game):
+                arm_game_timers(result)
+            db.session.remove()
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = {
+                'pool_size': self.size,
+                'pending': len(self._pending),
+                'jobs': self._jobs,
+                'errors': self._errors
+            }
+
+        def percentiles(values):
+            if not values:
+                return {'p50': None, 'p95': None, 'max': None}
+            values = sorted(values)
+            return {
+                'p50': round(values[len(values) // 2] * 1000, 2),
+                'p95': round(values[int(len(values) * 0.95)] * 1000, 2),
+                'max': round(values[-1] * 1000, 2)
+            }
+
+        stats['queue_wait_ms'] = percentiles([wait for wait, _ in latencies])
+        stats['run_time_ms'] = percentiles([run for _, run in latencies])
+        return stats
+
+
+bot_pool = BotPool()
+
+
+@on_turn_change
+def queue_bot_turn(game):
+    player = Player.query.get(game.current_player_id)
+    if player and player.is_bot:
+        bot_pool.submit(('turn', game.id), play_turns, game.id)
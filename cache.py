@@ -0,0 +1,322 @@
+"""Read-through response cache keyed by entity versions.
+
+Every committed change to a row bumps the version of the entity it
+belongs to (a user or a game). Cache keys embed those
+versions, so an entry is never stale: a write simply makes readers look
+up a new key, and the old entry ages out of the LRU.
+
+Changes made through the ORM are picked up by a flush hook. Core
+statements (``db.insert``/``db.update``) bypass it, so their callers name
+the entities they changed with ``cache.touch``.
+
+The cache is never required for correctness: when the backend fails,
+reads fall through to the database. A version bump lost that way could
+serve an old entry again once the backend is back, so entries expire
+after ``CACHE_TTL`` seconds.
+"""
+import logging
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, User, Game
+
+logger = logging.getLogger(__name__)
+
+
+class CacheError(Exception):
+    """The cache backend could not be reached or answered with an error."""
+
+
+class LRUCache:
+    """In-process cache evicting least recently used entries past ``max_bytes``."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()   # key -> (value, expires_at or None)
+        self._counters = {}   # never evicted
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.size -= len(value)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if len(value) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._entries[key] = (value, expires_at)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def counters(self, keys):
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+
+    def incr(self, keys):
+        with self._lock:
+            for key in keys:
+                self._counters[key] = self._counters.get(key, 0) + 1
+
+
+class RespCache:
+    """Backend speaking the Redis protocol, shared by all workers.
+
+    Works against Redis itself or the stand-in started with
+    ``flask --app main cache serve``. Every failure is raised as
+    CacheError; a command waits at most ``timeout`` seconds.
+    """
+
+    def __init__(self, url, timeout=0.5):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or 'localhost', parsed.port or 6379)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+            conn = self._local.conn = (sock, sock.makefile('rb'))
+        return conn
+
+    def _command(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        try:
+            sock, reader = self._connection()
+            sock.sendall(b''.join(parts))
+            return read_reply(reader)
+        except (OSError, RuntimeError) as error:
+            # The connection may be half way through a reply; start afresh
+            conn, self._local.conn = getattr(self._local, 'conn', None), None
+            if conn is not None:
+                conn[0].close()
+            raise CacheError(str(error)) from error
+
+    def get(self, key):
+        return self._command('GET', key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._command('SET', key, value, 'EX', int(ttl))
+        else:
+            self._command('SET', key, value)
+
+    def counters(self, keys):
+        if not keys:
+            return []
+        values = self._command('MGET', *keys)
+        return [int(value) if value is not None else 0 for value in values]
+
+    def incr(self, keys):
+        for key in keys:
+            self._command('INCR', key)
+
+
+def read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError('Cache server closed the connection')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode('utf-8')
+    if kind == b'-':
+        raise RuntimeError(rest.decode('utf-8'))
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        return [read_reply(reader) for _ in range(int(rest))]
+    raise RuntimeError('Unexpected reply %r' % line)
+
+
+def _entities(obj):
+    if isinstance(obj, User):
+        return ['user:%d' % obj.id]
+    if isinstance(obj, Game):
+        return ['game:%d' % obj.id]
+    game_id = getattr(obj, 'game_id', None)
+    if game_id is not None:
+        return ['game:%d' % game_id]
+    return []
+
+
+class Cache:
+    def __init__(self):
+        self.backend = None
+        self.ttl = None
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND')
+        workers = app.config.get('WORKERS', 1)
+        if kind == 'lru' and workers > 1:
+            # Versions counted in one process are never seen by the others
+            app.logger.warning('CACHE_BACKEND %r is per process; using CACHE_URL for %d workers', kind, workers)
+            kind = 'resp'
+        self.ttl = app.config.get('CACHE_TTL')
+        if kind == 'lru':
+            self.backend = LRUCache(app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        elif kind == 'resp':
+            self.backend = RespCache(app.config['CACHE_URL'], app.config.get('CACHE_TIMEOUT', 0.5))
+        else:
+            # Stores nothing but still tracks versions for single-flight keys
+            self.backend = LRUCache(max_bytes=0)
+        app.cli.add_command(cache_cli)
+
+    def versions(self, entities):
+        """Current versions of ``entities``, or None if the backend failed."""
+        if self.backend is None or not entities:
+            return [0] * len(entities)
+        try:
+            return self.backend.counters(['v:' + entity for entity in entities])
+        except CacheError:
+            logger.warning('Cache versions unavailable', exc_info=True)
+            return None
+
+    def touch(self, entities):
+        """Bump ``entities`` when the current transaction commits."""
+        db.session.info.setdefault('cache_entities', set()).update(entities)
+
+    def bump(self, entities):
+        # Runs after the database commit, so a failure must not raise
+        if self.backend is not None and entities:
+            try:
+                self.backend.incr(['v:' + entity for entity in sorted(entities)])
+            except CacheError:
+                logger.warning('Lost cache version bump of %s', sorted(entities), exc_info=True)
+
+    def key(self, name, entities, *parts):
+        """Cache key for ``name`` at the current versions of ``entities``.
+
+        None when the versions are unavailable; nothing is cached then.
+        """
+        versions = self.versions(entities)
+        if versions is None:
+            return None
+        return ':'.join([name] + [str(part) for part in parts] + [str(v) for v in versions])
+
+    def get_or_compute(self, key, compute):
+        """Return cached bytes for ``key``, computing and storing them on a miss.
+
+        ``compute`` returns bytes, or None for results that must not be
+        cached (e.g. not found). A failing backend counts as a miss.
+        """
+        if self.backend is None or key is None:
+            return compute()
+        try:
+            value = self.backend.get(key)
+        except CacheError:
+            logger.warning('Cache read failed', exc_info=True)
+            return compute()
+        if value is None:
+            value = compute()
+            if value is not None:
+                try:
+                    self.backend.set(key, value, self.ttl)
+                except CacheError:
+                    logger.warning('Cache write failed', exc_info=True)
+        return value
+
+
+cache = Cache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    touched = session.info.setdefault('cache_entities', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        touched.update(_entities(obj))
+
+@event.listens_for(Session, 'after_commit')
+def _bump_versions(session):
+    touched = session.info.pop('cache_entities', None)
+    if touched:
+        cache.bump(touched)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('cache_entities', None)
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            name = command[0].upper()
+            if name == b'GET':
+                value = store.get(command[1])
+                reply = b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+            elif name == b'SET':
+                # Only the EX option is understood
+                ttl = int(command[4]) if len(command) == 5 and command[3].upper() == b'EX' else None
+                store.set(command[1], command[2], ttl)
+                reply = b'+OK\r\n'
+            elif name == b'MGET':
+                values = store.counters(command[1:])
+                reply = b'*%d\r\n' % len(values) + b''.join(
+                    b'$%d\r\n%d\r\n' % (len(str(v)), v) for v in values
+                )
+            elif name == b'INCR':
+                store.incr([command[1]])
+                value = store.counters([command[1]])[0]
+                reply = b':%d\r\n' % value
+            elif name == b'PING':
+                reply = b'+PONG\r\n'
+            else:
+                reply = b'-ERR unknown command\r\n'
+            self.wfile.write(reply)
+
+
+cache_cli = AppGroup('cache', help='Response cache tools.')
+
+
+@cache_cli.command('serve')
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=6380)
+@click.option('--max-bytes', default=256 * 1024 * 1024)
+def serve(host, port, max_bytes):
+    """Run a small Redis-protocol cache server shared by local workers."""
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer((host, port), _RespHandler)
+    server.daemon_threads = True
+    server.store = LRUCache(max_bytes)
+    click.echo(f'Cache listening on {host}:{port}')
+    server.serve_forever()
@@ -0,0 +1,175 @@
+"""Compact binary encodings of game state and history.
+
+All integers are little-endian.
+
+Game state::
+
+    header   magic 'MNS', version u8 (2), status u8, max_players u8,
+             player_count u8, current_player_index i8, flags u8,
+             board_version 6 bytes, first_property_id u32
+    players  player_count records of
+             id u32, user_id u32, balance i32, position u8, flags u8
+             (bit 0 in jail, bit 1 bankrupt), username length u16 +
+             utf-8
+    squares  40 records of owner_index u8 (0xff for none), flags u8
+             (bits 0-2 houses, bit 7 mortgaged)
+    ids      40 property ids u32, only present with flag bit 1
+
+Property ids are sent as ``first_property_id + position`` when the game's
+properties were inserted in board order, which is the normal case. Flag
+bit 0 marks a game whose properties exist (i.e. it has started). Status
+codes are the positions in ``events.GAME_STATUSES``.
+
+History::
+
+    header   magic 'MNH', version u8 (1), count u32
+    records  id u32, player_id i32 (-1 for none), timestamp f64 (unix),
+             action length u8 + utf-8, details length u16 + utf-8
+"""
+import struct
+from datetime import timezone
+
+from board import BOARD_VERSION
+from events import GAME_STATUSES
+
+BINARY_MIMETYPE = 'application/vnd.monopoly+binary'
+
+STATE_VERSION = 2
+HISTORY_VERSION = 1
+BOARD_SIZE = 40
+NO_OWNER = 0xff
+
+STATUS_CODES = {name: code for code, name in enumerate(GAME_STATUSES)}
+
+_STATE_HEADER = struct.Struct('<3sBBBBbB6sI')
+_PLAYER = struct.Struct('<IIiBBH')
+_SQUARE = struct.Struct('<BB')
+_IDS = struct.Struct('<%dI' % BOARD_SIZE)
+_HISTORY_HEADER = struct.Struct('<3sBI')
+_HISTORY_RECORD = struct.Struct('<Iid')
+
+_BOARD_VERSION_BYTES = bytes.fromhex(BOARD_VERSION)
+
+HAS_PROPERTIES = 0x01
+EXPLICIT_IDS = 0x02
+IN_JAIL = 0x01
+BANKRUPT = 0x02
+MORTGAGED = 0x80
+
+
+def encode_game_state(game, players, properties):
+    """Pack a game state; ``properties`` must be ordered by position."""
+    index_of = {p.id: i for i, p in enumerate(players)}
+    current_index = index_of.get(game.current_player_id, -1)
+
+    flags = 0
+    first_id = 0
+    squares = bytearray(_SQUARE.pack(NO_OWNER, 0) * BOARD_SIZE)
+    if properties:
+        flags |= HAS_PROPERTIES
+        first_id = properties[0].id - properties[0].position
+        for prop in properties:
+            if prop.id != first_id + prop.position:
+                flags |= EXPLICIT_IDS
+            _SQUARE.pack_into(
+                squares, prop.position * _SQUARE.size,
+                index_of.get(prop.owner_id, NO_OWNER),
+                (prop.houses or 0) & 0x07 | (MORTGAGED if prop.is_mortgaged else 0)
+            )
+
+    parts = [_STATE_HEADER.pack(
+        b'MNS', STATE_VERSION,
+        STATUS_CODES.get(game.status, 0xff),
+        game.max_players or 0,
+        len(players),
+        current_index,
+        flags,
+        _BOARD_VERSION_BYTES,
+        max(first_id, 0)
+    )]
+    for p in players:
+        username = p.username.encode('utf-8')
+        parts.append(_PLAYER.pack(
+            p.id, p.user_id, p.balance, p.position,
+            (IN_JAIL if p.in_jail else 0) | (BANKRUPT if p.is_bankrupt else 0),
+            len(username)
+        ))
+        parts.append(username)
+    parts.append(bytes(squares))
+    if flags & EXPLICIT_IDS:
+        ids = [0] * BOARD_SIZE
+        for prop in properties:
+            ids[prop.position] = prop.id
+        parts.append(_IDS.pack(*ids))
+    return b''.join(parts)
+
+
+def encode_history(history):
+    """Pack a list of GameHistory rows."""
+    parts = [_HISTORY_HEADER.pack(b'MNH', HISTORY_VERSION, len(history))]
+    for h in history:
+        action = h.action.encode('utf-8')[:0xff]
+        details = (h.details or '').encode('utf-8')[:0xffff]
+        parts.append(_HISTORY_RECORD.pack(
+            h.id,
+            -1 if h.player_id is None else h.player_id,
+            h.created_at.replace(tzinfo=timezone.utc).timestamp()
+        ))
+        parts.append(struct.pack('<B', len(action)))
+        parts.append(action)
+        parts.append(struct.pack('<H', len(details)))
+        parts.append(details)
+    return b''.join(parts)
+
+
+def decode_game_state(data):
+    """Unpack a game state into plain dicts (for clients and tests)."""
+    (magic, version, status, max_players, player_count, current_index,
+     flags, board_version, first_id) = _STATE_HEADER.unpack_from(data)
+    if magic != b'MNS' or version != STATE_VERSION:
+        raise ValueError('Not a game state payload')
+    offset = _STATE_HEADER.size
+
+    players = []
+    for _ in range(player_count):
+        pid, user_id, balance, position, pflags, name_length = _PLAYER.unpack_from(data, offset)
+        offset += _PLAYER.size
+        name = data[offset:offset + name_length]
+        offset += name_length
+        players.append({
+            'id': pid,
+            'user_id': user_id,
+            'balance': balance,
+            'position': position,
+            'in_jail': bool(pflags & IN_JAIL),
+            'is_bankrupt': bool(pflags & BANKRUPT),
+            'username': name.decode('utf-8')
+        })
+
+    squares = []
+    for position in range(BOARD_SIZE):
+        owner, sflags = _SQUARE.unpack_from(data, offset)
+        offset += _SQUARE.size
+        squares.append((owner, sflags))
+    ids = _IDS.unpack_from(data, offset) if flags & EXPLICIT_IDS else None
+
+    status_names = {code: name for name, code in STATUS_CODES.items()}
+    properties = []
+    if flags & HAS_PROPERTIES:
+        for position, (owner, sflags) in enumerate(squares):
+            properties.append({
+                'id': ids[position] if ids else first_id + position,
+                'position': position,
+                'owner_id': None if owner == NO_OWNER else players[owner]['id'],
+                'is_mortgaged': bool(sflags & MORTGAGED),
+                'houses': sflags & 0x07
+            })
+
+    return {
+        'board_version': board_version.hex(),
+        'status': status_names.get(status),
+        'current_player_id': players[current_index]['id'] if current_index >= 0 else None,
+        'max_players': max_players,
+        'players': players,
+        'properties': properties
+    }
@@ -0,0 +1,103 @@
+"""Small-integer codes for status and event-type columns.
+
+Codes are positions in the tuples below, so new values must only ever be
+appended. Columns declared with ``Code`` still take and return the names,
+so queries such as ``filter_by(status='active')`` keep working while the
+database stores and indexes one small integer.
+"""
+from sqlalchemy.types import SmallInteger, TypeDecorator
+
+from board import SQUARES
+
+GAME_STATUSES = ('waiting', 'active', 'finished')
+TRADE_STATUSES = ('pending', 'accepted', 'rejected', 'invalidated')
+AUCTION_STATUSES = ('active', 'completed')
+
+EVENT_TYPES = (
+    'game_started',
+    'game_ended',
+    'passed_go',
+    'paid_income_tax',
+    'property_purchased',
+    'property_mortgaged',
+    'property_unmortgaged',
+    'house_built',
+    'house_sold',
+    'trade_created',
+    'trade_accepted',
+    'trade_rejected',
+    'auction_started',
+    'auction_bid',
+    'auction_won',
+    'card_drawn',
+    'paid_jail_fine',
+    'used_jail_card',
+    'declared_bankruptcy',
+    'turn_timed_out',
+)
+
+
+class Code(TypeDecorator):
+    """A name from a fixed tuple, stored as its index."""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, names):
+        super().__init__()
+        self.names = tuple(names)
+        self._codes = {name: code for code, name in enumerate(self.names)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._codes[value]
+        except KeyError:
+            raise ValueError(f'Unknown value {value!r}, expected one of {self.names}')
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.names[int(value)]
+
+
+def _property(position):
+    return SQUARES[position]['name']
+
+# Human-readable details of each event, built from its typed columns: the
+# columns it needs, and how to render them
+DETAILS = {
+    'passed_go': (('amount',), lambda e: f'Received ${e.amount}'),
+    'paid_income_tax': (('amount',), lambda e: f'Paid ${e.amount}'),
+    'paid_jail_fine': (('amount',), lambda e: f'Paid ${e.amount}'),
+    'property_purchased': (('position',), lambda e: _property(e.position)),
+    'property_mortgaged': (('position',), lambda e: _property(e.position)),
+    'property_unmortgaged': (('position',), lambda e: _property(e.position)),
+    'house_built': (('position',), lambda e: _property(e.position)),
+    'house_sold': (('position',), lambda e: _property(e.position)),
+    'trade_created': (('counterparty_id',), lambda e: f'with player {e.counterparty_id}'),
+    'trade_accepted': (('ref_id',), lambda e: f'trade {e.ref_id}'),
+    'trade_rejected': (('ref_id',), lambda e: f'trade {e.ref_id}'),
+    'auction_started': (('position',), lambda e: f'for property {_property(e.position)}'),
+    'auction_bid': (('amount',), lambda e: f'amount {e.amount}'),
+    'auction_won': (('position', 'amount'), lambda e: f'property {_property(e.position)} for ${e.amount}'),
+}
+
+
+def describe(event):
+    """Details text of a history event (anything with the GameHistory columns).
+
+    The legacy note wins; otherwise None unless every column the action
+    needs is set, so a missing value never reads as "None" in the text.
+    """
+    if event.note is not None:
+        return event.note
+    detail = DETAILS.get(event.action)
+    if detail is None:
+        return None
+    fields, render = detail
+    if any(getattr(event, field) is None for field in fields):
+        return None
+    try:
+        return render(event)
+    except IndexError:
+        return None
@@ -0,0 +1,137 @@
+"""Bulk export of game history as NDJSON or CSV.
+
+Rows are read in fixed-size batches by primary key, each batch in its
+own short transaction, and encoded (and optionally gzipped) one batch at
+a time, so an export of any size runs in constant memory without holding
+the database for its whole duration.
+"""
+import csv
+import json
+import sys
+import zlib
+from datetime import datetime
+from io import StringIO
+
+import click
+from flask.cli import AppGroup
+
+from events import describe
+from models import db, GameHistory
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+COLUMNS = (
+    'id', 'game_id', 'player_id', 'action', 'amount', 'position',
+    'counterparty_id', 'ref_id', 'details', 'timestamp'
+)
+BATCH_SIZE = 1000
+
+
+def parse_timestamp(value):
+    """ISO 8601 timestamp or date, or None when not given. Raises ValueError."""
+    return datetime.fromisoformat(value) if value else None
+
+
+def history_batches(start=None, end=None, game_ids=None, batch_size=BATCH_SIZE):
+    """Yield lists of history rows with start <= created_at < end, in id order."""
+    filters = []
+    if start:
+        filters.append(GameHistory.created_at >= start)
+    if end:
+        filters.append(GameHistory.created_at < end)
+    if game_ids:
+        filters.append(GameHistory.game_id.in_(game_ids))
+
+    # Narrow the id range once through the created_at index; every batch
+    # after that is a primary key range scan
+    low, high = db.session.execute(
+        db.select(db.func.min(GameHistory.id), db.func.max(GameHistory.id)).where(*filters)
+    ).one()
+    db.session.commit()
+    if low is None:
+        return
+
+    last_id = low - 1
+    while last_id < high:
+        rows = db.session.execute(
+            db.select(
+                GameHistory.id, GameHistory.game_id, GameHistory.player_id,
+                GameHistory.action, GameHistory.amount, GameHistory.position,
+                GameHistory.counterparty_id, GameHistory.ref_id, GameHistory.note,
+                GameHistory.created_at
+            ).where(GameHistory.id > last_id, GameHistory.id <= high, *filters)
+            .order_by(GameHistory.id)
+            .limit(batch_size)
+        ).all()
+        db.session.commit()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield rows
+
+
+def _values(row):
+    return tuple(row[:8]) + (describe(row), row.created_at.isoformat())
+
+
+def _ndjson(rows):
+    return ''.join(
+        json.dumps(dict(zip(COLUMNS, _values(row))), separators=(',', ':')) + '\n'
+        for row in rows
+    )
+
+
+def _csv(rows, header=False):
+    out = StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(_values(row) for row in rows)
+    return out.getvalue()
+
+
+def encode_export(batches, fmt='ndjson', compress=False):
+    """Encode history batches to bytes chunks in ``fmt``, gzipped if asked."""
+    gzip = zlib.compressobj(wbits=31) if compress else None
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return gzip.compress(data) if gzip else data
+
+    if fmt == 'csv':
+        yield emit(_csv([], header=True))
+    for rows in batches:
+        chunk = emit(_csv(rows) if fmt == 'csv' else _ndjson(rows))
+        if chunk:
+            yield chunk
+    if gzip:
+        yield gzip.flush()
+
+
+history_cli = AppGroup('history', help='Game history tools.')
+
+
+@history_cli.command('export')
+@click.option('--from', 'start', help='Only events at or after this ISO timestamp')
+@click.option('--to', 'end', help='Only events before this ISO timestamp')
+@click.option('--game', 'game_ids', type=int, multiple=True, help='Only these games (repeatable)')
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='ndjson')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output')
+@click.option('--batch-size', default=BATCH_SIZE)
+@click.option('-o', '--output', type=click.Path(dir_okay=False), help='Output file (default stdout)')
+def export_history(start, end, game_ids, fmt, compress, batch_size, output):
+    """Export game history across games as NDJSON or CSV."""
+    try:
+        start, end = parse_timestamp(start), parse_timestamp(end)
+    except ValueError as error:
+        raise click.BadParameter(str(error))
+    chunks = encode_export(history_batches(start, end, game_ids, batch_size), fmt, compress)
+    file = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            file.write(chunk)
+    finally:
+        if output:
+            file.close()
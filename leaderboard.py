@@ -0,0 +1,195 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+from models import db, User, Player, GameHistory
+
+
+class Leaderboard:
+    """Users ranked by games won, then games played, kept sorted in memory.
+
+    The board is built once (from a snapshot file when one exists, otherwise
+    from the user table) and then updated incrementally as games end, so
+    rank and top-N lookups never sort the whole table. Bot accounts are
+    left out. Any change schedules
+    a snapshot at most LEADERBOARD_PERSIST_INTERVAL seconds later, and a
+    last one is written at exit, so renames and deletions survive a
+    restart like game results do.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []      # sorted (-games_won, -games_played, user_id)
+        self._entries = {}   # user_id -> (key, username)
+        self._loaded = False
+        self._dirty = False
+        self._timer = None
+        self._snapshot_path = None
+        self._persist_interval = 60
+        self._max_user_id = 0
+        self._max_history_id = 0
+
+    def init_app(self, app):
+        self._snapshot_path = app.config.get(
+            'LEADERBOARD_SNAPSHOT_PATH',
+            os.path.join(app.instance_path, 'leaderboard.json')
+        )
+        self._persist_interval = app.config.get('LEADERBOARD_PERSIST_INTERVAL', 60)
+
+    @staticmethod
+    def _key(user_id, games_played, games_won):
+        return (-(games_won or 0), -(games_played or 0), user_id)
+
+    def _insert(self, user_id, username, games_played, games_won):
+        old = self._entries.get(user_id)
+        if old:
+            index = bisect.bisect_left(self._keys, old[0])
+            del self._keys[index]
+        key = self._key(user_id, games_played, games_won)
+        bisect.insort(self._keys, key)
+        self._entries[user_id] = (key, username)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if not self._load_snapshot():
+                rows = db.session.query(
+                    User.id, User.username, User.games_played, User.games_won
+                ).filter(User.is_bot.isnot(True)).all()
+                self._entries = {
+                    uid: (self._key(uid, played, won), name)
+                    for uid, name, played, won in rows
+                }
+                self._keys = sorted(key for key, _ in self._entries.values())
+                self._max_user_id = max((uid for uid, *_ in rows), default=0)
+                self._max_history_id = db.session.query(
+                    db.func.max(GameHistory.id)
+                ).scalar() or 0
+                self._mark_dirty()
+            self._loaded = True
+
+    def _load_snapshot(self):
+        if not self._snapshot_path or not os.path.exists(self._snapshot_path):
+            return False
+        try:
+            with open(self._snapshot_path, 'r') as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        # Snapshot rows are already in rank order
+        self._keys = []
+        self._entries = {}
+        for uid, name, played, won in snapshot['users']:
+            key = self._key(uid, played, won)
+            self._keys.append(key)
+            self._entries[uid] = (key, name)
+        self._max_user_id = snapshot['max_user_id']
+        self._max_history_id = snapshot['max_history_id']
+
+        # Catch up with users registered and games ended since the snapshot
+        ended_games = db.session.query(GameHistory.game_id).filter(
+            GameHistory.id > self._max_history_id,
+            GameHistory.action == 'game_ended'
+        )
+        changed = User.query.filter(User.is_bot.isnot(True), db.or_(
+            User.id > self._max_user_id,
+            User.id.in_(db.session.query(Player.user_id).filter(Player.game_id.in_(ended_games)))
+        )).all()
+        for user in changed:
+            self._insert(user.id, user.username, user.games_played, user.games_won)
+            self._max_user_id = max(self._max_user_id, user.id)
+        self._max_history_id = db.session.query(
+            db.func.max(GameHistory.id)
+        ).scalar() or self._max_history_id
+        return True
+
+    def update(self, user):
+        """Re-rank a user after their counters changed. Bots are not ranked."""
+        if user.is_bot:
+            return
+        self._ensure_loaded()
+        with self._lock:
+            self._insert(user.id, user.username, user.games_played, user.games_won)
+            self._max_user_id = max(self._max_user_id, user.id)
+            self._mark_dirty()
+
+    def remove(self, user_id):
+        self._ensure_loaded()
+        with self._lock:
+            old = self._entries.pop(user_id, None)
+            if old:
+                del self._keys[bisect.bisect_left(self._keys, old[0])]
+                self._mark_dirty()
+
+    def _mark_dirty(self):
+        # Called with the lock held
+        self._dirty = True
+        if self._timer is None and self._snapshot_path:
+            self._timer = threading.Timer(self._persist_interval, self._persist_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _persist_later(self):
+        with self._lock:
+            self._timer = None
+        self.maybe_persist()
+
+    def _entry(self, key, rank):
+        games_won, games_played, user_id = key
+        return {
+            'user_id': user_id,
+            'username': self._entries[user_id][1],
+            'games_played': -games_played,
+            'games_won': -games_won,
+            'rank': rank
+        }
+
+    def _rank_of(self, key):
+        # Competition ranking: users with identical records share a rank
+        return bisect.bisect_left(self._keys, key[:2]) + 1
+
+    def top(self, limit):
+        self._ensure_loaded()
+        with self._lock:
+            return [self._entry(key, self._rank_of(key)) for key in self._keys[:limit]]
+
+    def rank(self, user_id):
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not entry:
+                return None
+            result = self._entry(entry[0], self._rank_of(entry[0]))
+            result['total_users'] = len(self._keys)
+            return result
+
+    def maybe_persist(self):
+        """Write a snapshot if the board changed since the last one."""
+        if not self._snapshot_path or not self._dirty:
+            return
+        with self._lock:
+            snapshot = {
+                'max_user_id': self._max_user_id,
+                'max_history_id': self._max_history_id,
+                'users': [
+                    [key[2], self._entries[key[2]][1], -key[1], -key[0]]
+                    for key in self._keys
+                ]
+            }
+            self._dirty = False
+        os.makedirs(os.path.dirname(self._snapshot_path), exist_ok=True)
+        tmp_path = self._snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(snapshot, file, separators=(',', ':'))
+        os.replace(tmp_path, self._snapshot_path)
+
+
+leaderboard = Leaderboard()
+atexit.register(leaderboard.maybe_persist)
@@ -1,126 +1,342 @@
-from flask import Flask, request, jsonify, redirect
+import hashlib
+
+from flask import Flask, Blueprint, current_app, request, jsonify, redirect, send_file, stream_with_context
+from flask.cli import AppGroup
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from models import db, User, Game, Player, Property, Trade, TradeItem, Auction, Card, GameHistory
-from flasgger import Swagger
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Game, Player, Property, BoardSquare, Trade, TradeItem, Auction, Card, GameHistory, Tournament, TournamentRound
+from leaderboard import leaderboard
+from board import CATALOG, BOARD_VERSION, BOARD_JSON, GROUP_POSITIONS
+from state import render_game_state
+from codec import BINARY_MIMETYPE, encode_game_state, encode_history
+from matchmaking import matchmaking
+from scheduler import scheduler
+from timeouts import arm_game_timers, schedule_turn_timeout, schedule_lobby_expiry, touch_game
+from auctions import auction_book
+from trades import trade_index
+from bots import bot_pool, bot_user, place_bids
+from cache import cache
+from singleflight import game_state_flight
+from rent import rent_map
+from stats import count, game_stats
+from spectate import spectators
+from schema import schema_cli
+from admin import operator_required
+from profiler import profiler
+from slowlog import slow_request_log
+from events import GAME_STATUSES
+from export import FORMATS, encode_export, history_batches, history_cli, parse_timestamp
+from provisioning import provision_games
+from rules import (
+    record_game_history, transfer_funds, calculate_rent, initialize_properties,
+    advance_turn, finish_game, take_roll, purchase_property, build_house_on
+)
 import random
 from datetime import datetime
+import importlib
 import json
 import os
+from itertools import islice
+
+api = Blueprint('api', __name__)
+jwt = JWTManager()
+
+# Events returned per GET /games/<id>/dashboard call
+DASHBOARD_HISTORY_LIMIT = 100
+
+# Highest tournament round a SmallInteger column holds
+MAX_ROUND = 32767
+
+
+class LazyGroup(AppGroup):
+    """Command group imported from ``module:name`` only when it is run.
+
+    Keeps heavy dependencies (NumPy for analytics) out of the workers,
+    which never run CLI commands.
+    """
+
+    def __init__(self, name, import_name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.import_name = import_name
+
+    def _group(self):
+        module, name = self.import_name.split(':')
+        return getattr(importlib.import_module(module), name)
+
+    def list_commands(self, ctx):
+        return self._group().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._group().get_command(ctx, name)
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+
+    # Configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///monopoly.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = 'very_secret-key'
+    app.config['SWAGGER'] = {
+        'title': 'Monopoly API',
+        'uiversion': 3,
+        'doc_expansion': 'none',
+        'specs_route': '/apidocs/'
+    }
+
+    app.config['CORS_HEADERS'] = 'Content-Type'
+    app.config['CORS_SUPPORTS_CREDENTIALS'] = True
+    app.config['CORS_EXPOSE_HEADERS'] = ['Content-Type', 'Authorization']
+    app.config['CORS_MAX_AGE'] = 3600
+    app.config['CORS_ORIGINS'] = [
+        '*'
+    ]
+
+    # set JWT token expiration time to 1 week
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 60 * 60 * 24 * 7
+
+    # a leaderboard change is written to its snapshot file within this many seconds
+    app.config['LEADERBOARD_PERSIST_INTERVAL'] = 60
+
+    # seconds before a partly filled matchmaking table starts anyway
+    app.config['MATCHMAKING_MAX_WAIT'] = 60
+    # seconds a matched user has to pick up their assignment
+    app.config['MATCHMAKING_ASSIGNMENT_TTL'] = 10 * 60
+
+    # Background timeouts: a stalled turn is passed on, an idle game is
+    # ended and a lobby that never started is removed. When several
+    # workers serve the same database, enable the scheduler in exactly
+    # one of them. The others still record game activity in the database,
+    # and the idle timer re-checks it before ending a game.
+    app.config['SCHEDULER_ENABLED'] = True
+    app.config['SCHEDULER_TICK'] = 1.0
+    app.config['TURN_TIMEOUT'] = 120
+    app.config['GAME_IDLE_TIMEOUT'] = 60 * 60
+    app.config['LOBBY_TIMEOUT'] = 30 * 60
+
+    # Auctions close this many seconds after they open; a bid in the last
+    # AUCTION_EXTENSION seconds keeps them open for that much longer
+    app.config['AUCTION_DURATION'] = 30
+    app.config['AUCTION_EXTENSION'] = 10
+
+    # threads that play bot turns
+    app.config['BOT_POOL_SIZE'] = 4
+
+    # Response cache for GET endpoints: 'lru' (per process), 'resp' (a
+    # Redis-protocol server at CACHE_URL shared by workers) or None
+    # Worker processes serving the app (gunicorn reads WEB_CONCURRENCY);
+    # with more than one, an 'lru' cache is switched to the shared server
+    app.config['WORKERS'] = int(os.environ.get('WEB_CONCURRENCY', 1))
+    app.config['CACHE_BACKEND'] = 'lru'
+    app.config['CACHE_MAX_BYTES'] = 64 * 1024 * 1024
+    app.config['CACHE_URL'] = 'redis://127.0.0.1:6380'
+    # Seconds before an entry expires, and before a 'resp' call gives up
+    # (the request then reads the database)
+    app.config['CACHE_TTL'] = 5 * 60
+    app.config['CACHE_TIMEOUT'] = 0.5
+
+    # Usernames allowed to use the /admin endpoints
+    app.config['ADMIN_USERNAMES'] = []
+
+    # Request profiling: operators send "X-Profile: 1", and this share of
+    # all requests is profiled as well. Profiles go to PROFILE_DIR
+    # (default instance/profiles); only the newest PROFILE_KEEP are kept.
+    app.config['PROFILE_SAMPLE_RATE'] = 0.0
+    app.config['PROFILE_DIR'] = None
+    app.config['PROFILE_KEEP'] = 200
+
+    # Requests slower than this many seconds (None disables) are written
+    # with their SQL statements to SLOW_REQUEST_LOG (default
+    # instance/slow_requests.log), with query plans for the slowest
+    # SLOW_REQUEST_EXPLAIN SELECTs. Parameter values are only written with
+    # SLOW_REQUEST_LOG_PARAMS (they include plaintext passwords), and at most
+    # SLOW_REQUEST_MAX_STATEMENTS statements are kept per request
+    app.config['SLOW_REQUEST_THRESHOLD'] = 1.0
+    app.config['SLOW_REQUEST_EXPLAIN'] = 3
+    app.config['SLOW_REQUEST_LOG_PARAMS'] = False
+    app.config['SLOW_REQUEST_MAX_STATEMENTS'] = 500
+    app.config['SLOW_REQUEST_LOG'] = None
+    app.config['SLOW_REQUEST_LOG_BYTES'] = 10 * 1024 * 1024
+    app.config['SLOW_REQUEST_LOG_BACKUPS'] = 5
+
+    # Spectators of a game share one serialized state per version. Changes
+    # are picked up every SPECTATOR_POLL_INTERVAL seconds; a spectator
+    # that falls SPECTATOR_BUFFER versions behind skips the older ones
+    app.config['SPECTATOR_POLL_INTERVAL'] = 0.5
+    app.config['SPECTATOR_BUFFER'] = 4
+    app.config['SPECTATOR_HEARTBEAT'] = 15
+
+    # Column cache of `flask analytics report` (default instance/analytics.npz)
+    app.config['ANALYTICS_CACHE_PATH'] = None
 
-app = Flask(__name__)
+    # Optional extensions; workers that only serve the API can turn these
+    # off (e.g. FLASK_MIGRATE_ENABLED=false) to skip importing them
+    app.config['MIGRATE_ENABLED'] = True
+    app.config['SWAGGER_ENABLED'] = True
+    # Spec written by `flask --app main spec build`, served as a static file
+    app.config['APISPEC_PATH'] = None
 
-# Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///monopoly.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = 'very_secret-key'
-app.config['SWAGGER'] = {
-    'title': 'Monopoly API',
-    'uiversion': 3,
-    'doc_expansion': 'none',
-    'specs_route': '/apidocs/'
-}
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
 
+    # Initialize extensions
+    CORS(app)
+    db.init_app(app)
+    jwt.init_app(app)
+    leaderboard.init_app(app)
+    matchmaking.init_app(app)
+    scheduler.init_app(app)
+    bot_pool.init_app(app)
+    cache.init_app(app)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(history_cli)
+    app.cli.add_command(LazyGroup(
+        'analytics', 'analytics:analytics_cli', help='Cross-game analytics over game history.'
+    ))
+    profiler.init_app(app)
+    slow_request_log.init_app(app)
+    spectators.init_app(app, game_state_bytes)
 
-app.config['CORS_HEADERS'] = 'Content-Type'
-app.config['CORS_SUPPORTS_CREDENTIALS'] = True
-app.config['CORS_EXPOSE_HEADERS'] = ['Content-Type', 'Authorization']
-app.config['CORS_MAX_AGE'] = 3600
-app.config['CORS_ORIGINS'] = [
-    '*'
-]
-CORS(app)
+    if app.config['MIGRATE_ENABLED']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
-# Initialize extensions
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
-swagger = Swagger(app)
+    if app.config['SWAGGER_ENABLED']:
+        from apispec import PrecompiledSwagger, spec_cli
+        PrecompiledSwagger(app)
+        app.cli.add_command(spec_cli)
 
-# set JWT token expiration time to 1 week
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 60 * 60 * 24 * 7
+    app.register_blueprint(api)
+    return app
+
+
+@api.before_app_request
+def start_scheduler():
+    scheduler.start()
+
+@api.after_request
+def track_game_activity(response):
+    if request.method != 'GET' and response.status_code < 400 and 'game_id' in (request.view_args or {}):
+        touch_game(request.view_args['game_id'])
+    return response
 
 
 # Helper functions
-def record_game_history(game_id, player_id, action, details=None):
-    history = GameHistory(
-        game_id=game_id,
-        player_id=player_id,
-        action=action,
-        details=details
-    )
-    db.session.add(history)
-    db.session.commit()
+def json_bytes(obj):
+    return current_app.json.dumps(obj).encode('utf-8')
 
-def transfer_funds(sender, receiver, amount):
-    if sender.balance < amount:
-        return False
-    sender.balance -= amount
-    if receiver:  # If receiver is None, money goes to bank
-        receiver.balance += amount
-    return True
-
-def calculate_rent(property, game_id):
-    if not property.owner_id or property.is_mortgaged:
-        return 0
-        
-    base_rent = property.rent
-    
-    # Check if owner owns all properties in the color group
-    color_group_properties = Property.query.filter_by(
-        game_id=game_id,
-        color_group=property.color_group
-    ).all()
-    
-    owns_all = all(p.owner_id == property.owner_id for p in color_group_properties)
-    
-    if owns_all:
-        if property.houses == 0:
-            return base_rent * 2  # Double rent for complete color set
-        elif property.houses == 1:
-            return property.rent_with_1_house
-        elif property.houses == 2:
-            return property.rent_with_2_houses
-        elif property.houses == 3:
-            return property.rent_with_3_houses
-        elif property.houses == 4:
-            return property.rent_with_hotel
-    
-    return base_rent
-
-def initialize_properties(game_id):
-    # Standard Monopoly properties
-    properties_file_path = os.path.join(os.path.dirname(__file__), 'properties.json')
-    with open(properties_file_path, 'r') as file:
-        properties = json.load(file)
-    print(properties)
-    
-    for prop in properties:
-        new_prop = Property(
-            game_id=game_id,
-            name=prop['name'],
-            position=prop['position'],
-            price=prop.get('price', 0),
-            rent=prop.get('rent', 0),
-            #rent_with_1_house=prop.get('rent_with_1_house', None),
-            #rent_with_2_houses=prop.get('rent_with_2_houses', None),
-            #rent_with_3_houses=prop.get('rent_with_3_houses', None),
-            #rent_with_hotel=prop.get('rent_with_hotel', None),
-            mortgage_value=prop.get('mortgage_value', 0),
-            color_group=prop.get('color_group', ''),
-            house_price=prop.get('house_price', 0)
-        )
-        db.session.add(new_prop)
-    db.session.commit()
+def cached_response(key, compute, mimetype='application/json'):
+    body = cache.get_or_compute(key, compute)
+    if body is None:
+        return None
+    return current_app.response_class(body, mimetype=mimetype)
+
+def stream_json_array(query, serialize, chunk_size=500, prepare=None):
+    """Respond with a JSON array of ``serialize(row)`` without loading every row.
+
+    Rows are fetched ``chunk_size`` at a time and expunged from the session
+    once written, so memory stays flat however large the table is. With
+    ``prepare``, each chunk of rows is passed to it first and the result is
+    handed to ``serialize(row, prepared)``, so lookups run once per chunk.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield '['
+        # Bind to the session of the streaming context, not the view's
+        session = db.session()
+        rows = iter(query.with_session(session).yield_per(chunk_size))
+        count = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            prepared = prepare(chunk) if prepare else None
+            for row in chunk:
+                yield (',' if count else '') + dumps(serialize(row, prepared) if prepare else serialize(row))
+                session.expunge(row)
+                count += 1
+        yield ']'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def game_state_bytes(game_id, binary=False):
+    """Serialized state of a game (JSON or binary), or None if it does not exist."""
+    def compute():
+        game = Game.query.get(game_id)
+        if not game:
+            return None
+        players = Player.query.filter_by(game_id=game_id).all()
+        properties = Property.query.filter_by(game_id=game_id).order_by(Property.position).all()
+        if binary:
+            return encode_game_state(game, players, properties)
+        return render_game_state(game, players, properties)
 
-@app.route('/')
+    # Watchers polling the same game at the same version share one build
+    key = cache.key('state', [f'game:{game_id}'], game_id, int(binary))
+    if key is None:
+        return compute()
+    return cache.get_or_compute(key, lambda: game_state_flight.do(key, compute))
+
+def wants_binary():
+    # JSON stays the default unless the client prefers the binary encoding
+    return request.accept_mimetypes.best_match(
+        ['application/json', BINARY_MIMETYPE]
+    ) == BINARY_MIMETYPE
+
+@api.route('/')
 def index():
     return redirect('/apidocs')
 
+@api.route('/board', methods=['GET'])
+def get_board():
+    """
+    Get the static board catalog.
+    The catalog only changes with its version, so it can be cached forever.
+    ---
+    tags:
+      - Game
+    responses:
+      200:
+        description: Board catalog
+        schema:
+          type: object
+          properties:
+            version:
+              type: string
+            properties:
+              type: array
+              items:
+                type: object
+                properties:
+                  name:
+                    type: string
+                  position:
+                    type: integer
+                  price:
+                    type: integer
+                  rent:
+                    type: integer
+                  mortgage_value:
+                    type: integer
+                  color_group:
+                    type: string
+                  house_price:
+                    type: integer
+      304:
+        description: Catalog not modified
+    """
+    response = current_app.response_class(BOARD_JSON, mimetype='application/json')
+    response.set_etag(BOARD_VERSION)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
 ### User Management Endpoints ###
-@app.route('/users/register', methods=['POST'])
+@api.route('/users/register', methods=['POST'])
 def register():
     """
     Register a new user.
@@ -158,9 +374,10 @@ def register():
     new_user = User(username=data['username'], password=data['password'])
     db.session.add(new_user)
     db.session.commit()
+    leaderboard.update(new_user)
     return jsonify({'message': 'User registered successfully', 'user_id': new_user.id}), 201
 
-@app.route('/users/login', methods=['POST'])
+@api.route('/users/login', methods=['POST'])
 def login():
     """
     Authenticate a user.
@@ -198,7 +415,7 @@ def login():
     access_token = create_access_token(identity=str(user.id))
     return jsonify({'token': access_token}), 200
 
-@app.route('/users/<int:user_id>', methods=['GET'])
+@api.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     """
     Get user details.
@@ -227,17 +444,22 @@ def get_user(user_id):
       404:
         description: User not found
     """
-    user = User.query.get(user_id)
-    if not user:
+    def compute():
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        return json_bytes({
+            'id': user.id,
+            'username': user.username,
+            'games_played': user.games_played,
+            'games_won': user.games_won
+        })
+
+    response = cached_response(cache.key('user', [f'user:{user_id}'], user_id), compute)
+    if response is None:
         return jsonify({'message': 'User not found'}), 404
-        
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'games_played': user.games_played,
-        'games_won': user.games_won
-    }), 200
-@app.route('/users/<int:user_id>', methods=['DELETE'])
+    return response, 200
+@api.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     """
     Delete a user.
@@ -261,8 +483,9 @@ def delete_user(user_id):
         
     db.session.delete(user)
     db.session.commit()
+    leaderboard.remove(user_id)
     return jsonify({'message': 'User deleted successfully'}), 200
-@app.route('/users/<int:user_id>', methods=['PUT'])
+@api.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
     """
     Update user details.
@@ -311,11 +534,13 @@ def update_user(user_id):
     if 'password' in data:
         user.password = data['password']
     db.session.commit()
+    if 'username' in data:
+        leaderboard.update(user)
     return jsonify({'message': 'User updated successfully'}), 200
 
 
 ### Game Management Endpoints ###
-@app.route('/games', methods=['GET'])
+@api.route('/games', methods=['GET'])
 def get_all_games():
   """
   Get all games, optionally filtered by status.
@@ -364,11 +589,29 @@ def get_all_games():
               type: integer
   """
   status = request.args.get('status')
+  games = Game.query.options(db.selectinload(Game.players)).order_by(Game.id)
   if status:
-    games = Game.query.filter_by(status=status).all()
-  else:
-    games = Game.query.all()
-  return jsonify([{
+    if status not in GAME_STATUSES:
+      return jsonify([]), 200
+    games = games.filter_by(status=status)
+  return stream_json_array(games, game_summary, prepare=property_values), 200
+
+
+def property_values(games):
+  """Summed list price of the properties each player owns, for the finished ``games``."""
+  game_ids = [game.id for game in games if game.status == 'finished']
+  if not game_ids:
+    return {}
+  return dict(
+    db.session.query(Property.owner_id, db.func.sum(BoardSquare.price))
+    .join(BoardSquare, BoardSquare.position == Property.position)
+    .filter(Property.game_id.in_(game_ids), Property.owner_id.isnot(None))
+    .group_by(Property.owner_id)
+  )
+
+
+def game_summary(game, values):
+  return {
     'id': game.id,
     'status': game.status,
     'current_player_id': game.current_player_id,
@@ -386,19 +629,17 @@ def get_all_games():
       for idx, player in enumerate(
         sorted(
           game.players,
-          key=lambda p: p.balance + sum(
-            prop.price for prop in Property.query.filter_by(owner_id=p.id).all()
-          ),
+          key=lambda p: p.balance + values.get(p.id, 0),
           reverse=True
         )
       )
     ] if game.status == 'finished' else [],
     'max_players': game.max_players,
     'player_count': len(game.players)
-  } for game in games]), 200
+  }
 
 
-@app.route('/games/create', methods=['POST'])
+@api.route('/games/create', methods=['POST'])
 @jwt_required()
 def create_game():
     """
@@ -424,7 +665,7 @@ def create_game():
               type: integer
     """
     max_players = request.args.get('max_players', default=4, type=int)
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     user = User.query.get(user_id)  # Fetch the user from the database
     new_game = Game(max_players=max_players)
     db.session.add(new_game)
@@ -433,13 +674,14 @@ def create_game():
     db.session.add(new_player)
     
     db.session.commit()
+    schedule_lobby_expiry(new_game)
     return jsonify({
         'message': 'Game created',
         'game_id': new_game.id,
         'player_id': new_player.id
     }), 201
 
-@app.route('/games/<int:game_id>/join', methods=['POST'])
+@api.route('/games/<int:game_id>/join', methods=['POST'])
 @jwt_required()
 def join_game(game_id):
     """
@@ -477,7 +719,7 @@ def join_game(game_id):
             message:
               type: string
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     user = User.query.get(user_id)  # Fetch the user from the database
     
     if not user:
@@ -505,7 +747,7 @@ def join_game(game_id):
     db.session.commit()
     return jsonify({'message': 'Player joined', 'player_id': new_player.id}), 200
 
-@app.route('/games/<int:game_id>/start', methods=['POST'])
+@api.route('/games/<int:game_id>/start', methods=['POST'])
 @jwt_required()
 def start_game(game_id):
     """
@@ -526,7 +768,7 @@ def start_game(game_id):
       400:
         description: Not enough players
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     game = Game.query.get(game_id)
     
     if not game:
@@ -549,11 +791,13 @@ def start_game(game_id):
     game.status = 'active'
     game.current_player_id = player.id  # Let the creator go first
     db.session.commit()
+    scheduler.cancel(('lobby', game_id))
+    schedule_turn_timeout(game)
     
     record_game_history(game_id, None, 'game_started')
     return jsonify({'message': 'Game started'}), 200
 
-@app.route('/games/<int:game_id>', methods=['GET'])
+@api.route('/games/<int:game_id>', methods=['GET'])
 @jwt_required()
 def get_game_state(game_id):
     """
@@ -566,12 +810,18 @@ def get_game_state(game_id):
         name: game_id
         required: true
         type: integer
+    produces:
+      - application/json
+      - application/vnd.monopoly+binary
     responses:
       200:
-        description: Game state
+        description: Game state. Send Accept application/vnd.monopoly+binary for the compact binary encoding (see codec.py).
         schema:
           type: object
           properties:
+            board_version:
+              type: string
+              description: Version of the static catalog served by GET /board
             status:
               type: string
             current_player_id:
@@ -604,55 +854,310 @@ def get_game_state(game_id):
                 properties:
                   id:
                     type: integer
-                  name:
-                    type: string
                   position:
                     type: integer
-                  price:
-                    type: integer
                   owner_id:
                     type: integer
                   is_mortgaged:
                     type: boolean
                   houses:
                     type: integer
-                  color_group:
+      404:
+        description: Game not found
+    """
+    binary = wants_binary()
+    body = game_state_bytes(game_id, binary)
+    if body is None:
+        return jsonify({'message': 'Game not found'}), 404
+    response = current_app.response_class(body, mimetype=BINARY_MIMETYPE if binary else 'application/json')
+    response.vary.add('Accept')
+    return response, 200
+
+@api.route('/games/<int:game_id>/spectate', methods=['GET'])
+@jwt_required()
+def spectate_game(game_id):
+    """
+    Watch a game as a stream of server-sent events.
+    Every new version of the game state is sent as a `state` event whose
+    data is the JSON of GET /games/<id> and whose id is the version.
+    Spectators that read slowly skip intermediate versions.
+    ---
+    tags:
+      - Game
+    produces:
+      - text/event-stream
+    parameters:
+      - in: path
+        name: game_id
+        required: true
+        type: integer
+    responses:
+      200:
+        description: Event stream of game states
+      404:
+        description: Game not found
+    """
+    subscriber = spectators.subscribe(game_id)
+    if subscriber is None:
+        return jsonify({'message': 'Game not found'}), 404
+    heartbeat = current_app.config['SPECTATOR_HEARTBEAT']
+
+    def generate():
+        try:
+            while True:
+                frames = subscriber.pull(heartbeat)
+                # A comment line keeps idle connections open
+                yield b''.join(frames) if frames else b': keep-alive\n\n'
+        finally:
+            spectators.unsubscribe(game_id, subscriber)
+
+    response = current_app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response, 200
+
+@api.route('/games/<int:game_id>/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard(game_id):
+    """
+    Everything a player's screen needs in one response.
+    ---
+    tags:
+      - Game
+    parameters:
+      - in: path
+        name: game_id
+        required: true
+        type: integer
+      - in: query
+        name: state_version
+        required: false
+        type: string
+        description: state_version from the previous response; state is null if it has not changed
+      - in: query
+        name: since
+        required: false
+        type: integer
+        description: history_cursor from the previous response; only newer events are returned
+    responses:
+      200:
+        description: Dashboard of the calling player
+        schema:
+          type: object
+          properties:
+            state_version:
+              type: string
+            state:
+              type: object
+              description: Same as GET /games/{game_id}, or null when unchanged
+            player:
+              type: object
+              properties:
+                id:
+                  type: integer
+                balance:
+                  type: integer
+                position:
+                  type: integer
+                in_jail:
+                  type: boolean
+                jail_turns:
+                  type: integer
+                get_out_of_jail_cards:
+                  type: integer
+                is_bankrupt:
+                  type: boolean
+            pending_trades:
+              type: array
+              description: Same entries as GET /games/{game_id}/trades
+              items:
+                type: object
+            auctions:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                  property_id:
+                    type: integer
+                  current_bid:
+                    type: integer
+                  current_bidder_id:
+                    type: integer
+                  ends_at:
                     type: string
+                    description: null when the auction is not loaded in this worker
+            history:
+              type: array
+              items:
+                type: object
+            history_cursor:
+              type: integer
+            history_more:
+              type: boolean
+      404:
+        description: Player not found
+    """
+    player = Player.query.filter_by(user_id=int(get_jwt_identity()), game_id=game_id).first()
+    if not player:
+        return jsonify({'message': 'Player not found'}), 404
+
+    state = game_state_bytes(game_id)
+    state_version = hashlib.blake2b(state, digest_size=8).hexdigest()
+    since = request.args.get('since', 0, type=int)
+    history = GameHistory.query.filter(
+        GameHistory.game_id == game_id,
+        GameHistory.id > since
+    ).order_by(GameHistory.id).limit(DASHBOARD_HISTORY_LIMIT + 1).all()
+    more = len(history) > DASHBOARD_HISTORY_LIMIT
+    history = history[:DASHBOARD_HISTORY_LIMIT]
+
+    rest = json_bytes({
+        'state_version': state_version,
+        'player': {
+            'id': player.id,
+            'balance': player.balance,
+            'position': player.position,
+            'in_jail': player.in_jail,
+            'jail_turns': player.jail_turns,
+            'get_out_of_jail_cards': player.get_out_of_jail_cards,
+            'is_bankrupt': player.is_bankrupt
+        },
+        'pending_trades': trade_index.pending_for_player(player),
+        'auctions': auction_book.active_for_game(game_id),
+        'history': [{
+            'id': h.id,
+            'player_id': h.player_id,
+            'action': h.action,
+            'details': h.details,
+            'timestamp': h.created_at.isoformat()
+        } for h in history],
+        'history_cursor': history[-1].id if history else since,
+        'history_more': more
+    })
+    # The state is spliced in already serialized, straight from the cache
+    unchanged = request.args.get('state_version') == state_version
+    body = b'{"state":' + (b'null' if unchanged else state) + b',' + rest[1:]
+    return current_app.response_class(body, mimetype='application/json'), 200
+
+@api.route('/games/<int:game_id>/rents', methods=['GET'])
+@jwt_required()
+def get_rent_map(game_id):
+    """
+    Rent due on every square, for board heatmaps.
+    ---
+    tags:
+      - Game
+    parameters:
+      - in: path
+        name: game_id
+        required: true
+        type: integer
+      - in: query
+        name: dice
+        required: false
+        type: integer
+        description: Dice total used for utility rent (defaults to 7)
+    responses:
+      200:
+        description: Rent indexed by board position (0 for unowned or mortgaged squares)
+        schema:
+          type: object
+          properties:
+            dice:
+              type: integer
+            rents:
+              type: array
+              items:
+                type: integer
       404:
         description: Game not found
     """
-    game = Game.query.get(game_id)
-    if not game:
+    dice = request.args.get('dice', 7, type=int)
+    if not 2 <= dice <= 12:
+        return jsonify({'message': 'Dice total must be between 2 and 12'}), 400
+
+    def compute():
+        if not Game.query.get(game_id):
+            return None
+        properties = Property.query.filter(
+            Property.game_id == game_id,
+            Property.owner_id.isnot(None)
+        ).all()
+        return json_bytes({'dice': dice, 'rents': rent_map(properties, dice)})
+
+    response = cached_response(cache.key('rents', [f'game:{game_id}'], game_id, dice), compute)
+    if response is None:
         return jsonify({'message': 'Game not found'}), 404
-        
-    players = Player.query.filter_by(game_id=game_id).all()
-    properties = Property.query.filter_by(game_id=game_id).all()
-    
-    return jsonify({
-        'status': game.status,
-        'current_player_id': game.current_player_id,
-        'max_players': game.max_players,
-        'players': [{
-            'id': p.id,
-            'user_id': p.user_id,
-            'balance': p.balance,
-            'position': p.position,
-            'in_jail': p.in_jail,
-            'is_bankrupt': p.is_bankrupt,
-            'username': p.username
-        } for p in players],
-        'properties': [{
-            'id': prop.id,
-            'name': prop.name,
-            'position': prop.position,
-            'price': prop.price,
-            'owner_id': prop.owner_id,
-            'is_mortgaged': prop.is_mortgaged,
-            'houses': prop.houses,
-            'color_group': prop.color_group
-        } for prop in properties]
-    }), 200
-@app.route('/games/<int:game_id>)', methods=['DELETE'])
+    return response, 200
+
+@api.route('/games/<int:game_id>/stats', methods=['GET'])
+@jwt_required()
+def get_game_stats(game_id):
+    """
+    Running statistics of a game.
+    ---
+    tags:
+      - Game
+    parameters:
+      - in: path
+        name: game_id
+        required: true
+        type: integer
+    responses:
+      200:
+        description: Counters kept up to date as moves are made
+        schema:
+          type: object
+          properties:
+            game_id:
+              type: integer
+            turns:
+              type: integer
+            landings:
+              type: array
+              description: Landings per board position
+              items:
+                type: integer
+            players:
+              type: array
+              items:
+                type: object
+                properties:
+                  player_id:
+                    type: integer
+                  turns:
+                    type: integer
+                  doubles:
+                    type: integer
+                  jail_visits:
+                    type: integer
+                  jail_fines_paid:
+                    type: integer
+                    description: Dollars paid in jail fines
+                  rent_paid:
+                    type: integer
+                    description: Dollars of rent due on landings
+                  rent_received:
+                    type: integer
+                    description: Dollars of rent due to the player
+                  properties_bought:
+                    type: integer
+                  cards_drawn:
+                    type: integer
+                  trades:
+                    type: integer
+                  auctions_won:
+                    type: integer
+      404:
+        description: Game not found
+    """
+    if not db.session.get(Game, game_id):
+        return jsonify({'message': 'Game not found'}), 404
+    return jsonify(game_stats(game_id)), 200
+
+@api.route('/games/<int:game_id>)', methods=['DELETE'])
 def delete_game(game_id):
     """
     Delete a game.
@@ -679,8 +1184,372 @@ def delete_game(game_id):
     db.session.commit()
     
 
+@api.route('/games/<int:game_id>/bots', methods=['POST'])
+@jwt_required()
+def add_bots(game_id):
+    """
+    Fill empty seats of a waiting game with bots.
+    Bots play their turns and bid in auctions on the server.
+    ---
+    tags:
+      - Game
+    parameters:
+      - in: path
+        name: game_id
+        required: true
+        type: integer
+      - in: query
+        name: count
+        required: false
+        type: integer
+        description: Number of bots to add (defaults to all empty seats)
+    responses:
+      200:
+        description: Bots joined
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            player_ids:
+              type: array
+              items:
+                type: integer
+      404:
+        description: Game not found
+      403:
+        description: Not in game
+      400:
+        description: Game already started or full
+    """
+    user_id = int(get_jwt_identity())
+    game = Game.query.get(game_id)
+    if not game:
+        return jsonify({'message': 'Game not found'}), 404
+
+    if not Player.query.filter_by(user_id=user_id, game_id=game_id).first():
+        return jsonify({'message': 'Not in game'}), 403
+
+    if game.status != 'waiting':
+        return jsonify({'message': 'Game already started'}), 400
+
+    free_seats = game.max_players - len(game.players)
+    count = request.args.get('count', default=free_seats, type=int)
+    if count < 1 or count > free_seats:
+        return jsonify({'message': f'Only {free_seats} seats left'}), 400
+
+    bots = []
+    for _ in range(count):
+        user = bot_user(game_id)
+        bot = Player(user_id=user.id, username=user.username, game_id=game_id, balance=1500, is_bot=True)
+        db.session.add(bot)
+        db.session.flush()
+        bots.append(bot)
+    db.session.commit()
+    return jsonify({'message': 'Bots joined', 'player_ids': [bot.id for bot in bots]}), 200
+
+@api.route('/bots/stats', methods=['GET'])
+@operator_required
+def get_bot_stats():
+    """
+    Get bot worker pool statistics. Operators only.
+    ---
+    tags:
+      - Game
+    responses:
+      200:
+        description: Pool size, queue depth and job latency percentiles
+        schema:
+          type: object
+          properties:
+            pool_size:
+              type: integer
+            pending:
+              type: integer
+            jobs:
+              type: integer
+            errors:
+              type: integer
+            queue_wait_ms:
+              type: object
+            run_time_ms:
+              type: object
+      403:
+        description: Operators only
+    """
+    return jsonify(bot_pool.stats()), 200
+
+### Matchmaking Endpoints ###
+@api.route('/matchmaking/queue', methods=['POST'])
+@jwt_required()
+def join_matchmaking():
+    """
+    Queue for a game.
+    Users are seated as soon as a table of the requested size fills up.
+    ---
+    tags:
+      - Matchmaking
+    parameters:
+      - in: query
+        name: max_players
+        required: false
+        type: integer
+        description: Table size (2-8, default 4)
+    responses:
+      201:
+        description: Matched into a started game
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+            game_id:
+              type: integer
+            player_id:
+              type: integer
+      202:
+        description: Queued, poll GET /matchmaking/queue for the assignment
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+            max_players:
+              type: integer
+            position:
+              type: integer
+            waiting:
+              type: integer
+      400:
+        description: Invalid table size
+    """
+    max_players = request.args.get('max_players', default=4, type=int)
+    if not 2 <= max_players <= 8:
+        return jsonify({'message': 'max_players must be between 2 and 8'}), 400
+
+    result = matchmaking.enqueue(int(get_jwt_identity()), max_players)
+    return jsonify(result), 201 if result['status'] == 'matched' else 202
+
+@api.route('/matchmaking/queue', methods=['GET'])
+@jwt_required()
+def get_matchmaking_status():
+    """
+    Get the caller's matchmaking status.
+    ---
+    tags:
+      - Matchmaking
+    responses:
+      200:
+        description: Queue position, or the assigned game once matched
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+            game_id:
+              type: integer
+            player_id:
+              type: integer
+            position:
+              type: integer
+      404:
+        description: Not queued
+    """
+    result = matchmaking.poll(int(get_jwt_identity()))
+    if not result:
+        return jsonify({'message': 'Not in queue'}), 404
+    return jsonify(result), 200
+
+@api.route('/matchmaking/queue', methods=['DELETE'])
+@jwt_required()
+def leave_matchmaking():
+    """
+    Leave the matchmaking queue.
+    ---
+    tags:
+      - Matchmaking
+    responses:
+      200:
+        description: Left the queue
+      404:
+        description: Not queued
+    """
+    if not matchmaking.leave(int(get_jwt_identity())):
+        return jsonify({'message': 'Not in queue'}), 404
+    return jsonify({'message': 'Left queue'}), 200
+
+### Tournament Endpoints ###
+@api.route('/tournaments', methods=['POST'])
+@operator_required
+def create_tournament():
+    """
+    Create a tournament (operators only).
+    ---
+    tags:
+      - Tournament
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            name:
+              type: string
+    responses:
+      201:
+        description: Tournament created
+        schema:
+          type: object
+          properties:
+            tournament_id:
+              type: integer
+      400:
+        description: Missing name
+      403:
+        description: Operators only
+    """
+    name = (request.get_json(silent=True) or {}).get('name')
+    if not isinstance(name, str) or not name.strip():
+        return jsonify({'message': 'Tournament name is required'}), 400
+    tournament = Tournament(name=name.strip()[:100])
+    db.session.add(tournament)
+    db.session.commit()
+    return jsonify({'message': 'Tournament created', 'tournament_id': tournament.id}), 201
+
+@api.route('/tournaments/<int:tournament_id>/rounds', methods=['POST'])
+@operator_required
+def create_tournament_round(tournament_id):
+    """
+    Start a tournament round from a seating plan (operators only).
+    Every game, seat and property set of the round is created in one
+    transaction with a few bulk statements, and all games start at once.
+    ---
+    tags:
+      - Tournament
+    parameters:
+      - in: path
+        name: tournament_id
+        required: true
+        type: integer
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            round:
+              type: integer
+              description: Round number, 1-32767 (defaults to the next one)
+            max_players:
+              type: integer
+              description: Table size (2-8, default 4)
+            tables:
+              type: array
+              description: User ids per table, in turn order
+              items:
+                type: array
+                items:
+                  type: integer
+    responses:
+      201:
+        description: Round started
+        schema:
+          type: object
+          properties:
+            tournament_id:
+              type: integer
+            round:
+              type: integer
+            games:
+              type: array
+              items:
+                type: object
+                properties:
+                  game_id:
+                    type: integer
+                  player_ids:
+                    type: array
+                    items:
+                      type: integer
+      400:
+        description: Invalid seating plan or round already started
+      403:
+        description: Operators only
+      404:
+        description: Tournament not found
+    """
+    if not db.session.get(Tournament, tournament_id):
+        return jsonify({'message': 'Tournament not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    max_players = data.get('max_players', 4)
+    tables = data.get('tables')
+    # type() rather than isinstance(), which lets booleans through as ints
+    if type(max_players) is not int or not 2 <= max_players <= 8:
+        return jsonify({'message': 'max_players must be between 2 and 8'}), 400
+    if not isinstance(tables, list) or not tables or not all(
+        isinstance(table, list) and all(type(user_id) is int for user_id in table) for table in tables
+    ):
+        return jsonify({'message': 'tables must be a non-empty list of user id lists'}), 400
+    if any(not 2 <= len(table) <= max_players for table in tables):
+        return jsonify({'message': f'Every table needs 2 to {max_players} players'}), 400
+
+    user_ids = [user_id for table in tables for user_id in table]
+    if len(set(user_ids)) != len(user_ids):
+        return jsonify({'message': 'A user can only sit at one table per round'}), 400
+    users = {
+        user.id: user for user in
+        db.session.execute(db.select(User.id, User.username).where(User.id.in_(user_ids)))
+    }
+    missing = sorted(set(user_ids) - set(users))
+    if missing:
+        return jsonify({'message': f'Unknown users: {missing[:20]}'}), 400
+
+    last_round = db.session.query(db.func.max(TournamentRound.round)).filter(
+        TournamentRound.tournament_id == tournament_id
+    ).scalar()
+    round_number = data.get('round', (last_round or 0) + 1)
+    if type(round_number) is not int or not 1 <= round_number <= MAX_ROUND:
+        return jsonify({'message': f'round must be between 1 and {MAX_ROUND}'}), 400
+
+    # The round's key is claimed first, so of two requests for the same
+    # round only one gets past this flush
+    db.session.add(TournamentRound(tournament_id=tournament_id, round=round_number))
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': f'Round {round_number} already started'}), 400
+
+    try:
+        games = provision_games(
+            [[users[user_id] for user_id in table] for table in tables],
+            max_players=max_players, tournament_id=tournament_id, round=round_number
+        )
+        seated = [
+            {'game_id': game.id, 'player_ids': [player.id for player in players]}
+            for game, players in games
+        ]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Reload the committed games with their seats in two queries rather
+    # than letting the timers and their listeners load them one by one
+    for game in Game.query.options(db.selectinload(Game.players)).filter(
+        Game.id.in_([table['game_id'] for table in seated])
+    ):
+        arm_game_timers(game)
+    return jsonify({
+        'tournament_id': tournament_id,
+        'round': round_number,
+        'games': seated
+    }), 201
+
 ### Gameplay Endpoints ###
-@app.route('/games/<int:game_id>/roll', methods=['POST'])
+@api.route('/games/<int:game_id>/roll', methods=['POST'])
 @jwt_required()
 def roll_dice(game_id):
     """
@@ -727,12 +1596,19 @@ def roll_dice(game_id):
                   type: integer
                 rent_due:
                   type: integer
+            message:
+              type: string
+              description: Still in jail when a jailed player stays in, and the turn passes on
+            jail_turns:
+              type: integer
+      400:
+        description: Third turn in jail and the $50 fine cannot be paid; nothing changes
       403:
         description: Not your turn
       404:
         description: Game or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     game = Game.query.get(game_id)
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
@@ -741,90 +1617,14 @@ def roll_dice(game_id):
         
     if game.current_player_id != player.id:
         return jsonify({'message': 'Not your turn'}), 403
-        
-    # Roll dice
-    dice1 = random.randint(1, 6)
-    dice2 = random.randint(1, 6)
-    total = dice1 + dice2
-    double = dice1 == dice2
-    
-    # Handle jail
-    if player.in_jail:
-        if double:
-            player.in_jail = False
-            player.jail_turns = 0
-        else:
-            player.jail_turns += 1
-            if player.jail_turns >= 3:
-                player.in_jail = False
-                player.jail_turns = 0
-                if not transfer_funds(player, None, 50):  # Pay $50 to get out
-                    return jsonify({'message': 'Cannot pay to get out of jail'}), 400
-            db.session.commit()
-            return jsonify({
-                'message': 'Still in jail',
-                'dice': [dice1, dice2],
-                'jail_turns': player.jail_turns
-            }), 200
-    
-    # Move player
-    new_position = (player.position + total) % 40
-    player.position = new_position
-    
-    # Check for passing Go
-    if (player.position + total) >= 40:
-        player.balance += 200
-        record_game_history(game_id, player.id, 'passed_go', 'Received $200')
-
-    # check if has to pay income tax
-    if player.position == 4:
-      player.balance -= 80
-      record_game_history(game_id, player.id, 'paid_income_tax', 'Paid $80')
-    
-    # Determine next player
-    if not double:
-        players = Player.query.filter_by(game_id=game_id, is_bankrupt=False).order_by(Player.id).all()
-        current_index = next((i for i, p in enumerate(players) if p.id == player.id), 0)
-        next_index = (current_index + 1) % len(players)
-        game.current_player_id = players[next_index].id
-    
-    db.session.commit()
-    
-    # Check property at new position
-    property = Property.query.filter_by(game_id=game_id, position=new_position).first()
-    response = {
-        'dice': [dice1, dice2],
-        'new_position': new_position,
-        'is_double': double
-    }
-    
-    if property:
-        if property.owner_id is None:
-            response.update({
-                'property': {
-                    'id': property.id,
-                    'name': property.name,
-                    'price': property.price,
-                    'position': property.position,
-                    'can_buy': player.balance >= property.price
-                }
-            })
-        elif property.owner_id != player.id:
-            rent = calculate_rent(property, game_id)
-            response.update({
-                'property': {
-                    'id': property.id,
-                    'name': property.name,
-                    'owner_id': property.owner_id,
-                    'position': property.position,
-                    'rent_due': rent
-                }
-            })
-    
-    return jsonify(response), 200
+        
+    response, status = take_roll(game, player)
+    if status == 200:
+        schedule_turn_timeout(game)
+    return jsonify(response), status
 
 ### Property Endpoints ###
-@app.route('/games/<int:game_id>/property/<int:property_id>/buy', methods=['POST'])
+@api.route('/games/<int:game_id>/property/<int:property_id>/buy', methods=['POST'])
 @jwt_required()
 def buy_property(game_id, property_id):
     """
@@ -857,34 +1657,18 @@ def buy_property(game_id, property_id):
       404:
         description: Property or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     property = Property.query.filter_by(id=property_id, game_id=game_id).first()
     # get player from user_id and game id
     player= Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
     if not property or not player:
         return jsonify({'message': 'Property or player not found'}), 404
-        
-    if property.owner_id:
-        return jsonify({'message': 'Property already owned'}), 400
-        
-    if player.balance < property.price:
-        return jsonify({'message': 'Insufficient funds'}), 400
-        
-    if player.position != property.position:
-        return jsonify({'message': 'Not on this property'}), 400
-    
-    if property.price == 0:
-        return jsonify({'message': 'Can not buy this.'}), 400
-        
-    player.balance -= property.price
-    property.owner_id = player.id
-    db.session.commit()
-    
-    record_game_history(game_id, player.id, 'property_purchased', property.name)
-    return jsonify({'message': 'Property purchased'}), 200
 
-@app.route('/games/<int:game_id>/property/<int:property_id>/mortgage', methods=['POST'])
+    response, status = purchase_property(game_id, player, property)
+    return jsonify(response), status
+
+@api.route('/games/<int:game_id>/property/<int:property_id>/mortgage', methods=['POST'])
 @jwt_required()
 def mortgage_property(game_id, property_id):
     """
@@ -917,7 +1701,7 @@ def mortgage_property(game_id, property_id):
       404:
         description: Property or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     property = Property.query.filter_by(id=property_id, game_id=game_id).first()
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
@@ -937,10 +1721,10 @@ def mortgage_property(game_id, property_id):
     player.balance += property.mortgage_value
     db.session.commit()
     
-    record_game_history(game_id, player.id, 'property_mortgaged', property.name)
+    record_game_history(game_id, player.id, 'property_mortgaged', amount=property.mortgage_value, position=property.position)
     return jsonify({'message': 'Property mortgaged'}), 200
 
-@app.route('/games/<int:game_id>/property/<int:property_id>/unmortgage', methods=['POST'])
+@api.route('/games/<int:game_id>/property/<int:property_id>/unmortgage', methods=['POST'])
 @jwt_required()
 def unmortgage_property(game_id, property_id):
     """
@@ -973,7 +1757,7 @@ def unmortgage_property(game_id, property_id):
       404:
         description: Property or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     property = Property.query.filter_by(id=property_id, game_id=game_id).first()    
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
@@ -994,10 +1778,10 @@ def unmortgage_property(game_id, property_id):
     player.balance -= unmortgage_cost
     db.session.commit()
     
-    record_game_history(game_id, player.id, 'property_unmortgaged', property.name)
+    record_game_history(game_id, player.id, 'property_unmortgaged', amount=unmortgage_cost, position=property.position)
     return jsonify({'message': 'Property unmortgaged'}), 200
 
-@app.route('/games/<int:game_id>/property/<int:property_id>/build', methods=['POST'])
+@api.route('/games/<int:game_id>/property/<int:property_id>/build', methods=['POST'])
 @jwt_required()
 def build_house(game_id, property_id):
     """
@@ -1030,7 +1814,7 @@ def build_house(game_id, property_id):
       404:
         description: Property or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     property = Property.query.filter_by(id=property_id, game_id=game_id).first()
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
@@ -1039,37 +1823,11 @@ def build_house(game_id, property_id):
         
     if player.user_id != user_id:
         return jsonify({'message': 'Cannot build for another player'}), 403
-        
-    if property.owner_id != player.id:
-        return jsonify({'message': 'You do not own this property'}), 403
-        
-    if property.is_mortgaged:
-        return jsonify({'message': 'Cannot build on mortgaged property'}), 400
-        
-    # Check if player owns all properties in the color group
-    color_group_properties = Property.query.filter_by(
-        game_id=game_id,
-        color_group=property.color_group
-    ).all()
-    
-    for prop in color_group_properties:
-        if prop.owner_id != player.id:
-            return jsonify({'message': 'You must own all properties in this color group'}), 400
-    
-    if property.houses >= 4:
-        return jsonify({'message': 'Maximum houses already built'}), 400
-        
-    if player.balance < property.house_price:
-        return jsonify({'message': 'Insufficient funds'}), 400
-        
-    player.balance -= property.house_price
-    property.houses += 1
-    db.session.commit()
-    
-    record_game_history(game_id, player.id, 'house_built', property.name)
-    return jsonify({'message': 'House built'}), 200
 
-@app.route('/games/<int:game_id>/property/<int:property_id>/sell_house', methods=['POST'])
+    response, status = build_house_on(game_id, player, property)
+    return jsonify(response), status
+
+@api.route('/games/<int:game_id>/property/<int:property_id>/sell_house', methods=['POST'])
 @jwt_required()
 def sell_house(game_id, property_id):
     """
@@ -1104,7 +1862,7 @@ def sell_house(game_id, property_id):
       404:
         description: Property or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     property = Property.query.filter_by(id=property_id, game_id=game_id).first()
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
@@ -1121,9 +1879,9 @@ def sell_house(game_id, property_id):
         return jsonify({'message': 'No houses to sell'}), 400
         
     # Check if selling would make houses uneven
-    color_group_properties = Property.query.filter_by(
-        game_id=game_id,
-        color_group=property.color_group
+    color_group_properties = Property.query.filter(
+        Property.game_id == game_id,
+        Property.position.in_(GROUP_POSITIONS.get(property.color_group, [property.position]))
     ).all()
     
     for prop in color_group_properties:
@@ -1135,11 +1893,11 @@ def sell_house(game_id, property_id):
     property.houses -= 1
     db.session.commit()
     
-    record_game_history(game_id, player.id, 'house_sold', property.name)
+    record_game_history(game_id, player.id, 'house_sold', amount=sell_price, position=property.position)
     return jsonify({'message': 'House sold', 'amount': sell_price}), 200
 
 ### Trade Endpoints ###
-@app.route('/games/<int:game_id>/trade', methods=['POST'])
+@api.route('/games/<int:game_id>/trade', methods=['POST'])
 @jwt_required()
 def create_trade(game_id):
     """
@@ -1201,7 +1959,7 @@ def create_trade(game_id):
       404:
         description: Game or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     data = request.get_json()
     
     # Verify game and players exist and are in the same game
@@ -1225,6 +1983,7 @@ def create_trade(game_id):
     db.session.add(new_trade)
     db.session.flush()  # To get the trade ID
     
+    trade_items = []
     # Add trade items (offer)
     for item in data['offer']:
         trade_item = TradeItem(
@@ -1234,7 +1993,7 @@ def create_trade(game_id):
             amount=item.get('amount'),
             from_sender=True
         )
-        db.session.add(trade_item)
+        trade_items.append(trade_item)
     
     # Add trade items (request)
     for item in data['request']:
@@ -1245,14 +2004,16 @@ def create_trade(game_id):
             amount=item.get('amount'),
             from_sender=False
         )
-        db.session.add(trade_item)
+        trade_items.append(trade_item)
     
+    db.session.add_all(trade_items)
+    trade_index.add(new_trade, trade_items)
     db.session.commit()
     
-    record_game_history(game_id, sender.id, 'trade_created', f'with player {receiver.id}')
+    record_game_history(game_id, sender.id, 'trade_created', counterparty_id=receiver.id, ref_id=new_trade.id)
     return jsonify({'message': 'Trade created', 'trade_id': new_trade.id}), 201
 
-@app.route('/games/<int:game_id>/trade/<int:trade_id>/accept', methods=['POST'])
+@api.route('/games/<int:game_id>/trade/<int:trade_id>/accept', methods=['POST'])
 @jwt_required()
 def accept_trade(game_id, trade_id):
     """
@@ -1282,8 +2043,13 @@ def accept_trade(game_id, trade_id):
       400:
         description: Cannot accept trade
     """
-    user_id = get_jwt_identity()
-    trade = Trade.query.filter_by(id=trade_id, game_id=game_id).first()
+    user_id = int(get_jwt_identity())
+    # Prefetch the players, items and item properties in one round trip each
+    trade = Trade.query.options(
+        db.joinedload(Trade.sender),
+        db.joinedload(Trade.receiver),
+        db.selectinload(Trade.items).joinedload(TradeItem.property)
+    ).filter_by(id=trade_id, game_id=game_id).first()
     
     if not trade:
         return jsonify({'message': 'Trade not found'}), 404
@@ -1292,11 +2058,13 @@ def accept_trade(game_id, trade_id):
     if trade.receiver.user_id != user_id:
         return jsonify({'message': 'Cannot accept this trade'}), 403
         
+    if trade.status == 'invalidated':
+        return jsonify({'message': 'Trade no longer valid, a property changed hands'}), 400
+
     if trade.status != 'pending':
         return jsonify({'message': 'Trade already processed'}), 400
         
-    # Get all trade items
-    trade_items = TradeItem.query.filter_by(trade_id=trade.id).all()
+    trade_items = trade.items
     
     # Verify trade is still valid (players still own properties, have enough money, etc.)
     for item in trade_items:
@@ -1344,12 +2112,19 @@ def accept_trade(game_id, trade_id):
                 trade.sender.get_out_of_jail_cards += 1
     
     trade.status = 'accepted'
+    trade_index.remove(game_id, trade.id)
+    # Other offers for the same properties are stale now
+    trade_index.properties_changed(
+        game_id, [item.property_id for item in trade_items if item.type == 'property']
+    )
+    count(game_id, trade.sender_id, trades=1)
+    count(game_id, trade.receiver_id, trades=1)
     db.session.commit()
     
-    record_game_history(game_id, trade.receiver_id, 'trade_accepted', f'trade {trade.id}')
+    record_game_history(game_id, trade.receiver_id, 'trade_accepted', counterparty_id=trade.sender_id, ref_id=trade.id)
     return jsonify({'message': 'Trade accepted'}), 200
 
-@app.route('/games/<int:game_id>/trade/<int:trade_id>/reject', methods=['POST'])
+@api.route('/games/<int:game_id>/trade/<int:trade_id>/reject', methods=['POST'])
 @jwt_required()
 def reject_trade(game_id, trade_id):
     """
@@ -1379,7 +2154,7 @@ def reject_trade(game_id, trade_id):
       400:
         description: Cannot reject trade
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     trade = Trade.query.filter_by(id=trade_id, game_id=game_id).first()
     
     if not trade:
@@ -1393,13 +2168,64 @@ def reject_trade(game_id, trade_id):
         return jsonify({'message': 'Trade already processed'}), 400
         
     trade.status = 'rejected'
+    trade_index.remove(game_id, trade.id)
     db.session.commit()
     
-    record_game_history(game_id, trade.receiver_id, 'trade_rejected', f'trade {trade.id}')
+    record_game_history(game_id, trade.receiver_id, 'trade_rejected', counterparty_id=trade.sender_id, ref_id=trade.id)
     return jsonify({'message': 'Trade rejected'}), 200
 
+@api.route('/games/<int:game_id>/trades', methods=['GET'])
+@jwt_required()
+def get_pending_trades(game_id):
+    """
+    List the caller's pending trades.
+    ---
+    tags:
+      - Trade
+    parameters:
+      - in: path
+        name: game_id
+        required: true
+        type: integer
+    responses:
+      200:
+        description: Pending trades sent or received by the caller's player
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+              sender_id:
+                type: integer
+              receiver_id:
+                type: integer
+              created_at:
+                type: string
+              items:
+                type: array
+                items:
+                  type: object
+                  properties:
+                    type:
+                      type: string
+                    property_id:
+                      type: integer
+                    amount:
+                      type: integer
+                    from_sender:
+                      type: boolean
+      404:
+        description: Player not found
+    """
+    player = Player.query.filter_by(user_id=int(get_jwt_identity()), game_id=game_id).first()
+    if not player:
+        return jsonify({'message': 'Player not found'}), 404
+    return jsonify(trade_index.pending_for_player(player)), 200
+
 ### Auction Endpoints ###
-@app.route('/games/<int:game_id>/auction', methods=['POST'])
+@api.route('/games/<int:game_id>/auction', methods=['POST'])
 @jwt_required()
 def start_auction(game_id):
     """
@@ -1432,6 +2258,8 @@ def start_auction(game_id):
               type: string
             auction_id:
               type: integer
+            ends_at:
+              type: string
       404:
         description: Game or property not found
       400:
@@ -1452,11 +2280,17 @@ def start_auction(game_id):
     )
     db.session.add(new_auction)
     db.session.commit()
+    live = auction_book.open(new_auction)
+    bot_pool.submit(('auction', new_auction.id), place_bids, game_id, new_auction.id)
     
-    record_game_history(game_id, None, 'auction_started', f'for property {property.id}')
-    return jsonify({'message': 'Auction started', 'auction_id': new_auction.id}), 201
+    record_game_history(game_id, None, 'auction_started', amount=new_auction.current_bid, position=property.position, ref_id=new_auction.id)
+    return jsonify({
+        'message': 'Auction started',
+        'auction_id': new_auction.id,
+        'ends_at': datetime.utcfromtimestamp(live.deadline).isoformat()
+    }), 201
 
-@app.route('/games/<int:game_id>/auction/<int:auction_id>/bid', methods=['POST'])
+@api.route('/games/<int:game_id>/auction/<int:auction_id>/bid', methods=['POST'])
 @jwt_required()
 def place_bid(game_id, auction_id):
     """
@@ -1483,18 +2317,22 @@ def place_bid(game_id, auction_id):
               type: integer
     responses:
       200:
-        description: Bid placed
+        description: Bid placed. Bids near the deadline extend the auction.
         schema:
           type: object
           properties:
             message:
               type: string
+            current_bid:
+              type: integer
+            ends_at:
+              type: string
       404:
         description: Auction or player not found
       400:
         description: Invalid bid
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     auction = Auction.query.filter_by(id=auction_id, game_id=game_id).first()
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
@@ -1507,20 +2345,18 @@ def place_bid(game_id, auction_id):
     if auction.status != 'active':
         return jsonify({'message': 'Auction not active'}), 400
         
-    if request.json['amount'] <= auction.current_bid:
-        return jsonify({'message': 'Bid must be higher than current bid'}), 400
-        
-    if player.balance < request.json['amount']:
-        return jsonify({'message': 'Insufficient funds'}), 400
-        
-    auction.current_bid = request.json['amount']
-    auction.current_bidder_id = player.id
-    db.session.commit()
-    
-    record_game_history(game_id, player.id, 'auction_bid', f'amount {request.json["amount"]}')
-    return jsonify({'message': 'Bid placed'}), 200
+    amount = (request.get_json(silent=True) or {}).get('amount')
+    if type(amount) is not int or amount <= 0:
+        return jsonify({'message': 'amount must be a positive integer'}), 400
 
-@app.route('/games/<int:game_id>/auction/<int:auction_id>/end', methods=['POST'])
+    # Held in the bid book until the auction is settled
+    result, status = auction_book.bid(auction, player.id, amount)
+    if status == 200:
+        # Give the bots a chance to answer
+        bot_pool.submit(('auction', auction.id), place_bids, game_id, auction.id)
+    return jsonify(result), status
+
+@api.route('/games/<int:game_id>/auction/<int:auction_id>/end', methods=['POST'])
 @jwt_required()
 def end_auction(game_id, auction_id):
     """
@@ -1563,35 +2399,13 @@ def end_auction(game_id, auction_id):
     if auction.status != 'active':
         return jsonify({'message': 'Auction already ended'}), 400
         
-    if not auction.current_bidder_id:
-        # No bids were placed
-        auction.status = 'completed'
-        db.session.commit()
-        return jsonify({'message': 'Auction ended with no winner'}), 200
-    
-    # Transfer property to highest bidder
-    property = Property.query.get(auction.property_id)
-    player = Player.query.get(auction.current_bidder_id)
-    
-    if player.balance < auction.current_bid:
-        return jsonify({'message': 'Bidder cannot afford the bid'}), 400
-        
-    player.balance -= auction.current_bid
-    property.owner_id = player.id
-    auction.status = 'completed'
-    db.session.commit()
-    
-    record_game_history(game_id, player.id, 'auction_won', 
-                       f'property {property.name} for ${auction.current_bid}')
-    return jsonify({
-        'message': 'Auction ended',
-        'winner_id': player.id,
-        'property_id': property.id,
-        'amount': auction.current_bid
-    }), 200
+    # Settle now instead of waiting for the deadline
+    auction_book.get(auction)
+    result, status = auction_book.settle(auction_id, force=True)
+    return jsonify(result), status
 
 ### Card Endpoints ###
-@app.route('/games/<int:game_id>/card/draw', methods=['POST'])
+@api.route('/games/<int:game_id>/card/draw', methods=['POST'])
 @jwt_required()
 def draw_card(game_id):
     """
@@ -1637,7 +2451,7 @@ def draw_card(game_id):
       404:
         description: Game or player not found
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     data = request.get_json()    
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
@@ -1671,6 +2485,10 @@ def draw_card(game_id):
     elif card.action == 'get_out_of_jail':
         player.get_out_of_jail_cards += 1
         message += ". Received Get Out of Jail Free card"
+    count(
+        game_id, player.id, landed=card.position if card.action == 'move' else None,
+        cards_drawn=1, jail_visits=1 if card.action == 'jail' else 0
+    )
     
     db.session.commit()
     record_game_history(game_id, player.id, 'card_drawn', card.title)
@@ -1687,7 +2505,7 @@ def draw_card(game_id):
     }), 200
 
 ### Jail Endpoints ###
-@app.route('/games/<int:game_id>/jail/pay', methods=['POST'])
+@api.route('/games/<int:game_id>/jail/pay', methods=['POST'])
 @jwt_required()
 def pay_jail_fine(game_id):
     """
@@ -1716,7 +2534,7 @@ def pay_jail_fine(game_id):
       400:
         description: Cannot pay jail fine
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
     if not player:
@@ -1734,12 +2552,13 @@ def pay_jail_fine(game_id):
     player.in_jail = False
     player.jail_turns = 0
     player.balance -= 50
+    count(game_id, player.id, jail_fines_paid=50)
     db.session.commit()
     
-    record_game_history(game_id, player.id, 'paid_jail_fine')
+    record_game_history(game_id, player.id, 'paid_jail_fine', amount=50)
     return jsonify({'message': 'Paid $50 to get out of jail'}), 200
 
-@app.route('/games/<int:game_id>/jail/use_card', methods=['POST'])
+@api.route('/games/<int:game_id>/jail/use_card', methods=['POST'])
 @jwt_required()
 def use_jail_card(game_id):
     """
@@ -1768,7 +2587,7 @@ def use_jail_card(game_id):
       400:
         description: Cannot use jail card
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
     if not player:
@@ -1792,7 +2611,7 @@ def use_jail_card(game_id):
     return jsonify({'message': 'Used Get Out of Jail Free card'}), 200
 
 ### Bankruptcy Endpoints ###
-@app.route('/games/<int:game_id>/player/bankrupt', methods=['POST'])
+@api.route('/games/<int:game_id>/player/bankrupt', methods=['POST'])
 @jwt_required()
 def declare_bankruptcy(game_id):
     """
@@ -1818,7 +2637,7 @@ def declare_bankruptcy(game_id):
       400:
         description: Cannot declare bankruptcy
     """
-    user_id = get_jwt_identity()    
+    user_id = int(get_jwt_identity())
     player = Player.query.filter_by(user_id=user_id, game_id=game_id).first()
     
     if not player:
@@ -1832,22 +2651,27 @@ def declare_bankruptcy(game_id):
         
     # Transfer all properties to bank (owner_id = None)
     Property.query.filter_by(owner_id=player.id).update({'owner_id': None})
+    trade_index.player_left(game_id, player.id)
     
     # Mark player as bankrupt
     player.is_bankrupt = True
+    game = Game.query.get(game_id)
+    if game.current_player_id == player.id:
+        advance_turn(game, player.id)
     db.session.commit()
+    schedule_turn_timeout(game)
     
     # Check if game should end (only one player left)
     active_players = Player.query.filter_by(game_id=game_id, is_bankrupt=False).count()
     if active_players <= 1:
-        end_game(game_id)
+        finish_game(game)
         return jsonify({'message': 'Bankruptcy declared - game over'}), 200
     
     record_game_history(game_id, player.id, 'declared_bankruptcy')
     return jsonify({'message': 'Bankruptcy declared'}), 200
 
 ### Game Endpoints ###
-@app.route('/games/<int:game_id>/end', methods=['POST'])
+@api.route('/games/<int:game_id>/end', methods=['POST'])
 @jwt_required()
 def end_game(game_id):
     """
@@ -1870,43 +2694,24 @@ def end_game(game_id):
               type: string
             winner_id:
               type: integer
+      400:
+        description: Game already finished
       404:
         description: Game not found
     """
     game = Game.query.get(game_id)
     if not game:
         return jsonify({'message': 'Game not found'}), 404
-        
-    game.status = 'finished'
-    
-    # Determine winner (player with highest net worth)
-    winner = None
-    max_balance = -1
-    
-    for player in Player.query.filter_by(game_id=game_id, is_bankrupt=False).all():
-        # Calculate net worth (balance + property values)
-        net_worth = player.balance
-        properties = Property.query.filter_by(owner_id=player.id).all()
-        for prop in properties:
-            net_worth += prop.price  # Simplified valuation
-            
-        if net_worth > max_balance:
-            max_balance = net_worth
-            winner = player
-    
-    if winner:
-        user = User.query.get(winner.user_id)
-        user.games_played += 1
-        user.games_won += 1
-        db.session.commit()
-    
-    record_game_history(game_id, winner.id if winner else None, 'game_ended')
+    if game.status == 'finished':
+        return jsonify({'message': 'Game already finished'}), 400
+
+    winner = finish_game(game)
     return jsonify({
         'message': 'Game ended',
         'winner_id': winner.id if winner else None
     }), 200
 
-@app.route('/games/<int:game_id>/history', methods=['GET'])
+@api.route('/games/<int:game_id>/history', methods=['GET'])
 @jwt_required()
 def get_game_history(game_id):
     """
@@ -1919,9 +2724,12 @@ def get_game_history(game_id):
         name: game_id
         required: true
         type: integer
+    produces:
+      - application/json
+      - application/vnd.monopoly+binary
     responses:
       200:
-        description: Game history
+        description: Game history. Send Accept application/vnd.monopoly+binary for the compact binary encoding (see codec.py).
         schema:
           type: array
           items:
@@ -1940,23 +2748,104 @@ def get_game_history(game_id):
       404:
         description: Game not found
     """
-    game = Game.query.get(game_id)
-    if not game:
+    binary = wants_binary()
+
+    def compute():
+        game = Game.query.get(game_id)
+        if not game:
+            return None
+        history = GameHistory.query.filter_by(game_id=game_id).order_by(GameHistory.created_at).all()
+        if binary:
+            return encode_history(history)
+        return json_bytes([{
+            'id': h.id,
+            'player_id': h.player_id,
+            'action': h.action,
+            'details': h.details,
+            'timestamp': h.created_at.isoformat()
+        } for h in history])
+
+    response = cached_response(
+        cache.key('history', [f'game:{game_id}'], game_id, int(binary)), compute,
+        mimetype=BINARY_MIMETYPE if binary else 'application/json'
+    )
+    if response is None:
         return jsonify({'message': 'Game not found'}), 404
-        
-    history = GameHistory.query.filter_by(game_id=game_id).order_by(GameHistory.created_at).all()
-    
-    return jsonify([{
-        'id': h.id,
-        'player_id': h.player_id,
-        'action': h.action,
-        'details': h.details,
-        'timestamp': h.created_at.isoformat()
-    } for h in history]), 200
+    response.vary.add('Accept')
+    return response, 200
+
+
+@api.route('/history/export', methods=['GET'])
+@operator_required
+def export_game_history():
+    """
+    Export game history across games.
+    ---
+    tags:
+      - Game
+    parameters:
+      - in: query
+        name: from
+        required: false
+        type: string
+        description: Only events at or after this ISO 8601 timestamp
+      - in: query
+        name: to
+        required: false
+        type: string
+        description: Only events before this ISO 8601 timestamp
+      - in: query
+        name: game_id
+        required: false
+        type: array
+        items:
+          type: integer
+        collectionFormat: multi
+        description: Only these games
+      - in: query
+        name: format
+        required: false
+        type: string
+        enum: [ndjson, csv]
+      - in: query
+        name: gzip
+        required: false
+        type: boolean
+    produces:
+      - application/x-ndjson
+      - text/csv
+      - application/gzip
+    responses:
+      200:
+        description: Streamed history rows (id, game_id, player_id, action, details, timestamp)
+      400:
+        description: Invalid format or timestamp
+      403:
+        description: Operators only
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'message': 'Format must be ndjson or csv'}), 400
+    try:
+        start = parse_timestamp(request.args.get('from'))
+        end = parse_timestamp(request.args.get('to'))
+    except ValueError:
+        return jsonify({'message': 'Invalid timestamp'}), 400
+    game_ids = request.args.getlist('game_id', type=int)
+    compress = request.args.get('gzip', 'false').lower() in ('1', 'true')
+
+    chunks = encode_export(history_batches(start, end, game_ids), fmt, compress)
+    filename = 'history.' + fmt + ('.gz' if compress else '')
+    response = current_app.response_class(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else FORMATS[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response, 200
 
 
 # Get all games history of a player
-@app.route('/users/<int:user_id>/history', methods=['GET'])
+@api.route('/users/<int:user_id>/history', methods=['GET'])
 @jwt_required()
 def get_user_history(user_id):
   """
@@ -1994,6 +2883,92 @@ def get_user_history(user_id):
   if not user:
     return jsonify({'message': 'User not found'}), 404
 
+  # Placements only change with the state of the user's games
+  game_ids = sorted(game_id for game_id, in db.session.query(Player.game_id).filter_by(user_id=user_id))
+  key = cache.key('user_history', [f'game:{game_id}' for game_id in game_ids], user_id, *game_ids)
+  return cached_response(key, lambda: json_bytes(user_games_summary(user_id))), 200
+
+
+@api.route('/users/<int:user_id>/games', methods=['GET'])
+@jwt_required()
+def get_user_games(user_id):
+  """
+  Games a user is seated in, for home screens.
+  ---
+  tags:
+    - Users
+  parameters:
+    - in: path
+      name: user_id
+      required: true
+      type: integer
+    - in: query
+      name: active
+      required: false
+      type: boolean
+      description: Only games in progress
+    - in: query
+      name: my_turn
+      required: false
+      type: boolean
+      description: Only games where it is the user's turn
+  responses:
+    200:
+      description: One entry per game, newest first
+      schema:
+        type: array
+        items:
+          type: object
+          properties:
+            game_id:
+              type: integer
+            status:
+              type: string
+            player_id:
+              type: integer
+            current_player_id:
+              type: integer
+            my_turn:
+              type: boolean
+            balance:
+              type: integer
+            position:
+              type: integer
+            is_bankrupt:
+              type: boolean
+    404:
+      description: User not found
+  """
+  if not db.session.get(User, user_id):
+    return jsonify({'message': 'User not found'}), 404
+
+  # One join driven by ix_player_user_game; "my turn" joins on
+  # game.current_player_id, which is indexed as well
+  my_turn = request.args.get('my_turn', 'false').lower() in ('1', 'true')
+  on = Game.current_player_id == Player.id if my_turn else Game.id == Player.game_id
+  query = db.session.query(
+    Game.id, Game.status, Game.current_player_id,
+    Player.id, Player.balance, Player.position, Player.is_bankrupt
+  ).select_from(Player).join(Game, on).filter(Player.user_id == user_id)
+  if request.args.get('active', 'false').lower() in ('1', 'true'):
+    query = query.filter(Game.status == 'active')
+
+  return jsonify([
+    {
+      'game_id': game_id,
+      'status': status,
+      'player_id': player_id,
+      'current_player_id': current_player_id,
+      'my_turn': current_player_id == player_id,
+      'balance': balance,
+      'position': position,
+      'is_bankrupt': is_bankrupt
+    }
+    for game_id, status, current_player_id, player_id, balance, position, is_bankrupt
+    in query.order_by(Game.id.desc())
+  ]), 200
+
+def user_games_summary(user_id):
   # Fetch all games the user participated in
   player_games = Player.query.filter_by(user_id=user_id).all()
 
@@ -2019,10 +2994,10 @@ def get_user_history(user_id):
       'won': placement == 1
     })
 
-  return jsonify(games_summary), 200
+  return games_summary
     
 
-@app.route('/users', methods=['GET'])
+@api.route('/users', methods=['GET'])
 def get_users():
     """
     Get all users.
@@ -2050,15 +3025,156 @@ def get_users():
       400:
         description: Invalid request
     """
-    users = User.query.all()
-    return jsonify([{
+    return stream_json_array(User.query.order_by(User.id), lambda user: {
         'id': user.id,
         'username': user.username,
         'games_played': user.games_played,
         'games_won': user.games_won
-    } for user in users]), 200  
+    }), 200
+
+
+
+### Leaderboard Endpoints ###
+@api.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """
+    Get the top ranked users.
+    ---
+    tags:
+      - Users
+    parameters:
+      - in: query
+        name: limit
+        required: false
+        type: integer
+        description: Number of users to return (default 10, max 100)
+    responses:
+      200:
+        description: Users ordered by games won, then games played
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              rank:
+                type: integer
+              user_id:
+                type: integer
+              username:
+                type: string
+              games_played:
+                type: integer
+              games_won:
+                type: integer
+    """
+    limit = request.args.get('limit', default=10, type=int)
+    limit = max(1, min(limit, 100))
+    return jsonify(leaderboard.top(limit)), 200
+
+@api.route('/users/<int:user_id>/rank', methods=['GET'])
+def get_user_rank(user_id):
+    """
+    Get the leaderboard rank of a user.
+    ---
+    tags:
+      - Users
+    parameters:
+      - in: path
+        name: user_id
+        required: true
+        type: integer
+    responses:
+      200:
+        description: User rank
+        schema:
+          type: object
+          properties:
+            rank:
+              type: integer
+            total_users:
+              type: integer
+            user_id:
+              type: integer
+            username:
+              type: string
+            games_played:
+              type: integer
+            games_won:
+              type: integer
+      404:
+        description: User not found
+    """
+    rank = leaderboard.rank(user_id)
+    if not rank:
+        return jsonify({'message': 'User not found'}), 404
+    return jsonify(rank), 200
+
+### Admin Endpoints ###
+@api.route('/admin/profiles', methods=['GET'])
+@operator_required
+def list_profiles():
+    """
+    List stored request profiles, newest first.
+    ---
+    tags:
+      - Admin
+    responses:
+      200:
+        description: Stored profiles
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: string
+              created_at:
+                type: number
+              request_id:
+                type: string
+              endpoint:
+                type: string
+              duration_ms:
+                type: integer
+      403:
+        description: Operators only
+    """
+    return jsonify(profiler.list()), 200
 
+@api.route('/admin/profiles/<profile_id>', methods=['GET'])
+@operator_required
+def download_profile(profile_id):
+    """
+    Download a request profile.
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: path
+        name: profile_id
+        required: true
+        type: string
+      - in: query
+        name: format
+        required: false
+        type: string
+        enum: [pstats, text]
+        description: pstats file for snakeviz/flameprof (default) or a text summary
+    responses:
+      200:
+        description: The profile
+      403:
+        description: Operators only
+      404:
+        description: Profile not found
+    """
+    path = profiler.path(profile_id)
+    if not path:
+        return jsonify({'message': 'Profile not found'}), 404
+    if request.args.get('format') == 'text':
+        return current_app.response_class(profiler.summary(path), mimetype='text/plain'), 200
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=profile_id + '.prof')
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
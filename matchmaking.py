@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Game, MatchmakingTicket
+from provisioning import provision_games
+from timeouts import arm_game_timers
+
+
+class MatchmakingQueue:
+    """Waiting users bucketed by table size.
+
+    The queue is the matchmaking_ticket table, so all workers share it. A
+    bucket is turned into games as soon as it can fill a table, or once
+    its oldest user has waited ``max_wait`` seconds and at least two users
+    are waiting. All games formed at once are created in one transaction,
+    which also claims their tickets with conditional UPDATEs: if another
+    worker seated one of the users first, the whole batch is rolled back.
+    An assignment is handed out once; one nobody asked for within
+    ``assignment_ttl`` seconds is dropped (the game stays listed under
+    GET /users/<id>/games).
+    """
+
+    def __init__(self, max_wait=60, min_players=2, assignment_ttl=600):
+        self.max_wait = max_wait
+        self.min_players = min_players
+        self.assignment_ttl = assignment_ttl
+
+    def init_app(self, app):
+        self.max_wait = app.config.get('MATCHMAKING_MAX_WAIT', self.max_wait)
+        self.assignment_ttl = app.config.get('MATCHMAKING_ASSIGNMENT_TTL', self.assignment_ttl)
+
+    def _ticket(self, user_id):
+        ticket = MatchmakingTicket.query.filter_by(user_id=user_id).first()
+        if ticket is not None and ticket.game_id is not None and self._expired(ticket.assigned_at):
+            return None
+        return ticket
+
+    def _expired(self, assigned_at):
+        return assigned_at < datetime.utcnow() - timedelta(seconds=self.assignment_ttl)
+
+    def _hand_out(self, ticket):
+        """Return a ticket's assignment, once: the ticket is deleted."""
+        assignment = {'status': 'matched', 'game_id': ticket.game_id, 'player_id': ticket.player_id}
+        taken = MatchmakingTicket.query.filter_by(id=ticket.id).delete()
+        db.session.commit()
+        # None when a concurrent request of the same user read it first
+        return assignment if taken else None
+
+    def enqueue(self, user_id, max_players):
+        ticket = self._ticket(user_id)
+        if ticket is not None and ticket.game_id is not None:
+            return self._hand_out(ticket)
+        # Joining again (or for another table size) goes to the back
+        MatchmakingTicket.query.filter_by(user_id=user_id).delete()
+        db.session.add(MatchmakingTicket(user_id=user_id, max_players=max_players))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request of the same user queued them first
+            db.session.rollback()
+        self.match(max_players)
+        return self.status(user_id)
+
+    def poll(self, user_id):
+        ticket = self._ticket(user_id)
+        if ticket is not None and ticket.game_id is None:
+            self.match(ticket.max_players)
+        return self.status(user_id)
+
+    def leave(self, user_id):
+        left = MatchmakingTicket.query.filter_by(user_id=user_id, game_id=None).delete()
+        db.session.commit()
+        return bool(left)
+
+    def status(self, user_id):
+        ticket = self._ticket(user_id)
+        if ticket is None:
+            return None
+        if ticket.game_id is not None:
+            return self._hand_out(ticket)
+        bucket = MatchmakingTicket.query.filter_by(max_players=ticket.max_players, game_id=None)
+        return {
+            'status': 'queued',
+            'max_players': ticket.max_players,
+            'position': bucket.filter(MatchmakingTicket.id < ticket.id).count() + 1,
+            'waiting': bucket.count()
+        }
+
+    def _take_tables(self, waiting, max_players, now):
+        """Split (user_id, enqueued_at) pairs in queue order into tables."""
+        tables = []
+        while len(waiting) >= max_players:
+            tables.append([user_id for user_id, _ in waiting[:max_players]])
+            waiting = waiting[max_players:]
+        if len(waiting) >= self.min_players:
+            if (now - waiting[0][1]).total_seconds() >= self.max_wait:
+                tables.append([user_id for user_id, _ in waiting])
+        return tables
+
+    def match(self, max_players):
+        """Turn every full (or timed out) table of a bucket into a game."""
+        now = datetime.utcnow()
+        MatchmakingTicket.query.filter(
+            MatchmakingTicket.assigned_at < now - timedelta(seconds=self.assignment_ttl)
+        ).delete()
+        rows = db.session.query(
+            MatchmakingTicket.id, MatchmakingTicket.user_id, MatchmakingTicket.enqueued_at, User.id
+        ).outerjoin(User, User.id == MatchmakingTicket.user_id).filter(
+            MatchmakingTicket.max_players == max_players,
+            MatchmakingTicket.game_id.is_(None)
+        ).order_by(MatchmakingTicket.id).all()
+        # Tickets of deleted accounts leave the queue
+        gone = [ticket_id for ticket_id, _, _, found in rows if found is None]
+        if gone:
+            MatchmakingTicket.query.filter(MatchmakingTicket.id.in_(gone)).delete()
+        tables = self._take_tables(
+            [(user_id, enqueued_at) for _, user_id, enqueued_at, found in rows if found is not None],
+            max_players, now
+        )
+        if not tables:
+            db.session.commit()
+            return []
+
+        try:
+            user_ids = [user_id for table in tables for user_id in table]
+            users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+            seatings = [[users[user_id] for user_id in table if user_id in users] for table in tables]
+            games = provision_games(
+                [seating for seating in seatings if len(seating) >= self.min_players],
+                max_players=max_players
+            )
+            for game, players in games:
+                for player in players:
+                    claimed = MatchmakingTicket.query.filter_by(user_id=player.user_id, game_id=None).update(
+                        {'game_id': game.id, 'player_id': player.id, 'assigned_at': now}
+                    )
+                    if not claimed:
+                        # Seated by another worker; it also formed these tables
+                        db.session.rollback()
+                        return []
+            game_ids = [game.id for game, _ in games]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # Reload the new games with their seats in two queries, not one per game
+        for game in Game.query.options(db.selectinload(Game.players)).filter(Game.id.in_(game_ids)):
+            arm_game_timers(game)
+        return games
+
+
+matchmaking = MatchmakingQueue()
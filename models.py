@@ -1,5 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import event
+
+from board import SQUARES
+from events import Code, GAME_STATUSES, TRADE_STATUSES, AUCTION_STATUSES, EVENT_TYPES, describe
 
 db = SQLAlchemy()
 
@@ -10,17 +14,39 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     games_played = db.Column(db.Integer, default=0)
     games_won = db.Column(db.Integer, default=0)
+    # Accounts created for server-side bots; kept off the leaderboard
+    is_bot = db.Column(db.Boolean, default=False)
+
+class Tournament(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    games = db.relationship('Game', backref='tournament', lazy=True)
+
+class TournamentRound(db.Model):
+    # One row per started round; its key stops two requests starting the same round
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), primary_key=True)
+    round = db.Column(db.SmallInteger, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Game(db.Model):
+    __table_args__ = (db.Index('ix_game_tournament_round', 'tournament_id', 'round'),)
     id = db.Column(db.Integer, primary_key=True)
-    status = db.Column(db.String(20), default='waiting')  # waiting, active, finished
+    status = db.Column(Code(GAME_STATUSES), default='waiting', index=True)
     max_players = db.Column(db.Integer, default=4)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    current_player_id = db.Column(db.Integer)
+    current_player_id = db.Column(db.Integer, index=True)
+    # Written by every worker; the idle timer checks it before ending a game
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set for games provisioned as a tournament round
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'))
+    round = db.Column(db.SmallInteger)
     players = db.relationship('Player', backref='game', lazy=True)
     properties = db.relationship('Property', backref='game', lazy=True)
 
 class Player(db.Model):
+    # A user's seats, and through game_id their games, without a table scan
+    __table_args__ = (db.Index('ix_player_user_game', 'user_id', 'game_id'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     username = db.Column(db.String(80), nullable=False)
@@ -32,36 +58,106 @@ class Player(db.Model):
     get_out_of_jail_cards = db.Column(db.Integer, default=0)
     properties = db.relationship('Property', backref='owner', lazy=True)
     is_bankrupt = db.Column(db.Boolean, default=False)
+    is_bot = db.Column(db.Boolean, default=False)
 
-class Property(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
-    owner_id = db.Column(db.Integer, db.ForeignKey('player.id'))
+class MatchmakingTicket(db.Model):
+    # A user waiting for a matchmaking table, or matched and not told yet.
+    # The queue lives here so that every worker sees the same one.
+    __table_args__ = (db.Index('ix_matchmaking_ticket_bucket', 'max_players', 'game_id'),)
+    id = db.Column(db.Integer, primary_key=True)  # queue order
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True, nullable=False)
+    max_players = db.Column(db.SmallInteger, nullable=False)
+    enqueued_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    game_id = db.Column(db.Integer)
+    player_id = db.Column(db.Integer)
+    assigned_at = db.Column(db.DateTime, index=True)
+
+class BoardSquare(db.Model):
+    # Static board catalog shared by every game, seeded from properties.json
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
     name = db.Column(db.String(50), nullable=False)
-    position = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Integer, nullable=False)
     rent = db.Column(db.Integer, nullable=False)
     mortgage_value = db.Column(db.Integer, nullable=False)
+    color_group = db.Column(db.String(20))
+    house_price = db.Column(db.Integer, default=0)
+
+@event.listens_for(BoardSquare.__table__, 'after_create')
+def seed_board(table, connection, **kw):
+    connection.execute(table.insert(), SQUARES)
+
+def _square_field(field):
+    return property(lambda self: SQUARES[self.position][field])
+
+class Property(db.Model):
+    # Per-game state of a square; the static fields live in BoardSquare
+    __table_args__ = (db.UniqueConstraint('game_id', 'position'),)
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('player.id'))
+    position = db.Column(db.Integer, db.ForeignKey('board_square.position'), nullable=False)
     is_mortgaged = db.Column(db.Boolean, default=False)
     houses = db.Column(db.Integer, default=0)
-    color_group = db.Column(db.String(20))
-    house_price = db.Column(db.Integer, default=50)
+    square = db.relationship('BoardSquare')
+
+    # Read from the in-memory catalog, so no join is needed
+    name = _square_field('name')
+    price = _square_field('price')
+    rent = _square_field('rent')
+    mortgage_value = _square_field('mortgage_value')
+    color_group = _square_field('color_group')
+    house_price = _square_field('house_price')
 
 class GameHistory(db.Model):
+    __table_args__ = (db.Index('ix_game_history_game_action', 'game_id', 'action'),)
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
     player_id = db.Column(db.Integer, db.ForeignKey('player.id'))
-    action = db.Column(db.String(50), nullable=False)
-    details = db.Column(db.String(200))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    action = db.Column(Code(EVENT_TYPES), nullable=False)
+    # Typed payload; which fields are set depends on the action
+    amount = db.Column(db.Integer)
+    position = db.Column(db.SmallInteger)
+    counterparty_id = db.Column(db.Integer, db.ForeignKey('player.id'))
+    ref_id = db.Column(db.Integer)  # trade or auction id
+    # Free text, only for payloads with no typed field (e.g. a card title)
+    note = db.Column('details', db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    @property
+    def details(self):
+        return describe(self)
+
+class PlayerStats(db.Model):
+    # Running counters of a player, kept up to date by the moves themselves
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    turns = db.Column(db.Integer, nullable=False, default=0)
+    doubles = db.Column(db.Integer, nullable=False, default=0)
+    jail_visits = db.Column(db.Integer, nullable=False, default=0)
+    jail_fines_paid = db.Column(db.Integer, nullable=False, default=0)  # dollars
+    rent_paid = db.Column(db.Integer, nullable=False, default=0)        # dollars
+    rent_received = db.Column(db.Integer, nullable=False, default=0)    # dollars
+    properties_bought = db.Column(db.Integer, nullable=False, default=0)
+    cards_drawn = db.Column(db.Integer, nullable=False, default=0)
+    trades = db.Column(db.Integer, nullable=False, default=0)
+    auctions_won = db.Column(db.Integer, nullable=False, default=0)
+
+class SquareStats(db.Model):
+    # Landings on one board position of a game
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), primary_key=True)
+    position = db.Column(db.SmallInteger, primary_key=True)
+    landings = db.Column(db.Integer, nullable=False, default=0)
 
 class Trade(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, accepted, rejected
+    status = db.Column(Code(TRADE_STATUSES), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sender = db.relationship('Player', foreign_keys=[sender_id])
+    receiver = db.relationship('Player', foreign_keys=[receiver_id])
+    items = db.relationship('TradeItem', backref='trade', lazy=True)
 
 class TradeItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -70,6 +166,7 @@ class TradeItem(db.Model):
     property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
     amount = db.Column(db.Integer)
     from_sender = db.Column(db.Boolean)  # True if item is from sender to receiver
+    property = db.relationship('Property')
 
 class Auction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -77,7 +174,7 @@ class Auction(db.Model):
     property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
     current_bid = db.Column(db.Integer, nullable=False)
     current_bidder_id = db.Column(db.Integer, db.ForeignKey('player.id'))
-    status = db.Column(db.String(20), default='active')  # active, completed
+    status = db.Column(Code(AUCTION_STATUSES), default='active')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Card(db.Model):
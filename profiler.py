@@ -0,0 +1,106 @@
+"""Opt-in cProfile capture for individual requests.
+
+A request is profiled when an operator sends ``X-Profile: 1`` or when it
+falls into the PROFILE_SAMPLE_RATE share of all requests. The profile
+covers the view and the request hooks around it and is written as a
+pstats file named after the time, request id and endpoint, so every
+worker writing to the same PROFILE_DIR shows up in one listing.
+"""
+import cProfile
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from io import StringIO
+
+from flask import g, request
+
+from admin import is_operator
+
+PROFILE_HEADER = 'X-Profile'
+_NAME = re.compile(r'^(\d+)_([0-9A-Za-z-]+)_([\w.]+)_(\d+)\.prof$')
+
+
+class Profiler:
+    def __init__(self):
+        self.directory = None
+        self.sample_rate = 0.0
+        self.keep = 200
+
+    def init_app(self, app):
+        self.directory = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+        self.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+        self.keep = app.config['PROFILE_KEEP']
+        app.before_request(self._start)
+        app.after_request(self._stop)
+
+    def _wanted(self):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return request.headers.get(PROFILE_HEADER) == '1' and is_operator()
+
+    def _start(self):
+        if not self._wanted():
+            return
+        g.profile = cProfile.Profile()
+        g.profile_started = time.perf_counter()
+        g.profile.enable()
+
+    def _stop(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+        duration_ms = int((time.perf_counter() - g.pop('profile_started')) * 1000)
+
+        request_id = re.sub(r'[^0-9A-Za-z-]', '', request.headers.get('X-Request-ID', ''))[:64] or uuid.uuid4().hex
+        name = f'{int(time.time() * 1000)}_{request_id}_{request.endpoint or "none"}_{duration_ms}.prof'
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(os.path.join(self.directory, name))
+        self._prune()
+
+        response.headers['X-Profile-Id'] = name[:-len('.prof')]
+        return response
+
+    def _prune(self):
+        names = sorted(name for name in os.listdir(self.directory) if _NAME.match(name))
+        for name in names[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def list(self):
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            match = _NAME.match(name)
+            if match:
+                created_ms, request_id, endpoint, duration_ms = match.groups()
+                profiles.append({
+                    'id': name[:-len('.prof')],
+                    'created_at': int(created_ms) / 1000,
+                    'request_id': request_id,
+                    'endpoint': endpoint,
+                    'duration_ms': int(duration_ms)
+                })
+        return profiles
+
+    def path(self, profile_id):
+        """File of a stored profile, or None if there is no such profile."""
+        name = profile_id + '.prof'
+        if not _NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+    def summary(self, path, limit=50):
+        out = StringIO()
+        pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+profiler = Profiler()
@@ -0,0 +1,50 @@
+from cache import cache
+from models import db, Game, Player, Property, GameHistory
+from board import CATALOG
+
+
+def property_rows(game_id):
+    """Rows for a game's 40 properties, ready for a bulk insert."""
+    return [{'game_id': game_id, 'position': prop['position']} for prop in CATALOG]
+
+
+def provision_games(tables, max_players=4, start=True, **game_fields):
+    """Create one game per table of users with a handful of bulk statements.
+
+    ``tables`` is a list of seatings, each a list of User rows in turn
+    order. Started games get their properties and the first player's turn.
+    Returns (game, players) pairs. Nothing is committed, so the caller
+    decides the transaction boundary.
+    """
+    if not tables:
+        return []
+    games = [
+        Game(max_players=max_players, status='active' if start else 'waiting', **game_fields)
+        for _ in tables
+    ]
+    db.session.add_all(games)
+    db.session.flush()
+
+    seats = []
+    for game, users in zip(games, tables):
+        seats.append([
+            Player(user_id=user.id, username=user.username, game_id=game.id, balance=1500)
+            for user in users
+        ])
+    db.session.add_all([player for players in seats for player in players])
+    db.session.flush()
+
+    if start:
+        for game, players in zip(games, seats):
+            game.current_player_id = players[0].id
+        db.session.execute(
+            db.insert(Property),
+            [row for game in games for row in property_rows(game.id)]
+        )
+        db.session.execute(
+            db.insert(GameHistory),
+            [{'game_id': game.id, 'player_id': None, 'action': 'game_started'} for game in games]
+        )
+        cache.touch(['game:%d' % game.id for game in games])
+
+    return list(zip(games, seats))
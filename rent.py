@@ -0,0 +1,94 @@
+"""Rent lookup tables precomputed from the board catalog.
+
+Every rent the rules can ask for is stored in one flat table indexed by
+(position, houses, monopoly, owned), where ``owned`` is how many
+railroads or utilities the owner holds. Resolving rent is a single
+index computation; utilities store their dice multiplier instead of a
+fixed amount.
+"""
+from array import array
+from collections import Counter
+
+from board import CATALOG
+
+MAX_HOUSES = 4
+MAX_OWNED = 4
+SQUARES = len(CATALOG)
+
+_HOUSE_KEYS = ('rent', 'rent_with_1_house', 'rent_with_2_houses', 'rent_with_3_houses', 'rent_with_hotel')
+_RAILROAD_KEYS = (None, 'rent', 'rent_with_2_railroads', 'rent_with_3_railroads', 'rent_with_4_railroads')
+_UTILITY_KEYS = (None, 'rent', 'rent_with_2_utilities')
+
+GROUPS = [prop.get('color_group') for prop in CATALOG]
+GROUP_SIZES = Counter(group for group in GROUPS if group)
+UTILITIES = frozenset(prop['position'] for prop in CATALOG if prop.get('color_group') == 'utility')
+
+
+def _amount(prop, key):
+    if key is None or key not in prop:
+        return 0
+    value = prop[key]
+    if isinstance(value, str):
+        # Utilities are written as e.g. "4x dice roll"
+        return int(value.split('x', 1)[0])
+    return value
+
+
+def _rent(prop, houses, monopoly, owned):
+    group = prop.get('color_group')
+    if group == 'railroad':
+        return _amount(prop, _RAILROAD_KEYS[owned])
+    if group == 'utility':
+        return _amount(prop, _UTILITY_KEYS[min(owned, 2)])
+    if not group:
+        return 0
+    if houses == 0:
+        return _amount(prop, 'rent') * (2 if monopoly else 1)
+    return _amount(prop, _HOUSE_KEYS[houses])
+
+
+def _index(position, houses, monopoly, owned):
+    return ((position * (MAX_HOUSES + 1) + houses) * 2 + monopoly) * (MAX_OWNED + 1) + owned
+
+
+TABLE = array('i', [
+    _rent(prop, houses, monopoly, owned)
+    for prop in CATALOG
+    for houses in range(MAX_HOUSES + 1)
+    for monopoly in (0, 1)
+    for owned in range(MAX_OWNED + 1)
+])
+
+
+def lookup(position, houses, monopoly, owned, dice_total=0):
+    rent = TABLE[_index(position, houses, int(monopoly), owned)]
+    if position in UTILITIES:
+        return rent * dice_total
+    return rent
+
+
+def holdings(properties):
+    """Count owned properties per (owner_id, color_group)."""
+    return Counter((prop.owner_id, GROUPS[prop.position]) for prop in properties if prop.owner_id)
+
+
+def rent_due(prop, held, dice_total=0):
+    """Rent owed for landing on ``prop`` given the game's ``held`` counts."""
+    if not prop.owner_id or prop.is_mortgaged:
+        return 0
+    group = GROUPS[prop.position]
+    owned = held[(prop.owner_id, group)]
+    return lookup(
+        prop.position, prop.houses or 0, owned == GROUP_SIZES[group],
+        min(owned, MAX_OWNED), dice_total
+    )
+
+
+def rent_map(properties, dice_total=7):
+    """Rent due on every square of a game, indexed by position."""
+    properties = list(properties)
+    held = holdings(properties)
+    rents = [0] * SQUARES
+    for prop in properties:
+        rents[prop.position] = rent_due(prop, held, dice_total)
+    return rents
@@ -0,0 +1,254 @@
+import random
+
+from models import db, User, Game, Player, Property, GameHistory
+from leaderboard import leaderboard
+from board import GROUP_POSITIONS
+from cache import cache
+from provisioning import property_rows
+from rent import holdings, rent_due
+from trades import trade_index
+from stats import count
+
+
+def record_game_history(game_id, player_id, action, details=None, **fields):
+    # ``fields`` are the typed columns (amount, position, counterparty_id, ref_id)
+    history = GameHistory(
+        game_id=game_id,
+        player_id=player_id,
+        action=action,
+        note=details,
+        **fields
+    )
+    db.session.add(history)
+    db.session.commit()
+
+def transfer_funds(sender, receiver, amount):
+    if sender.balance < amount:
+        return False
+    sender.balance -= amount
+    if receiver:  # If receiver is None, money goes to bank
+        receiver.balance += amount
+    return True
+
+def calculate_rent(property, game_id, dice_total=0):
+    if not property.owner_id or property.is_mortgaged:
+        return 0
+
+    owned = Property.query.filter(
+        Property.game_id == game_id,
+        Property.owner_id == property.owner_id
+    ).all()
+    return rent_due(property, holdings(owned), dice_total)
+
+def initialize_properties(game_id):
+    # Standard Monopoly properties
+    db.session.execute(db.insert(Property), property_rows(game_id))
+    cache.touch(['game:%d' % game_id])
+    db.session.commit()
+
+def advance_turn(game, current_player_id):
+    """Pass the turn to the next player still in the game."""
+    players = Player.query.filter_by(game_id=game.id, is_bankrupt=False).order_by(Player.id).all()
+    if not players:
+        return None
+    next_player = next((p for p in players if p.id > current_player_id), players[0])
+    game.current_player_id = next_player.id
+    return next_player
+
+def finish_game(game):
+    """Mark a game finished, credit every participant and return the winner.
+
+    Returns None without touching anything when the game already ended:
+    the status is claimed with a conditional UPDATE, so only one of two
+    racing callers credits the players.
+    """
+    claimed = Game.query.filter(Game.id == game.id, Game.status != 'finished').update(
+        {'status': 'finished'}, synchronize_session=False
+    )
+    if not claimed:
+        db.session.rollback()
+        return None
+    game.status = 'finished'
+    
+    # Determine winner (player with highest net worth)
+    winner = None
+    max_balance = -1
+    
+    for player in Player.query.filter_by(game_id=game.id, is_bankrupt=False).all():
+        # Calculate net worth (balance + property values)
+        net_worth = player.balance
+        properties = Property.query.filter_by(owner_id=player.id).all()
+        for prop in properties:
+            net_worth += prop.price  # Simplified valuation
+            
+        if net_worth > max_balance:
+            max_balance = net_worth
+            winner = player
+    
+    # Every participant played the game, only the winner won it. Bot
+    # accounts play many games at once and keep no record.
+    users = User.query.filter(
+        User.id.in_(db.session.query(Player.user_id).filter_by(game_id=game.id)),
+        User.is_bot.isnot(True)
+    ).all()
+    for user in users:
+        user.games_played += 1
+        if winner and user.id == winner.user_id:
+            user.games_won += 1
+    db.session.commit()
+
+    for user in users:
+        leaderboard.update(user)
+    
+    trade_index.drop_game(game.id)
+    record_game_history(game.id, winner.id if winner else None, 'game_ended')
+    return winner
+
+def take_roll(game, player):
+    """Roll for the player whose turn it is and move them.
+
+    A jailed player gets out on a double and moves. Otherwise the turn
+    passes to the next player; on the third failed attempt the $50 fine is
+    paid and the player is released. A player who cannot pay the fine then
+    gets a 400 and nothing changes, so they can raise the money first.
+    """
+    # Roll dice
+    dice1 = random.randint(1, 6)
+    dice2 = random.randint(1, 6)
+    total = dice1 + dice2
+    double = dice1 == dice2
+    
+    # Handle jail
+    if player.in_jail:
+        if double:
+            player.in_jail = False
+            player.jail_turns = 0
+        else:
+            if player.jail_turns + 1 >= 3:
+                # Nothing changes when the fine cannot be paid
+                if not transfer_funds(player, None, 50):  # Pay $50 to get out
+                    return {'message': 'Cannot pay to get out of jail'}, 400
+                player.in_jail = False
+                player.jail_turns = 0
+                count(game.id, player.id, jail_fines_paid=50)
+            else:
+                player.jail_turns += 1
+            # A failed escape attempt ends the turn
+            advance_turn(game, player.id)
+            count(game.id, player.id, turns=1)
+            db.session.commit()
+            return {
+                'message': 'Still in jail',
+                'dice': [dice1, dice2],
+                'jail_turns': player.jail_turns
+            }, 200
+    
+    # Move player
+    new_position = (player.position + total) % 40
+    player.position = new_position
+    
+    # Check for passing Go
+    if (player.position + total) >= 40:
+        player.balance += 200
+        record_game_history(game.id, player.id, 'passed_go', amount=200)
+
+    # check if has to pay income tax
+    if player.position == 4:
+      player.balance -= 80
+      record_game_history(game.id, player.id, 'paid_income_tax', amount=80)
+    
+    # Determine next player
+    if not double:
+        advance_turn(game, player.id)
+    count(game.id, player.id, landed=new_position, turns=0 if double else 1, doubles=1 if double else 0)
+    
+    db.session.commit()
+    
+    # Check property at new position
+    property = Property.query.filter_by(game_id=game.id, position=new_position).first()
+    response = {
+        'dice': [dice1, dice2],
+        'new_position': new_position,
+        'is_double': double
+    }
+    
+    if property:
+        if property.owner_id is None:
+            response.update({
+                'property': {
+                    'id': property.id,
+                    'name': property.name,
+                    'price': property.price,
+                    'position': property.position,
+                    'can_buy': player.balance >= property.price
+                }
+            })
+        elif property.owner_id != player.id:
+            rent = calculate_rent(property, game.id, total)
+            if rent:
+                count(game.id, player.id, rent_paid=rent)
+                count(game.id, property.owner_id, rent_received=rent)
+                db.session.commit()
+            response.update({
+                'property': {
+                    'id': property.id,
+                    'name': property.name,
+                    'owner_id': property.owner_id,
+                    'position': property.position,
+                    'rent_due': rent
+                }
+            })
+    
+    return response, 200
+
+def purchase_property(game_id, player, property):
+    if property.owner_id:
+        return {'message': 'Property already owned'}, 400
+        
+    if player.balance < property.price:
+        return {'message': 'Insufficient funds'}, 400
+        
+    if player.position != property.position:
+        return {'message': 'Not on this property'}, 400
+    
+    if property.price == 0:
+        return {'message': 'Can not buy this.'}, 400
+        
+    player.balance -= property.price
+    property.owner_id = player.id
+    trade_index.properties_changed(game_id, [property.id])
+    count(game_id, player.id, properties_bought=1)
+    db.session.commit()
+    
+    record_game_history(game_id, player.id, 'property_purchased', amount=property.price, position=property.position)
+    return {'message': 'Property purchased'}, 200
+
+def build_house_on(game_id, player, property):
+    if property.owner_id != player.id:
+        return {'message': 'You do not own this property'}, 403
+        
+    if property.is_mortgaged:
+        return {'message': 'Cannot build on mortgaged property'}, 400
+        
+    # Check if player owns all properties in the color group
+    color_group_properties = Property.query.filter(
+        Property.game_id == game_id,
+        Property.position.in_(GROUP_POSITIONS.get(property.color_group, [property.position]))
+    ).all()
+    
+    for prop in color_group_properties:
+        if prop.owner_id != player.id:
+            return {'message': 'You must own all properties in this color group'}, 400
+    
+    if property.houses >= 4:
+        return {'message': 'Maximum houses already built'}, 400
+        
+    if player.balance < property.house_price:
+        return {'message': 'Insufficient funds'}, 400
+        
+    player.balance -= property.house_price
+    property.houses += 1
+    db.session.commit()
+    
+    record_game_history(game_id, player.id, 'house_built', amount=property.house_price, position=property.position)
+    return {'message': 'House built'}, 200
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule and cancel, keyed timers.
+
+    Time is cut into ticks and each timer sits in slot
+    ``deadline_tick % slots`` with the number of full turns of the wheel
+    left before it is due, so advancing one tick only looks at one slot.
+    Scheduling a key that already has a timer replaces it.
+    """
+
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self._slots = [dict() for _ in range(slots)]   # key -> [rounds, callback, args]
+        self._timers = {}   # key -> slot
+        self._lock = threading.Lock()
+        self._current_tick = int(time.monotonic() / tick)
+
+    def __len__(self):
+        return len(self._timers)
+
+    def schedule(self, key, delay, callback, *args):
+        deadline = int(-(-(time.monotonic() + delay) // self.tick))
+        with self._lock:
+            self._remove(key)
+            # The wheel may lag behind the clock until the next advance
+            ticks = max(1, deadline - self._current_tick)
+            deadline = self._current_tick + ticks
+            slot = deadline % len(self._slots)
+            rounds = (ticks - 1) // len(self._slots)
+            self._slots[slot][key] = [rounds, callback, args]
+            self._timers[key] = slot
+
+    def cancel(self, key):
+        with self._lock:
+            return self._remove(key)
+
+    def _remove(self, key):
+        slot = self._timers.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def advance(self, now=None):
+        """Move the wheel up to ``now`` and return the timers that fired."""
+        target = int((time.monotonic() if now is None else now) / self.tick)
+        due = []
+        with self._lock:
+            while self._current_tick < target:
+                self._current_tick += 1
+                bucket = self._slots[self._current_tick % len(self._slots)]
+                for key, timer in list(bucket.items()):
+                    if timer[0] > 0:
+                        timer[0] -= 1
+                        continue
+                    del bucket[key]
+                    del self._timers[key]
+                    due.append((key, timer[1], timer[2]))
+        return due
+
+
+class Scheduler:
+    """Runs timer wheel callbacks on a background thread inside an app context."""
+
+    def __init__(self):
+        self.app = None
+        self.wheel = None
+        self._thread = None
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._on_start = []
+
+    def init_app(self, app):
+        self.app = app
+        self.wheel = TimerWheel(tick=app.config.get('SCHEDULER_TICK', 1.0))
+
+    def on_start(self, func):
+        """Register a function that re-arms timers when the thread starts."""
+        self._on_start.append(func)
+        return func
+
+    def start(self):
+        if self._started or not self.app.config.get('SCHEDULER_ENABLED', True):
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def schedule(self, key, delay, callback, *args):
+        if self.wheel is not None:
+            self.wheel.schedule(key, delay, callback, *args)
+
+    def cancel(self, key):
+        if self.wheel is not None:
+            self.wheel.cancel(key)
+
+    def _call(self, func, *args):
+        from models import db
+        with self.app.app_context():
+            try:
+                func(*args)
+            except Exception:
+                logger.exception('Scheduled task %r failed', func)
+                db.session.rollback()
+
+    def _run(self):
+        for func in self._on_start:
+            self._call(func)
+        while True:
+            time.sleep(self.wheel.tick)
+            for key, callback, args in self.wheel.advance():
+                self._call(callback, *args)
+
+
+scheduler = Scheduler()
@@ -0,0 +1,158 @@
+"""Data migrations that Alembic autogenerate cannot express on its own."""
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import MetaData, inspect
+
+from models import db, BoardSquare, Property, Game, Trade, Auction, GameHistory
+from board import SQUARES
+from events import Code
+
+schema_cli = AppGroup('schema', help='Schema and data migrations.')
+
+_STATE_COLUMNS = 'id, game_id, owner_id, position, is_mortgaged, houses'
+
+
+@schema_cli.command('normalize-properties')
+def normalize_properties():
+    """Move static property fields into board_square and slim the property table."""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('Only SQLite databases can be converted in place; use a Flask-Migrate migration')
+
+    with db.engine.begin() as connection:
+        BoardSquare.__table__.create(connection, checkfirst=True)
+        if not connection.execute(db.select(db.func.count()).select_from(BoardSquare)).scalar():
+            connection.execute(BoardSquare.__table__.insert(), SQUARES)
+
+        columns = {column['name'] for column in inspect(connection).get_columns('property')}
+        if 'name' not in columns:
+            click.echo('Property table is already normalized')
+            return
+
+        # Build the slim table beside the old one, then swap it in
+        metadata = MetaData()
+        for table in db.metadata.sorted_tables:
+            table.to_metadata(metadata)
+        slim = Property.__table__.to_metadata(metadata, name='property_new')
+        slim.create(connection)
+        copied = connection.exec_driver_sql(
+            f'INSERT INTO property_new ({_STATE_COLUMNS}) SELECT {_STATE_COLUMNS} FROM property'
+        ).rowcount
+        connection.exec_driver_sql('DROP TABLE property')
+        connection.exec_driver_sql('ALTER TABLE property_new RENAME TO property')
+
+    click.echo(f'Moved {copied} property rows to the slim table')
+    click.echo('Run VACUUM on the database to return the freed pages to the filesystem')
+
+
+# Old free-text details of each action and the typed columns they hold
+_LEGACY_DETAILS = {
+    'passed_go': (r'Received \$(\d+)', ('amount',)),
+    'paid_income_tax': (r'Paid \$(\d+)', ('amount',)),
+    'property_purchased': (r'(.+)', ('position',)),
+    'property_mortgaged': (r'(.+)', ('position',)),
+    'property_unmortgaged': (r'(.+)', ('position',)),
+    'house_built': (r'(.+)', ('position',)),
+    'house_sold': (r'(.+)', ('position',)),
+    'trade_created': (r'with player (\d+)', ('counterparty_id',)),
+    'trade_accepted': (r'trade (\d+)', ('ref_id',)),
+    'trade_rejected': (r'trade (\d+)', ('ref_id',)),
+    'auction_started': (r'for property (\d+)', ('property_id',)),
+    'auction_bid': (r'amount (\d+)', ('amount',)),
+    'auction_won': (r'property (.+) for \$(\d+)', ('position', 'amount')),
+}
+_POSITIONS = {square['name']: square['position'] for square in SQUARES}
+
+
+def legacy_fields(action, details, property_positions):
+    """Typed columns for an old details string, or the string as a note."""
+    pattern = _LEGACY_DETAILS.get(action)
+    match = pattern and re.fullmatch(pattern[0], details)
+    if not match:
+        return {'note': details}
+    fields = {}
+    for name, value in zip(pattern[1], match.groups()):
+        if name == 'position':
+            fields['position'] = _POSITIONS.get(value)
+        elif name == 'property_id':
+            fields['position'] = property_positions.get(int(value))
+        else:
+            fields[name] = int(value)
+    if None in fields.values():
+        return {'note': details}
+    return fields
+
+
+def _rebuild(connection, table):
+    """Recreate ``table`` from its model, converting Code columns from names."""
+    old_columns = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    for index in inspect(connection).get_indexes(table.name):
+        connection.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+    connection.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{table.name}_old"')
+    table.create(connection)
+
+    selects = []
+    for column in table.columns:
+        if column.name not in old_columns:
+            selects.append('NULL')
+        elif isinstance(column.type, Code):
+            cases = ' '.join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(column.type.names))
+            selects.append(f'CASE "{column.name}" {cases} END')
+        else:
+            selects.append(f'"{column.name}"')
+    names = ', '.join(f'"{column.name}"' for column in table.columns)
+    connection.exec_driver_sql(
+        f'INSERT INTO "{table.name}" ({names}) SELECT {", ".join(selects)} FROM "{table.name}_old"'
+    )
+    connection.exec_driver_sql(f'DROP TABLE "{table.name}_old"')
+
+
+@schema_cli.command('typed-events')
+@click.option('--batch-size', default=1000)
+def typed_events(batch_size):
+    """Store statuses and history actions as integer codes with typed event columns."""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('Only SQLite databases can be converted in place; use a Flask-Migrate migration')
+
+    with db.engine.begin() as connection:
+        columns = {column['name'] for column in inspect(connection).get_columns('game_history')}
+        if 'amount' in columns:
+            click.echo('History is already typed')
+            return
+        # Keep other tables' foreign keys pointing at the rebuilt tables
+        connection.exec_driver_sql('PRAGMA legacy_alter_table = ON')
+        for model in (Game, Trade, Auction, GameHistory):
+            _rebuild(connection, model.__table__)
+            click.echo(f'Rebuilt {model.__tablename__}')
+        connection.exec_driver_sql('PRAGMA legacy_alter_table = OFF')
+
+        property_positions = dict(connection.execute(db.select(Property.id, Property.position)).all())
+        history = GameHistory.__table__
+        last_id, converted = 0, 0
+        while True:
+            rows = connection.execute(
+                db.select(history.c.id, history.c.action, history.c.details)
+                .where(history.c.id > last_id, history.c.details.isnot(None))
+                .order_by(history.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            updates = [
+                {'row_id': row.id, 'amount': None, 'position': None, 'counterparty_id': None,
+                 'ref_id': None, 'note': None, **legacy_fields(row.action, row.details, property_positions)}
+                for row in rows
+            ]
+            connection.execute(
+                history.update().where(history.c.id == db.bindparam('row_id')).values(
+                    amount=db.bindparam('amount'), position=db.bindparam('position'),
+                    counterparty_id=db.bindparam('counterparty_id'), ref_id=db.bindparam('ref_id'),
+                    details=db.bindparam('note')
+                ),
+                updates
+            )
+            converted += len(updates)
+
+    click.echo(f'Moved the details of {converted} history events into typed columns')
+    click.echo('Run VACUUM on the database to return the freed pages to the filesystem')
@@ -0,0 +1,146 @@
+"""Log requests slower than SLOW_REQUEST_THRESHOLD with the SQL they ran.
+
+Every statement a request executes is timed from engine events. When the
+request turns out to be slow, one JSON line is written to a rotating log
+file with each statement, its parameters and duration, plus the query
+plan of the slowest SELECTs, so table scans are visible at a glance.
+
+Parameters are logged as their type names unless SLOW_REQUEST_LOG_PARAMS
+is set, since they include plaintext passwords (the user table stores
+them as sent, so logins and registrations bind them). Only the first
+SLOW_REQUEST_MAX_STATEMENTS statements of a request are kept; the rest
+are only counted, so long streaming requests stay bounded.
+"""
+import json
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db
+
+MAX_LOGGED_PARAMS = 10
+
+logger = logging.getLogger('monopoly.slow_requests')
+logger.propagate = False
+
+
+class SlowRequestLog:
+    def __init__(self):
+        self.threshold = None
+        self.explain = 3
+        self.log_params = False
+        self.max_statements = 500
+
+    def init_app(self, app):
+        self.threshold = app.config['SLOW_REQUEST_THRESHOLD']
+        self.explain = app.config['SLOW_REQUEST_EXPLAIN']
+        self.log_params = app.config['SLOW_REQUEST_LOG_PARAMS']
+        self.max_statements = app.config['SLOW_REQUEST_MAX_STATEMENTS']
+        if self.threshold is None:
+            return
+        path = app.config['SLOW_REQUEST_LOG'] or os.path.join(app.instance_path, 'slow_requests.log')
+        if not any(getattr(h, 'baseFilename', None) == os.path.abspath(path) for h in logger.handlers):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=app.config['SLOW_REQUEST_LOG_BYTES'],
+                backupCount=app.config['SLOW_REQUEST_LOG_BACKUPS']
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+
+    def _start(self):
+        g.sql_statements = []
+        g.sql_dropped = [0, 0.0]  # statements past the cap, their milliseconds
+        g.request_started = time.perf_counter()
+
+    def _finish(self, error):
+        # Popped first, so the EXPLAIN statements below are not recorded
+        statements = g.pop('sql_statements', None)
+        dropped, dropped_ms = g.pop('sql_dropped', (0, 0.0))
+        started = g.pop('request_started', None)
+        if statements is None or started is None:
+            return
+        duration = time.perf_counter() - started
+        if duration < self.threshold:
+            return
+
+        slowest = sorted(
+            (s for s in statements if not s['executemany'] and s['sql'].lstrip().upper().startswith('SELECT')),
+            key=lambda s: s['duration_ms'], reverse=True
+        )[:self.explain]
+        for statement in slowest:
+            statement['plan'] = self._plan(statement)
+        for statement in statements:
+            statement.pop('raw_params', None)
+
+        logger.info(json.dumps({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'duration_ms': round(duration * 1000, 2),
+            'sql_ms': round(sum(s['duration_ms'] for s in statements) + dropped_ms, 2),
+            'error': repr(error) if error else None,
+            'statements': statements,
+            'statements_dropped': dropped
+        }, default=str))
+
+    def _plan(self, statement):
+        prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+        try:
+            with db.engine.connect() as connection:
+                rows = connection.exec_driver_sql(prefix + statement['sql'], statement['raw_params']).fetchall()
+        except Exception as error:
+            return repr(error)
+        return [' '.join(str(column) for column in row) for row in rows]
+
+
+slow_request_log = SlowRequestLog()
+
+
+def _recording(conn):
+    return has_app_context() and 'sql_statements' in g
+
+
+def _param_types(parameters):
+    """Type names in place of parameter values, nested as the parameters are."""
+    if isinstance(parameters, dict):
+        return {key: _param_types(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_param_types(value) for value in parameters]
+    return type(parameters).__name__
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _recording(conn):
+        conn.info['sql_started'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    if not _recording(conn) or 'sql_started' not in conn.info:
+        return
+    duration = time.perf_counter() - conn.info.pop('sql_started')
+    if len(g.sql_statements) >= slow_request_log.max_statements:
+        g.sql_dropped[0] += 1
+        g.sql_dropped[1] += duration * 1000
+        return
+    logged = parameters[:MAX_LOGGED_PARAMS] if executemany else parameters
+    if not slow_request_log.log_params:
+        logged = _param_types(logged)
+    g.sql_statements.append({
+        'sql': statement,
+        'params': logged,
+        # Kept for EXPLAIN only, never written out
+        'raw_params': None if executemany else parameters,
+        'executemany': executemany,
+        'duration_ms': round(duration * 1000, 3)
+    })
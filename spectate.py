@@ -0,0 +1,149 @@
+"""Spectator fan-out of game state over server-sent events.
+
+Every watched game has one channel per worker. A single publisher thread
+reads the versions of all watched games in one cache call; when a game's
+version moves, its state is serialized once and the same bytes are
+handed to every spectator. Each spectator has a small bounded buffer, so
+one that falls behind loses its oldest pending versions instead of
+holding up the others, and the cost of a game does not grow with its
+audience.
+"""
+import threading
+import time
+from collections import deque
+
+from cache import cache
+
+
+class Subscriber:
+    def __init__(self, size):
+        self.frames = deque(maxlen=size)
+        self.dropped = 0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def push(self, frame):
+        with self._lock:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._ready.set()
+
+    def pull(self, timeout):
+        """Frames buffered so far, waiting up to ``timeout`` seconds for one."""
+        self._ready.wait(timeout)
+        with self._lock:
+            self._ready.clear()
+            frames = list(self.frames)
+            self.frames.clear()
+        return frames
+
+
+class Channel:
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.version = None
+        self.frame = None
+        self.subscribers = set()
+        # Serializes publishing, so frames reach subscribers in version order
+        self.lock = threading.Lock()
+
+
+class Spectators:
+    def __init__(self):
+        self.app = None
+        self.render = None
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.published = 0
+
+    def init_app(self, app, render):
+        """``render(game_id)`` returns the serialized state, or None if the game is gone."""
+        self.app = app
+        self.render = render
+
+    def subscribe(self, game_id):
+        """A new subscriber primed with the current state, or None if the game does not exist."""
+        subscriber = Subscriber(self.app.config['SPECTATOR_BUFFER'])
+        with self._lock:
+            channel = self._channels.get(game_id)
+            if channel is None:
+                channel = self._channels[game_id] = Channel(game_id)
+            with channel.lock:
+                channel.subscribers.add(subscriber)
+                if channel.frame is not None:
+                    subscriber.push(channel.frame)
+            self._start()
+        if channel.frame is None:
+            # First spectator of this game in the worker
+            versions = cache.versions([f'game:{game_id}'])
+            if versions is None:
+                # The poller publishes once the cache answers again
+                return subscriber
+            self._publish(channel, versions[0])
+        if channel.frame is None:
+            self.unsubscribe(game_id, subscriber)
+            return None
+        return subscriber
+
+    def unsubscribe(self, game_id, subscriber):
+        with self._lock:
+            channel = self._channels.get(game_id)
+            if channel is None:
+                return
+            with channel.lock:
+                channel.subscribers.discard(subscriber)
+                if not channel.subscribers:
+                    del self._channels[game_id]
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='spectators', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.app.config['SPECTATOR_POLL_INTERVAL'])
+            try:
+                with self.app.app_context():
+                    self.poll()
+            except Exception:
+                self.app.logger.exception('Spectator publish failed')
+
+    def poll(self):
+        """Publish every watched game whose version changed since its last frame."""
+        with self._lock:
+            channels = list(self._channels.values())
+        if not channels:
+            return
+        versions = cache.versions([f'game:{channel.game_id}' for channel in channels])
+        if versions is None:
+            return
+        for channel, version in zip(channels, versions):
+            if version != channel.version:
+                self._publish(channel, version)
+
+    def _publish(self, channel, version):
+        state = self.render(channel.game_id)
+        if state is None:
+            return
+        frame = b'id: %d\nevent: state\ndata: %s\n\n' % (version, state)
+        with channel.lock:
+            if channel.version is not None and version <= channel.version:
+                return
+            channel.version, channel.frame = version, frame
+            for subscriber in channel.subscribers:
+                subscriber.push(frame)
+            self.published += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'games': len(self._channels),
+                'spectators': sum(len(c.subscribers) for c in self._channels.values()),
+                'published': self.published,
+            }
+
+
+spectators = Spectators()
@@ -0,0 +1,39 @@
+import json
+
+from board import BOARD_VERSION
+
+_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+# Templates for the per-row parts of the game state; only the dynamic fields
+# of a property are sent, the static ones come from GET /board
+_PROPERTY_TEMPLATE = '{"id":%d,"position":%d,"owner_id":%s,"is_mortgaged":%s,"houses":%d}'
+_PLAYER_TEMPLATE = (
+    '{"id":%d,"user_id":%d,"balance":%d,"position":%d,'
+    '"in_jail":%s,"is_bankrupt":%s,"username":%s}'
+)
+_STATE_TEMPLATE = (
+    '{"board_version":"' + BOARD_VERSION + '","status":%s,"current_player_id":%s,'
+    '"max_players":%s,"players":[%s],"properties":[%s]}'
+)
+_BOOL = {True: 'true', False: 'false', None: 'false'}
+
+
+def _int_or_null(value):
+    return 'null' if value is None else '%d' % value
+
+
+def render_game_state(game, players, properties):
+    """Serialize a game state to compact JSON bytes."""
+    return (_STATE_TEMPLATE % (
+        _encode(game.status),
+        _int_or_null(game.current_player_id),
+        _int_or_null(game.max_players),
+        ','.join(_PLAYER_TEMPLATE % (
+            p.id, p.user_id, p.balance, p.position,
+            _BOOL[p.in_jail], _BOOL[p.is_bankrupt], _encode(p.username)
+        ) for p in players),
+        ','.join(_PROPERTY_TEMPLATE % (
+            prop.id, prop.position, _int_or_null(prop.owner_id),
+            _BOOL[prop.is_mortgaged], prop.houses or 0
+        ) for prop in properties)
+    )).encode('utf-8')
@@ -0,0 +1,77 @@
+"""Per-game statistics counters, maintained as moves are made.
+
+Every move that affects a statistic adds to its counters in the same
+transaction as the move, so reading the statistics is an index range
+read however long the game has run. Each player and each board square
+has its own row, and counters are raised with ``SET col = col + n`` in
+the database, so concurrent moves never lose an increment.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+
+from cache import cache
+from models import db, PlayerStats, SquareStats
+from rent import SQUARES
+
+# Event counts, except jail_fines_paid, rent_paid and rent_received (dollars)
+PLAYER_COUNTERS = (
+    'turns',
+    'doubles',
+    'jail_visits',
+    'jail_fines_paid',
+    'rent_paid',
+    'rent_received',
+    'properties_bought',
+    'cards_drawn',
+    'trades',
+    'auctions_won',
+)
+
+# INSERT that leaves an existing row alone, per dialect
+INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _add(model, key, counters):
+    """Add ``counters`` to the row of ``model`` at ``key``, creating it if needed."""
+    update = db.update(model).where(
+        *[getattr(model, name) == value for name, value in key.items()]
+    ).values({name: getattr(model, name) + value for name, value in counters.items()})
+    if db.session.execute(update).rowcount:
+        return
+    # A concurrent first move may create the row between the two statements
+    insert = INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is None:
+        db.session.execute(db.insert(model).values(key))
+    else:
+        db.session.execute(insert(model).values(key).on_conflict_do_nothing())
+    db.session.execute(update)
+
+
+def count(game_id, player_id, landed=None, **counters):
+    """Add ``counters`` to a player's totals and a landing on square ``landed``.
+
+    Only stages the change; it is committed with the move that caused it.
+    """
+    if landed is not None:
+        _add(SquareStats, {'game_id': game_id, 'position': landed}, {'landings': 1})
+    counters = {name: value for name, value in counters.items() if value}
+    if counters:
+        _add(PlayerStats, {'game_id': game_id, 'player_id': player_id}, counters)
+    cache.touch(['game:%d' % game_id])
+
+
+def game_stats(game_id):
+    landings = [0] * SQUARES
+    for position, landed in db.session.execute(
+        db.select(SquareStats.position, SquareStats.landings).where(SquareStats.game_id == game_id)
+    ):
+        landings[position] = landed
+    players = PlayerStats.query.filter_by(game_id=game_id).order_by(PlayerStats.player_id).all()
+    return {
+        'game_id': game_id,
+        'turns': sum(stats.turns for stats in players),
+        'landings': landings,
+        'players': [
+            dict({name: getattr(stats, name) for name in PLAYER_COUNTERS}, player_id=stats.player_id)
+            for stats in players
+        ]
+    }
@@ -0,0 +1,60 @@
+import pytest
+
+from auctions import auction_book
+from leaderboard import leaderboard
+from main import create_app
+from matchmaking import matchmaking
+from models import db
+from spectate import spectators
+from trades import trade_index
+
+
+@pytest.fixture
+def app(tmp_path):
+    # The extensions are module singletons; start every test from empty ones
+    for singleton in (auction_book, leaderboard, matchmaking, spectators, trade_index):
+        singleton.__init__()
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'monopoly.db'),
+        'LEADERBOARD_SNAPSHOT_PATH': str(tmp_path / 'leaderboard.json'),
+        'SCHEDULER_ENABLED': False,
+        'SWAGGER_ENABLED': False,
+        'MIGRATE_ENABLED': False,
+        'SLOW_REQUEST_THRESHOLD': None,
+        'ADMIN_USERNAMES': ['operator'],
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """Register and log in a user; returns (user_id, auth headers)."""
+    def register(username, password='secret'):
+        response = client.post('/users/register', json={'username': username, 'password': password})
+        assert response.status_code == 201, response.get_json()
+        token = client.post('/users/login', json={'username': username, 'password': password}).get_json()['token']
+        return response.get_json()['user_id'], {'Authorization': 'Bearer ' + token}
+    return register
+
+
+@pytest.fixture
+def started_game(client, register):
+    """Start a game for the given usernames; returns (game_id, [auth headers])."""
+    def started_game(*usernames):
+        headers = [register(username)[1] for username in usernames]
+        game_id = client.post('/games/create', headers=headers[0]).get_json()['game_id']
+        for other in headers[1:]:
+            assert client.post(f'/games/{game_id}/join', headers=other).status_code == 200
+        assert client.post(f'/games/{game_id}/start', headers=headers[0]).status_code == 200
+        return game_id, headers
+    return started_game
@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from analytics import HistoryColumns, load_columns, report
+from models import db, GameHistory, Player, Property
+from rent import lookup
+
+
+@pytest.fixture
+def finished_game(client, started_game):
+    """A game alice won by owning both dark blues after bob went bankrupt on tax."""
+    game_id, _ = started_game('alice', 'bob')
+    alice, bob = (Player.query.filter_by(game_id=game_id, username=name).one() for name in ('alice', 'bob'))
+    start = GameHistory.query.filter_by(game_id=game_id, action='game_started').one().created_at
+    events = [
+        (alice.id, 'property_purchased', {'position': 39}),
+        (bob.id, 'property_purchased', {'position': 1}),
+        (alice.id, 'property_purchased', {'position': 37}),
+        (bob.id, 'paid_income_tax', {'amount': 200}),
+        (bob.id, 'declared_bankruptcy', {}),
+        (alice.id, 'game_ended', {}),
+    ]
+    for minutes, (player_id, action, fields) in enumerate(events, 1):
+        db.session.add(GameHistory(
+            game_id=game_id, player_id=player_id, action=action,
+            created_at=start + timedelta(minutes=minutes), **fields
+        ))
+    for position in (37, 39):
+        Property.query.filter_by(game_id=game_id, position=position).one().owner_id = alice.id
+    db.session.commit()
+    return game_id
+
+
+def test_report_of_a_finished_game(app, finished_game, tmp_path):
+    columns = load_columns(str(tmp_path / 'analytics.npz'))
+    result = report(columns)
+    assert result['finished_games'] == 1
+    assert result['events'] == GameHistory.query.count()
+    assert result['game_length']['games'] == 1
+    assert result['game_length']['mean_seconds'] == 6 * 60
+    assert result['win_rate_by_first_color']['dark blue'] == {'players': 1, 'wins': 1, 'win_rate': 1.0}
+    assert result['win_rate_by_first_color']['brown'] == {'players': 1, 'wins': 0, 'win_rate': 0.0}
+    assert result['bankruptcy_causes'] == {'paid_income_tax': 1}
+
+    squares = {square['position']: square for square in result['rent_by_square']}
+    assert squares[39]['mean_rent'] == lookup(39, 0, True, 2)
+    assert squares[39]['owned_share'] == 1.0
+    assert squares[1]['mean_rent'] == 0
+
+
+def test_cache_is_reused_and_extended(app, finished_game, tmp_path):
+    path = str(tmp_path / 'analytics.npz')
+    first = load_columns(path)
+    cached = HistoryColumns.load(path)
+    assert cached.last_id == first.last_id
+    assert len(cached.events['id']) == len(first.events['id'])
+
+    db.session.add(GameHistory(game_id=finished_game, action='game_started', created_at=datetime.utcnow()))
+    db.session.commit()
+    assert cached.refresh() == 1
+    # Ownership of a game is read once, when it ends
+    assert len(cached.properties['game_id']) == len(first.properties['game_id'])
+
+
+def test_report_command(app, finished_game, tmp_path):
+    path = str(tmp_path / 'analytics.npz')
+    result = app.test_cli_runner().invoke(args=['analytics', 'report', '--cache', path])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)['finished_games'] == 1
+
+
+def test_importing_the_app_does_not_load_numpy():
+    code = 'import sys, main; print("numpy" in sys.modules)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
@@ -0,0 +1,32 @@
+import json
+
+from main import create_app
+
+
+def swagger_app(tmp_path):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'monopoly.db'),
+        'SCHEDULER_ENABLED': False,
+        'MIGRATE_ENABLED': False,
+        'SLOW_REQUEST_THRESHOLD': None,
+        'APISPEC_PATH': str(tmp_path / 'apispec.json'),
+    })
+
+
+def test_built_spec_is_served_as_a_file(tmp_path):
+    app = swagger_app(tmp_path)
+    result = app.test_cli_runner().invoke(args=['spec', 'build'])
+    assert result.exit_code == 0, result.output
+    with open(tmp_path / 'apispec.json') as file:
+        spec = json.load(file)
+    assert '/games/{game_id}/dashboard' in spec['paths']
+
+    # Workers started after the build send the file instead of parsing docstrings
+    response = swagger_app(tmp_path).test_client().get('/apispec_1.json')
+    assert response.status_code == 200
+    assert json.loads(response.data) == spec
+
+
+def test_docs_can_be_turned_off(client):
+    assert client.get('/apidocs/').status_code == 404
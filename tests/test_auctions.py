@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from auctions import AuctionBook, auction_book
+from models import db, Auction, GameHistory, Player, Property
+from scheduler import scheduler
+from timeouts import rearm_timers
+
+
+@pytest.fixture
+def auction(client, started_game):
+    """An auction for Boardwalk; returns (game_id, auction_id, [auth headers])."""
+    game_id, headers = started_game('alice', 'bob')
+    boardwalk = Property.query.filter_by(game_id=game_id, position=39).one()
+    response = client.post(f'/games/{game_id}/auction', headers=headers[0], json={'property_id': boardwalk.id})
+    assert response.status_code == 201
+    return game_id, response.get_json()['auction_id'], headers
+
+
+def bid(client, auction, player, amount):
+    game_id, auction_id, headers = auction
+    return client.post(f'/games/{game_id}/auction/{auction_id}/bid', headers=headers[player], json={'amount': amount})
+
+
+def test_bids_are_held_in_memory_until_settlement(client, auction):
+    start = db.session.get(Auction, auction[1]).current_bid
+    assert bid(client, auction, 1, start + 10).status_code == 200
+    assert bid(client, auction, 0, start + 5).status_code == 400
+    assert bid(client, auction, 0, 10 ** 6).get_json()['message'] == 'Insufficient funds'
+
+    bob = Player.query.filter_by(game_id=auction[0], username='bob').one()
+    live = auction_book._auctions[auction[1]]
+    assert (live.current_bid, live.current_bidder_id) == (start + 10, bob.id)
+    db.session.expire_all()
+    stored = db.session.get(Auction, auction[1])
+    assert (stored.current_bid, stored.current_bidder_id) == (start, None)
+
+
+def test_bid_amount_must_be_a_positive_integer(client, auction):
+    for amount in ('500', 500.5, True, None, -10):
+        response = bid(client, auction, 1, amount)
+        assert response.status_code == 400
+        assert response.get_json()['message'] == 'amount must be a positive integer'
+
+
+def test_active_auctions_are_reopened_after_a_restart(app, client, auction):
+    auction_book._auctions.clear()
+    scheduler.cancel(('auction', auction[1]))
+    rearm_timers()
+    assert auction[1] in auction_book._auctions
+    assert ('auction', auction[1]) in scheduler.wheel._timers
+
+
+def test_settlement_transfers_property_and_records_bids(client, auction):
+    game_id, auction_id, headers = auction
+    start = db.session.get(Auction, auction_id).current_bid
+    bid(client, auction, 1, start + 10)
+    bid(client, auction, 0, start + 20)
+
+    result = client.post(f'/games/{game_id}/auction/{auction_id}/end', headers=headers[0]).get_json()
+    alice = Player.query.filter_by(game_id=game_id, username='alice').one()
+    assert (result['winner_id'], result['amount']) == (alice.id, start + 20)
+    assert db.session.get(Property, result['property_id']).owner_id == alice.id
+    assert alice.balance == 1500 - start - 20
+    actions = [event.action for event in GameHistory.query.filter_by(game_id=game_id, ref_id=auction_id)]
+    assert actions.count('auction_bid') == 2 and actions.count('auction_won') == 1
+    assert auction_id not in auction_book._auctions
+
+
+def test_failed_settlement_keeps_the_auction(client, auction, monkeypatch):
+    game_id, auction_id, headers = auction
+    start = db.session.get(Auction, auction_id).current_bid
+    bid(client, auction, 1, start + 10)
+
+    def fail(self, live):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(AuctionBook, '_settle', fail)
+    with pytest.raises(RuntimeError):
+        auction_book.settle(auction_id, force=True)
+    assert not auction_book._auctions[auction_id].settling
+    monkeypatch.undo()
+
+    result, status = auction_book.settle(auction_id, force=True)
+    assert status == 200 and result['amount'] == start + 10
+    assert auction_id not in auction_book._auctions
+
+
+def test_settlement_includes_bids_taken_by_another_worker(client, auction):
+    game_id, auction_id, headers = auction
+    start = db.session.get(Auction, auction_id).current_bid
+    bid(client, auction, 1, start + 10)
+    alice = Player.query.filter_by(game_id=game_id, username='alice').one()
+    db.session.execute(db.update(Auction).where(Auction.id == auction_id).values(
+        current_bid=start + 50, current_bidder_id=alice.id
+    ))
+    db.session.commit()
+
+    # The stored bid is higher than the one this worker holds
+    assert bid(client, auction, 1, start + 40).status_code == 400
+    result = client.post(f'/games/{game_id}/auction/{auction_id}/end', headers=headers[0]).get_json()
+    assert (result['winner_id'], result['amount']) == (alice.id, start + 50)
+
+
+def test_late_bid_extends_the_deadline(app, client, auction):
+    app.config['AUCTION_EXTENSION'] = 3600
+    live = auction_book._auctions[auction[1]]
+    before = live.deadline
+    bid(client, auction, 1, live.current_bid + 10)
+    assert live.deadline > before
+    assert live.deadline >= time.time() + 3500
+
+
+def test_bid_read_before_settlement_does_not_reopen_the_auction(client, auction):
+    game_id, auction_id, _ = auction
+    row = db.session.get(Auction, auction_id)
+    # The row as a request loaded it just before the auction was settled
+    stale = Auction(id=auction_id, game_id=game_id, property_id=row.property_id,
+                    current_bid=row.current_bid, status='active')
+    assert auction_book.settle(auction_id, force=True)[1] == 200
+
+    bob = Player.query.filter_by(game_id=game_id, username='bob').one()
+    assert auction_book.bid(stale, bob.id, row.current_bid + 10) == ({'message': 'Auction not active'}, 400)
+    assert auction_id not in auction_book._auctions
@@ -0,0 +1,119 @@
+import itertools
+
+import pytest
+
+import bots
+import rules
+from models import db, Game, Player, Property, User
+from rules import advance_turn, finish_game, take_roll
+from timeouts import schedule_turn_timeout
+
+
+@pytest.fixture
+def bot_game(client, register, monkeypatch):
+    """A started game of alice and one bot, with the bot to play and bot jobs recorded."""
+    jobs = []
+    monkeypatch.setattr(bots.bot_pool, 'submit', lambda key, func, *args: jobs.append(key))
+    _, alice = register('alice')
+    game_id = client.post('/games/create', headers=alice).get_json()['game_id']
+    response = client.post(f'/games/{game_id}/bots?count=1', headers=alice)
+    assert response.status_code == 200
+    bot_id = response.get_json()['player_ids'][0]
+    assert client.post(f'/games/{game_id}/start', headers=alice).status_code == 200
+
+    game = db.session.get(Game, game_id)
+    game.current_player_id = bot_id
+    db.session.commit()
+    return game, db.session.get(Player, bot_id), jobs
+
+
+def dice(monkeypatch, *values):
+    values = itertools.cycle(values)
+    monkeypatch.setattr(rules.random, 'randint', lambda low, high: next(values))
+
+
+def test_bots_take_free_seats(bot_game):
+    game, bot, _ = bot_game
+    assert bot.is_bot
+    assert db.session.get(User, bot.user_id).username.startswith('bot')
+    assert len(game.players) == 2
+
+
+def test_bot_buys_what_it_can_afford_and_passes_the_turn(bot_game, monkeypatch):
+    game, bot, _ = bot_game
+    dice(monkeypatch, 1, 2)
+    bots.play_turns(game.id)
+
+    baltic = Property.query.filter_by(game_id=game.id, position=3).one()
+    assert baltic.owner_id == bot.id
+    assert game.current_player_id != bot.id
+
+
+def test_broke_bot_stays_in_jail(bot_game, monkeypatch):
+    game, bot, _ = bot_game
+    bot.in_jail, bot.jail_turns, bot.balance = True, 2, 10
+    db.session.commit()
+    dice(monkeypatch, 1, 2)
+    bots.play_turns(game.id)
+
+    db.session.expire_all()
+    assert (bot.in_jail, bot.jail_turns, bot.balance) == (True, 2, 10)
+    assert game.current_player_id != bot.id
+
+
+def test_third_jail_turn_without_the_fine_changes_nothing(bot_game, monkeypatch):
+    game, bot, _ = bot_game
+    bot.in_jail, bot.jail_turns, bot.balance = True, 2, 10
+    dice(monkeypatch, 1, 2)
+    assert take_roll(game, bot) == ({'message': 'Cannot pay to get out of jail'}, 400)
+    assert (bot.in_jail, bot.jail_turns, bot.balance) == (True, 2, 10)
+
+    bot.balance = 100
+    response, status = take_roll(game, bot)
+    assert status == 200
+    assert (bot.in_jail, bot.jail_turns, bot.balance) == (False, 0, 50)
+
+
+def test_turn_passing_to_a_bot_queues_its_job(bot_game):
+    game, bot, jobs = bot_game
+    human = next(player for player in game.players if not player.is_bot)
+    game.current_player_id = human.id
+    schedule_turn_timeout(game)
+    assert jobs == []
+
+    advance_turn(game, human.id)
+    schedule_turn_timeout(game)
+    assert game.current_player_id == bot.id
+    assert jobs == [('turn', game.id)]
+
+
+def test_failed_jail_escape_passes_the_turn(bot_game, monkeypatch):
+    game, bot, _ = bot_game
+    bot.in_jail = True
+    dice(monkeypatch, 1, 2)
+    response, status = take_roll(game, bot)
+    assert (status, response['message'], response['jail_turns']) == (200, 'Still in jail', 1)
+    assert bot.in_jail and bot.position == 0
+    assert game.current_player_id != bot.id
+
+
+def test_bots_keep_no_record_and_stay_off_the_leaderboard(client, bot_game):
+    game, bot, _ = bot_game
+    finish_game(game)
+    assert db.session.get(User, bot.user_id).games_played == 0
+    assert [entry['username'] for entry in client.get('/leaderboard').get_json()] == ['alice']
+
+
+def test_bot_accounts_skip_names_taken_by_people(client, register, bot_game):
+    game, bot, _ = bot_game
+    register('bot_2')
+    user = bots.bot_user(game.id)
+    assert (user.username, user.is_bot) == ('bot_3', True)
+
+
+def test_bot_stats_are_for_operators(client, register):
+    _, alice = register('alice')
+    _, operator = register('operator')
+    assert client.get('/bots/stats').status_code == 401
+    assert client.get('/bots/stats', headers=alice).status_code == 403
+    assert client.get('/bots/stats', headers=operator).status_code == 200
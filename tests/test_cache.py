@@ -0,0 +1,99 @@
+import json
+import socket
+import time
+
+from cache import LRUCache, RespCache, cache
+from main import create_app
+from models import db, Player, Property
+
+
+def game_version(game_id):
+    return cache.versions([f'game:{game_id}'])[0]
+
+
+def test_game_state_is_cached_until_the_game_changes(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    first = client.get(f'/games/{game_id}', headers=headers[0]).data
+    assert cache.backend.get(cache.key('state', [f'game:{game_id}'], game_id, 0)) == first
+
+    alice = Player.query.filter_by(game_id=game_id, username='alice').one()
+    alice.balance = 1
+    db.session.commit()
+    state = json.loads(client.get(f'/games/{game_id}', headers=headers[0]).data)
+    assert state['players'][0]['balance'] == 1
+
+
+def test_core_writes_bump_versions_on_commit(client, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    before = game_version(game_id)
+    db.session.execute(db.update(Property).where(Property.game_id == game_id).values(houses=1))
+    cache.touch([f'game:{game_id}'])
+    assert game_version(game_id) == before
+    db.session.commit()
+    assert game_version(game_id) == before + 1
+
+    # A rolled back transaction leaves the versions alone
+    db.session.execute(db.update(Property).where(Property.game_id == game_id).values(houses=2))
+    cache.touch([f'game:{game_id}'])
+    db.session.rollback()
+    db.session.commit()
+    assert game_version(game_id) == before + 1
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_bytes=10)
+    lru.set('a', b'12345')
+    lru.set('b', b'12345')
+    lru.get('a')
+    lru.set('c', b'12345')
+    assert (lru.get('a'), lru.get('b'), lru.get('c')) == (b'12345', None, b'12345')
+
+
+def test_several_workers_share_the_cache(tmp_path):
+    config = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'monopoly.db'),
+        'SCHEDULER_ENABLED': False,
+        'SWAGGER_ENABLED': False,
+        'MIGRATE_ENABLED': False,
+        'SLOW_REQUEST_THRESHOLD': None,
+    }
+    try:
+        create_app(dict(config, WORKERS=2, CACHE_BACKEND='lru'))
+        assert isinstance(cache.backend, RespCache)
+        create_app(dict(config, WORKERS=1, CACHE_BACKEND='lru'))
+        assert isinstance(cache.backend, LRUCache)
+        # Turning the cache off is kept whatever the worker count
+        create_app(dict(config, WORKERS=2, CACHE_BACKEND=None))
+        assert isinstance(cache.backend, LRUCache) and cache.backend.max_bytes == 0
+    finally:
+        cache.backend = None
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_unreachable_cache_falls_back_to_the_database(client, started_game, monkeypatch):
+    monkeypatch.setattr(cache, 'backend', RespCache(f'redis://127.0.0.1:{unused_port()}'))
+    game_id, headers = started_game('alice', 'bob')
+    assert client.get(f'/games/{game_id}', headers=headers[0]).status_code == 200
+    # The version bump after a commit fails quietly
+    assert client.post(f'/games/{game_id}/roll', headers=headers[0]).status_code == 200
+    assert client.get('/users/1/history', headers=headers[0]).status_code == 200
+
+
+def test_no_versions_are_fetched_for_no_entities(monkeypatch):
+    monkeypatch.setattr(cache, 'backend', RespCache(f'redis://127.0.0.1:{unused_port()}'))
+    assert cache.versions([]) == []
+    assert cache.key('user_history', [], 1) == 'user_history:1'
+
+
+def test_entries_expire():
+    lru = LRUCache()
+    lru.set('a', b'1', ttl=0.01)
+    lru.set('b', b'2')
+    time.sleep(0.02)
+    assert (lru.get('a'), lru.get('b')) == (None, b'2')
+    assert lru.size == 1
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from codec import BINARY_MIMETYPE, decode_game_state
+from models import db, Player, Property
+
+
+def test_binary_state_matches_json(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    bob = Player.query.filter_by(game_id=game_id, username='bob').one()
+    boardwalk = Property.query.filter_by(game_id=game_id, position=39).one()
+    boardwalk.owner_id = bob.id
+    boardwalk.houses = 3
+    bob.in_jail = True
+    db.session.commit()
+
+    as_json = json.loads(client.get(f'/games/{game_id}', headers=headers[0]).data)
+    response = client.get(f'/games/{game_id}', headers=dict(headers[0], Accept=BINARY_MIMETYPE))
+    assert response.mimetype == BINARY_MIMETYPE
+    assert len(response.data) < len(json.dumps(as_json))
+    assert decode_game_state(response.data) == as_json
+
+
+def test_long_usernames_are_sent_whole(client, started_game):
+    name = 'élodie-' + 'x' * 40
+    game_id, headers = started_game(name, 'bob')
+    response = client.get(f'/games/{game_id}', headers=dict(headers[0], Accept=BINARY_MIMETYPE))
+    state = decode_game_state(response.data)
+    assert [player['username'] for player in state['players']] == [name, 'bob']
+    assert state['status'] == 'active'
+
+
+def test_json_stays_the_default(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    response = client.get(f'/games/{game_id}', headers=dict(headers[0], Accept='*/*'))
+    assert response.mimetype == 'application/json'
+
+
+def test_decode_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        decode_game_state(b'\0' * 64)
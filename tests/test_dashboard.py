@@ -0,0 +1,47 @@
+from auctions import auction_book
+from models import Property
+
+
+def dashboard(client, game_id, headers, **args):
+    response = client.get(f'/games/{game_id}/dashboard', headers=headers, query_string=args)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_dashboard_of_the_calling_player(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    first = dashboard(client, game_id, headers[1])
+    assert first['player']['balance'] == 1500
+    assert first['state'] is not None
+    assert first['pending_trades'] == [] and first['auctions'] == []
+    assert first['history'] and first['history_cursor'] == first['history'][-1]['id']
+
+    # Nothing changed: no state and no events past the cursor
+    again = dashboard(client, game_id, headers[1], state_version=first['state_version'], since=first['history_cursor'])
+    assert again['state'] is None
+    assert again['history'] == [] and again['history_cursor'] == first['history_cursor']
+
+
+def test_dashboard_needs_a_seat_in_the_game(client, register, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    _, carol = register('carol')
+    assert client.get(f'/games/{game_id}/dashboard', headers=carol).status_code == 404
+
+
+def test_auctions_are_listed_without_reopening_them(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    boardwalk = Property.query.filter_by(game_id=game_id, position=39).one()
+    auction_id = client.post(
+        f'/games/{game_id}/auction', headers=headers[0], json={'property_id': boardwalk.id}
+    ).get_json()['auction_id']
+
+    [loaded] = dashboard(client, game_id, headers[0])['auctions']
+    assert loaded['id'] == auction_id and loaded['property_id'] == boardwalk.id
+    assert loaded['ends_at'] is not None
+
+    # As another worker sees it: shown from the row, and its clock left alone
+    auction_book._auctions.clear()
+    [unloaded] = dashboard(client, game_id, headers[0])['auctions']
+    assert unloaded['ends_at'] is None
+    assert unloaded['current_bid'] == loaded['current_bid']
+    assert auction_id not in auction_book._auctions
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import inspect
+
+from events import Code, EVENT_TYPES, GAME_STATUSES, describe
+from models import db, Auction, Game, GameHistory, Trade
+from schema import legacy_fields
+
+
+def test_code_stores_names_as_small_integers(app):
+    code = Code(GAME_STATUSES)
+    assert code.process_bind_param('finished', None) == 2
+    assert code.process_result_value(2, None) == 'finished'
+    assert code.process_bind_param(None, None) is None
+    with pytest.raises(ValueError):
+        code.process_bind_param('paused', None)
+
+
+def test_statuses_and_actions_are_queried_by_name(client, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    assert Game.query.filter_by(status='active').one().id == game_id
+    stored = db.session.execute(db.text('SELECT status FROM game WHERE id = :id'), {'id': game_id}).scalar()
+    assert stored == GAME_STATUSES.index('active')
+
+    event = GameHistory.query.filter_by(game_id=game_id, action='game_started').one()
+    raw = db.session.execute(db.text('SELECT action FROM game_history WHERE id = :id'), {'id': event.id}).scalar()
+    assert raw == EVENT_TYPES.index('game_started')
+
+
+def test_details_are_built_from_typed_columns():
+    assert describe(GameHistory(action='passed_go', amount=200)) == 'Received $200'
+    assert describe(GameHistory(action='property_purchased', position=39)) == 'Boardwalk'
+    assert describe(GameHistory(action='auction_won', position=39, amount=450)) == 'property Boardwalk for $450'
+    assert describe(GameHistory(action='card_drawn', note='Advance to Go')) == 'Advance to Go'
+    assert describe(GameHistory(action='game_started')) is None
+
+
+def test_details_need_every_column_of_the_action():
+    assert describe(GameHistory(action='paid_income_tax')) is None
+    assert describe(GameHistory(action='trade_created')) is None
+    assert describe(GameHistory(action='auction_won', position=39)) is None
+    # A legacy note is still shown
+    assert describe(GameHistory(action='paid_income_tax', note='Paid $75')) == 'Paid $75'
+
+
+def test_legacy_details_are_parsed_into_fields():
+    assert legacy_fields('passed_go', 'Received $200', {}) == {'amount': 200}
+    assert legacy_fields('house_built', 'Boardwalk', {}) == {'position': 39}
+    assert legacy_fields('auction_started', 'for property 5', {5: 39}) == {'position': 39}
+    assert legacy_fields('auction_won', 'property Park Place for $350', {}) == {'position': 37, 'amount': 350}
+    # Unparsable text is kept as a note
+    assert legacy_fields('house_built', 'Nowhere', {}) == {'note': 'Nowhere'}
+    assert legacy_fields('card_drawn', 'Go to Jail', {}) == {'note': 'Go to Jail'}
+
+
+def test_typed_events_converts_a_legacy_database(app):
+    with db.engine.begin() as connection:
+        for table in ('game_history', 'auction', 'trade', 'game'):
+            connection.exec_driver_sql(f'DROP TABLE "{table}"')
+        connection.exec_driver_sql(
+            'CREATE TABLE game (id INTEGER PRIMARY KEY, status VARCHAR(20), max_players INTEGER, '
+            'created_at DATETIME, current_player_id INTEGER)'
+        )
+        connection.exec_driver_sql(
+            'CREATE TABLE trade (id INTEGER PRIMARY KEY, game_id INTEGER, sender_id INTEGER, '
+            'receiver_id INTEGER, status VARCHAR(20), created_at DATETIME)'
+        )
+        connection.exec_driver_sql(
+            'CREATE TABLE auction (id INTEGER PRIMARY KEY, game_id INTEGER, property_id INTEGER, '
+            'current_bid INTEGER, current_bidder_id INTEGER, status VARCHAR(20), created_at DATETIME)'
+        )
+        connection.exec_driver_sql(
+            'CREATE TABLE game_history (id INTEGER PRIMARY KEY, game_id INTEGER, player_id INTEGER, '
+            'action VARCHAR(50), details VARCHAR(200), created_at DATETIME)'
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO game VALUES (1, 'finished', 4, '2024-01-01 00:00:00', NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO trade VALUES (1, 1, 1, 2, 'rejected', '2024-01-01 00:00:00')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO auction VALUES (1, 1, 5, 300, 2, 'completed', '2024-01-01 00:00:00')"
+        )
+        connection.exec_driver_sql('INSERT INTO property (id, game_id, owner_id, position) VALUES (5, 1, 2, 39)')
+        connection.exec_driver_sql(
+            "INSERT INTO game_history VALUES "
+            "(1, 1, NULL, 'game_started', NULL, '2024-01-01 00:00:00'), "
+            "(2, 1, 1, 'passed_go', 'Received $200', '2024-01-01 00:01:00'), "
+            "(3, 1, 2, 'auction_started', 'for property 5', '2024-01-01 00:02:00'), "
+            "(4, 1, 2, 'card_drawn', 'Bank error in your favor', '2024-01-01 00:03:00')"
+        )
+
+    result = app.test_cli_runner().invoke(args=['schema', 'typed-events', '--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'Moved the details of 3 history events' in result.output
+
+    columns = {column['name'] for column in inspect(db.engine).get_columns('game_history')}
+    assert {'amount', 'position', 'counterparty_id', 'ref_id', 'details'} <= columns
+    assert db.session.get(Game, 1).status == 'finished'
+    assert db.session.get(Trade, 1).status == 'rejected'
+    assert db.session.get(Auction, 1).status == 'completed'
+    events = GameHistory.query.order_by(GameHistory.id).all()
+    assert [event.action for event in events] == ['game_started', 'passed_go', 'auction_started', 'card_drawn']
+    assert events[1].amount == 200 and events[1].note is None
+    assert events[2].position == 39
+    assert events[3].details == 'Bank error in your favor'
+
+    result = app.test_cli_runner().invoke(args=['schema', 'typed-events'])
+    assert 'already typed' in result.output
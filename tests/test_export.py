@@ -0,0 +1,63 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+from export import history_batches
+from models import GameHistory
+
+
+def test_ndjson_export_of_one_game(client, register, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    started_game('carol', 'dave')
+    _, operator = register('operator')
+
+    response = client.get(f'/history/export?game_id={game_id}', headers=operator)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert rows and all(row['game_id'] == game_id for row in rows)
+    assert 'game_started' in [row['action'] for row in rows]
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+
+
+def test_gzipped_csv_export(client, register, started_game):
+    started_game('alice', 'bob')
+    _, operator = register('operator')
+
+    response = client.get('/history/export?format=csv&gzip=true', headers=operator)
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=history.csv.gz'
+    rows = list(csv.reader(StringIO(gzip.decompress(response.data).decode())))
+    assert rows[0][:4] == ['id', 'game_id', 'player_id', 'action']
+    assert len(rows) - 1 == GameHistory.query.count()
+
+
+def test_export_rejects_bad_requests(client, register):
+    _, alice = register('alice')
+    _, operator = register('operator')
+    assert client.get('/history/export', headers=alice).status_code == 403
+    assert client.get('/history/export?format=xml', headers=operator).status_code == 400
+    assert client.get('/history/export?from=yesterday', headers=operator).status_code == 400
+
+
+def test_batches_cover_every_row_once(app, started_game):
+    started_game('alice', 'bob')
+    started_game('carol', 'dave')
+    batches = list(history_batches(batch_size=2))
+    assert all(len(rows) <= 2 for rows in batches)
+    ids = [row.id for rows in batches for row in rows]
+    assert ids == [row.id for row in GameHistory.query.order_by(GameHistory.id)]
+    assert list(history_batches(start=batches[-1][-1].created_at.replace(year=3000))) == []
+
+
+def test_cli_export_to_file(app, started_game, tmp_path):
+    game_id, _ = started_game('alice', 'bob')
+    output = tmp_path / 'history.ndjson'
+    result = app.test_cli_runner().invoke(args=['history', 'export', '--game', str(game_id), '-o', str(output)])
+    assert result.exit_code == 0, result.output
+    lines = output.read_text().splitlines()
+    assert len(lines) == GameHistory.query.filter_by(game_id=game_id).count()
+
+    result = app.test_cli_runner().invoke(args=['history', 'export', '--from', 'not-a-date'])
+    assert result.exit_code != 0
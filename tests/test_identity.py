@@ -0,0 +1,6 @@
+def test_players_act_as_themselves(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    # Tokens carry the user id as a string; a str/int mismatch answered 403
+    response = client.post(f'/games/{game_id}/jail/pay', headers=headers[0])
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Not in jail'
@@ -0,0 +1,63 @@
+from leaderboard import Leaderboard, leaderboard
+from models import db, Player
+
+
+def test_finished_game_reranks_players(client, started_game):
+    game_id, headers = started_game('alice', 'bob', 'carol')
+    winner = Player.query.filter_by(game_id=game_id, username='bob').one()
+    winner.balance = 5000
+    db.session.commit()
+
+    response = client.post(f'/games/{game_id}/end', headers=headers[0])
+    assert response.status_code == 200
+
+    top = client.get('/leaderboard?limit=2').get_json()
+    assert [entry['username'] for entry in top] == ['bob', 'alice']
+    assert (top[0]['games_played'], top[0]['games_won'], top[0]['rank']) == (1, 1, 1)
+    # Users with the same record share a rank
+    assert top[1]['rank'] == 2
+    rank = client.get(f'/users/{top[1]["user_id"]}/rank').get_json()
+    assert rank['rank'] == 2 and rank['total_users'] == 3
+
+
+def test_snapshot_catches_up_with_new_users(app, client, register):
+    register('alice')
+    leaderboard.rank(1)
+    leaderboard.maybe_persist()
+    register('bob')
+
+    restored = Leaderboard()
+    restored.init_app(app)
+    assert restored.rank(2)['username'] == 'bob'
+    assert restored.rank(1)['total_users'] == 2
+
+
+def test_ending_a_game_twice_counts_it_once(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    assert client.post(f'/games/{game_id}/end', headers=headers[0]).status_code == 200
+    response = client.post(f'/games/{game_id}/end', headers=headers[0])
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Game already finished'
+    assert [entry['games_played'] for entry in client.get('/leaderboard').get_json()] == [1, 1]
+
+
+def test_renames_and_deletions_reach_the_snapshot(app, client, register):
+    leaderboard._persist_interval = 0.2
+    register('alice')
+    register('bob')
+    leaderboard._timer.join()
+
+    assert client.put('/users/1', json={'username': 'alicia'}).status_code == 200
+    assert client.delete('/users/2').status_code == 200
+    # Written by the timer, without another game ending
+    leaderboard._timer.join()
+
+    restored = Leaderboard()
+    restored.init_app(app)
+    assert restored.rank(1)['username'] == 'alicia'
+    assert restored.rank(1)['total_users'] == 1
+    assert restored.rank(2) is None
+
+
+def test_unknown_user_has_no_rank(client):
+    assert client.get('/users/99/rank').status_code == 404
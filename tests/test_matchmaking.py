@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from matchmaking import MatchmakingQueue, matchmaking
+from models import db, Game, MatchmakingTicket, Player, Property, User
+
+
+def test_full_table_starts_a_game(client, register):
+    _, alice = register('alice')
+    _, bob = register('bob')
+
+    first = client.post('/matchmaking/queue?max_players=2', headers=alice)
+    assert first.status_code == 202
+    assert first.get_json() == {'status': 'queued', 'max_players': 2, 'position': 1, 'waiting': 1}
+
+    second = client.post('/matchmaking/queue?max_players=2', headers=bob)
+    assert second.status_code == 201
+    game_id = second.get_json()['game_id']
+    assert client.get('/matchmaking/queue', headers=alice).get_json()['game_id'] == game_id
+
+    game = db.session.get(Game, game_id)
+    assert game.status == 'active'
+    assert [player.username for player in Player.query.filter_by(game_id=game_id).order_by(Player.id)] == ['alice', 'bob']
+    assert game.current_player_id == Player.query.filter_by(game_id=game_id, username='alice').one().id
+    assert Property.query.filter_by(game_id=game_id).count() == 40
+
+
+def test_timed_out_bucket_starts_a_short_table(client, register):
+    _, alice = register('alice')
+    _, bob = register('bob')
+    client.post('/matchmaking/queue?max_players=4', headers=alice)
+    client.post('/matchmaking/queue?max_players=4', headers=bob)
+    assert client.get('/matchmaking/queue', headers=alice).get_json()['status'] == 'queued'
+
+    matchmaking.max_wait = 0
+    result = client.get('/matchmaking/queue', headers=alice).get_json()
+    assert result['status'] == 'matched'
+    assert Player.query.filter_by(game_id=result['game_id']).count() == 2
+
+
+def test_table_short_of_deleted_users_keeps_waiting(client, register):
+    alice_id, alice = register('alice')
+    bob_id, bob = register('bob')
+    client.post('/matchmaking/queue?max_players=3', headers=alice)
+    client.post('/matchmaking/queue?max_players=3', headers=bob)
+    db.session.delete(db.session.get(User, bob_id))
+    db.session.commit()
+
+    matchmaking.max_wait = 0
+    result = client.get('/matchmaking/queue', headers=alice).get_json()
+    assert result == {'status': 'queued', 'max_players': 3, 'position': 1, 'waiting': 1}
+    assert Game.query.count() == 0
+
+
+def test_leave_queue(client, register):
+    _, alice = register('alice')
+    client.post('/matchmaking/queue?max_players=2', headers=alice)
+    assert client.delete('/matchmaking/queue', headers=alice).status_code == 200
+    assert client.delete('/matchmaking/queue', headers=alice).status_code == 404
+    assert client.get('/matchmaking/queue', headers=alice).status_code == 404
+
+
+def test_queue_is_shared_between_workers(app, client, register):
+    _, alice = register('alice')
+    bob_id, _ = register('bob')
+    client.post('/matchmaking/queue?max_players=2', headers=alice)
+
+    # Another worker's queue object sees alice and seats bob with her
+    other = MatchmakingQueue()
+    other.init_app(app)
+    result = other.enqueue(bob_id, 2)
+    assert result['status'] == 'matched'
+    assert client.get('/matchmaking/queue', headers=alice).get_json()['game_id'] == result['game_id']
+
+
+def test_unclaimed_assignments_expire(client, register):
+    _, alice = register('alice')
+    _, bob = register('bob')
+    client.post('/matchmaking/queue?max_players=2', headers=alice)
+    assert client.post('/matchmaking/queue?max_players=2', headers=bob).status_code == 201
+
+    ticket = MatchmakingTicket.query.one()
+    ticket.assigned_at -= timedelta(seconds=matchmaking.assignment_ttl + 1)
+    db.session.commit()
+    assert client.get('/matchmaking/queue', headers=alice).status_code == 404
+    # Queueing again starts afresh instead of returning the stale game
+    assert client.post('/matchmaking/queue?max_players=2', headers=alice).status_code == 202
+    assert MatchmakingTicket.query.filter(MatchmakingTicket.game_id.isnot(None)).count() == 0
@@ -0,0 +1,52 @@
+import pytest
+
+from profiler import profiler
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    directory = tmp_path / 'profiles'
+    monkeypatch.setattr(profiler, 'directory', str(directory))
+    return directory
+
+
+def test_operator_header_writes_profile(client, register, profiles):
+    _, operator = register('operator')
+    response = client.get('/users', headers={**operator, 'X-Profile': '1', 'X-Request-ID': 'abc-123'})
+    assert response.status_code == 200
+    profile_id = response.headers['X-Profile-Id']
+    assert '_abc-123_' in profile_id
+
+    listed = client.get('/admin/profiles', headers=operator).get_json()
+    assert [profile['id'] for profile in listed] == [profile_id]
+    assert listed[0]['request_id'] == 'abc-123'
+
+    text = client.get(f'/admin/profiles/{profile_id}?format=text', headers=operator)
+    assert text.status_code == 200
+    assert b'function calls' in text.data
+    download = client.get(f'/admin/profiles/{profile_id}', headers=operator)
+    assert download.status_code == 200
+    assert download.mimetype == 'application/octet-stream'
+
+
+def test_header_ignored_for_other_users(client, register, profiles):
+    _, alice = register('alice')
+    response = client.get('/users', headers={**alice, 'X-Profile': '1'})
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert not profiles.exists()
+    assert client.get('/admin/profiles', headers=alice).status_code == 403
+
+
+def test_sampling_and_pruning(client, profiles, monkeypatch):
+    monkeypatch.setattr(profiler, 'sample_rate', 1.0)
+    monkeypatch.setattr(profiler, 'keep', 2)
+    for _ in range(4):
+        assert 'X-Profile-Id' in client.get('/users').headers
+    assert len(list(profiles.iterdir())) == 2
+
+
+def test_unknown_profile_is_404(client, register, profiles):
+    _, operator = register('operator')
+    assert client.get('/admin/profiles/nope', headers=operator).status_code == 404
+    assert client.get('/admin/profiles/1_x_y_2', headers=operator).status_code == 404
@@ -0,0 +1,44 @@
+from sqlalchemy import inspect
+
+from models import db, BoardSquare, Property
+
+
+def test_static_fields_come_from_the_catalog(client, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    boardwalk = Property.query.filter_by(game_id=game_id, position=39).one()
+    assert (boardwalk.name, boardwalk.price, boardwalk.color_group) == ('Boardwalk', 400, 'dark blue')
+    assert db.session.get(BoardSquare, 39).name == 'Boardwalk'
+
+
+def test_normalize_properties_slims_a_legacy_table(app):
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('DROP TABLE property')
+        connection.exec_driver_sql(
+            'CREATE TABLE property (id INTEGER PRIMARY KEY, game_id INTEGER, name VARCHAR(100), '
+            'position INTEGER, price INTEGER, owner_id INTEGER, is_mortgaged BOOLEAN, houses INTEGER)'
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO property VALUES (1, 7, 'Boardwalk', 39, 400, 3, 1, 2), (2, 7, 'Go', 0, 0, NULL, 0, 0)"
+        )
+
+    result = app.test_cli_runner().invoke(args=['schema', 'normalize-properties'])
+    assert result.exit_code == 0, result.output
+    assert 'Moved 2 property rows' in result.output
+
+    columns = {column['name'] for column in inspect(db.engine).get_columns('property')}
+    assert columns == {'id', 'game_id', 'owner_id', 'position', 'is_mortgaged', 'houses'}
+    boardwalk = db.session.get(Property, 1)
+    assert (boardwalk.owner_id, boardwalk.is_mortgaged, boardwalk.houses, boardwalk.name) == (3, True, 2, 'Boardwalk')
+
+    result = app.test_cli_runner().invoke(args=['schema', 'normalize-properties'])
+    assert 'already normalized' in result.output
+
+
+def test_in_place_conversions_are_refused_off_sqlite(app, monkeypatch):
+    monkeypatch.setattr(db.engine.dialect, 'name', 'postgresql')
+    for command in ('normalize-properties', 'typed-events'):
+        result = app.test_cli_runner().invoke(args=['schema', command])
+        assert result.exit_code != 0
+        assert 'Only SQLite databases' in result.output
+    monkeypatch.undo()
+    assert 'property' in inspect(db.engine).get_table_names()
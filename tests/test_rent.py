@@ -0,0 +1,32 @@
+from models import db, Player, Property
+from rent import lookup
+
+
+def test_street_rent_doubles_with_the_full_set():
+    assert lookup(1, 0, False, 1) == 2
+    assert lookup(1, 0, True, 2) == 4
+    assert lookup(39, 3, True, 2) == 1400
+
+
+def test_railroad_rent_grows_with_railroads_owned():
+    assert [lookup(5, 0, False, owned) for owned in (1, 2, 3)] == [25, 50, 100]
+    assert lookup(5, 0, True, 4) == 200
+
+
+def test_utility_rent_multiplies_the_dice():
+    assert lookup(12, 0, False, 1, dice_total=8) == 32
+    assert lookup(12, 0, True, 2, dice_total=8) == 80
+
+
+def test_rent_map_of_a_game(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    alice = Player.query.filter_by(game_id=game_id, username='alice').one()
+    for prop in Property.query.filter(Property.game_id == game_id, Property.position.in_([1, 3, 12])):
+        prop.owner_id = alice.id
+    db.session.commit()
+
+    response = client.get(f'/games/{game_id}/rents?dice=6', headers=headers[0]).get_json()
+    assert response['dice'] == 6
+    rents = response['rents']
+    assert (rents[1], rents[3], rents[12], rents[39]) == (4, 8, 24, 0)
+    assert client.get(f'/games/{game_id}/rents?dice=13', headers=headers[0]).status_code == 400
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db, Game, GameHistory, Player
+from scheduler import TimerWheel, scheduler
+from timeouts import expire_idle_game, expire_lobby, expire_turn
+
+
+def test_wheel_fires_timers_when_due():
+    wheel = TimerWheel(tick=1.0, slots=4)
+    fired = []
+    start = wheel._current_tick
+    wheel.schedule('soon', 2, fired.append, 'soon')
+    # Longer than one turn of the wheel
+    wheel.schedule('later', 10, fired.append, 'later')
+
+    assert wheel.advance(start + 1) == []
+    assert [key for key, *_ in wheel.advance(start + 3)] == ['soon']
+    assert [key for key, *_ in wheel.advance(start + 11)] == ['later']
+    assert len(wheel) == 0
+
+
+def test_wheel_reschedule_replaces_and_cancel_removes():
+    wheel = TimerWheel(tick=1.0)
+    fired = []
+    start = wheel._current_tick
+    wheel.schedule('turn', 2, fired.append, 2)
+    wheel.schedule('turn', 5, fired.append, 5)
+    assert len(wheel) == 1
+    assert wheel.advance(start + 3) == []
+    assert wheel.cancel('turn')
+    assert not wheel.cancel('turn')
+    assert wheel.advance(start + 10) == []
+
+
+def test_started_game_arms_turn_timer(client, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    assert ('turn', game_id) in scheduler.wheel._timers
+    assert ('idle', game_id) in scheduler.wheel._timers
+
+
+def test_matchmade_game_arms_turn_and_idle_timers(client, register):
+    _, alice = register('alice')
+    _, bob = register('bob')
+    client.post('/matchmaking/queue?max_players=2', headers=alice)
+    game_id = client.post('/matchmaking/queue?max_players=2', headers=bob).get_json()['game_id']
+    assert ('turn', game_id) in scheduler.wheel._timers
+    assert ('idle', game_id) in scheduler.wheel._timers
+
+
+def test_expired_turn_passes_to_next_player(client, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    game = db.session.get(Game, game_id)
+    first = game.current_player_id
+
+    expire_turn(game_id, first)
+    assert game.current_player_id != first
+    assert GameHistory.query.filter_by(game_id=game_id, action='turn_timed_out').count() == 1
+
+    # A stale timer for a player whose turn is over does nothing
+    second = game.current_player_id
+    expire_turn(game_id, first)
+    assert game.current_player_id == second
+
+
+def test_stale_turn_timer_follows_a_turn_changed_elsewhere(client, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    game = db.session.get(Game, game_id)
+    first = game.current_player_id
+    # As if another worker, without a scheduler, passed the turn on
+    game.current_player_id = Player.query.filter(Player.game_id == game_id, Player.id != first).one().id
+    db.session.commit()
+    scheduler.cancel(('turn', game_id))
+
+    expire_turn(game_id, first)
+    assert game.current_player_id != first
+    wheel = scheduler.wheel
+    rounds, callback, args = wheel._slots[wheel._timers[('turn', game_id)]][('turn', game_id)]
+    assert args == (game_id, game.current_player_id)
+
+
+def test_idle_timer_rechecks_activity_recorded_elsewhere(client, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    game = db.session.get(Game, game_id)
+    scheduler.cancel(('idle', game_id))
+
+    # Activity seen by another worker only reaches the database
+    game.last_activity_at = datetime.utcnow()
+    db.session.commit()
+    expire_idle_game(game_id)
+    assert game.status == 'active'
+    assert ('idle', game_id) in scheduler.wheel._timers
+
+    game.last_activity_at = datetime.utcnow() - timedelta(seconds=current_app.config['GAME_IDLE_TIMEOUT'] + 1)
+    db.session.commit()
+    expire_idle_game(game_id)
+    assert game.status == 'finished'
+
+
+def test_expired_lobby_is_removed(client, register):
+    _, alice = register('alice')
+    game_id = client.post('/games/create', headers=alice).get_json()['game_id']
+    assert ('lobby', game_id) in scheduler.wheel._timers
+    expire_lobby(game_id)
+    assert db.session.get(Game, game_id) is None
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(flight, key, func, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, func))
+        except Exception as error:
+            errors.append(error)
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    release = threading.Event()
+    computed = []
+
+    def compute():
+        computed.append(1)
+        release.wait(5)
+        return b'state'
+    threads, results, errors = run_concurrently(flight, 'state:1:0', compute, 8)
+    while flight.stats()['leaders'] + flight.stats()['shared'] < 8:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b'state'] * 8 and not errors
+    assert len(computed) == 1
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'shared': 7}
+
+
+def test_errors_reach_every_waiting_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise KeyError('gone')
+    threads, results, errors = run_concurrently(flight, 'state:1:0', compute, 3)
+    while flight.stats()['leaders'] + flight.stats()['shared'] < 3:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [] and len(errors) == 3
+
+    # The failed call is forgotten, so the next caller computes again
+    assert flight.do('state:1:0', lambda: b'again') == b'again'
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do('c', lambda: int('x'))
+    assert flight.stats()['leaders'] == 3
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from slowlog import logger, slow_request_log
+
+
+@pytest.fixture
+def slow_log(app, tmp_path):
+    """Log every request of ``app``; returns a function reading the logged lines."""
+    path = tmp_path / 'slow.log'
+    app.config.update({'SLOW_REQUEST_THRESHOLD': 0, 'SLOW_REQUEST_LOG': str(path)})
+    handlers = list(logger.handlers)
+    slow_request_log.init_app(app)
+    yield lambda: [json.loads(line) for line in path.read_text().splitlines()]
+    for handler in logger.handlers[len(handlers):]:
+        handler.close()
+        logger.removeHandler(handler)
+    slow_request_log.__init__()
+
+
+def test_parameters_are_logged_as_types(client, slow_log):
+    client.post('/users/register', json={'username': 'alice', 'password': 'hunter2'})
+    entry = slow_log()[-1]
+    assert entry['endpoint'] == 'api.register'
+    assert entry['statements_dropped'] == 0
+    insert = next(s for s in entry['statements'] if s['sql'].startswith('INSERT INTO user'))
+    assert 'str' in insert['params']
+    assert 'alice' not in json.dumps(entry)
+    assert all('raw_params' not in s for s in entry['statements'])
+
+
+def test_parameters_logged_when_enabled(client, slow_log):
+    slow_request_log.log_params = True
+    client.post('/users/register', json={'username': 'alice', 'password': 'hunter2'})
+    assert 'alice' in json.dumps(slow_log()[-1])
+
+
+def test_statements_past_the_cap_are_counted(client, register, slow_log):
+    _, alice = register('alice')
+    slow_request_log.max_statements = 1
+    client.post('/games/create', headers=alice)
+    entry = slow_log()[-1]
+    assert len(entry['statements']) == 1
+    assert entry['statements_dropped'] >= 1
+    assert entry['sql_ms'] >= entry['statements'][0]['duration_ms']
+
+
+def test_slowest_select_is_explained(client, register, slow_log):
+    register('alice')
+    entry = slow_log()[-1]
+    assert entry['endpoint'] == 'api.login'
+    assert 'SEARCH user' in entry['statements'][0]['plan'][0]
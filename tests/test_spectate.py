@@ -0,0 +1,67 @@
+import pytest
+
+from cache import cache
+from models import db, Player
+from spectate import Subscriber, spectators
+
+
+@pytest.fixture
+def watch(app, monkeypatch):
+    """Spectators without the background publisher; tests call poll() themselves."""
+    monkeypatch.setattr(spectators, '_start', lambda: None)
+    return spectators
+
+
+def test_slow_subscriber_drops_oldest_frames():
+    subscriber = Subscriber(2)
+    for frame in (b'1', b'2', b'3'):
+        subscriber.push(frame)
+    assert subscriber.dropped == 1
+    assert subscriber.pull(0) == [b'2', b'3']
+    assert subscriber.pull(0) == []
+
+
+def test_subscribers_share_one_frame_per_version(watch, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    first = watch.subscribe(game_id)
+    second = watch.subscribe(game_id)
+    assert watch.published == 1
+    [frame] = first.pull(0)
+    assert second.pull(0) == [frame]
+    assert frame.startswith(b'id: %d\nevent: state\n' % cache.versions([f'game:{game_id}'])[0])
+
+    # Unchanged versions are not published again
+    watch.poll()
+    assert watch.published == 1 and first.pull(0) == []
+
+    player = Player.query.filter_by(game_id=game_id, username='alice').one()
+    player.balance -= 100
+    db.session.commit()
+    watch.poll()
+    assert watch.published == 2
+    assert len(first.pull(0)) == len(second.pull(0)) == 1
+    assert watch.stats() == {'games': 1, 'spectators': 2, 'published': 2}
+
+
+def test_last_spectator_closes_the_channel(watch, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    subscriber = watch.subscribe(game_id)
+    watch.unsubscribe(game_id, subscriber)
+    assert watch.stats()['games'] == 0
+
+
+def test_unknown_game_has_no_channel(watch):
+    assert watch.subscribe(999) is None
+    assert watch.stats()['games'] == 0
+
+
+def test_spectate_streams_server_sent_events(client, watch, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    response = client.get(f'/games/{game_id}/spectate', headers=headers[0], buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert next(response.response).startswith(b'id: ')
+    response.close()
+    assert watch.stats()['spectators'] == 0
+
+    assert client.get('/games/999/spectate', headers=headers[0]).status_code == 404
@@ -0,0 +1,31 @@
+import json
+
+from board import BOARD_VERSION
+
+
+def test_board_is_served_once_with_an_etag(client):
+    response = client.get('/board')
+    assert response.status_code == 200
+    board = response.get_json()
+    assert board['version'] == BOARD_VERSION
+    assert len(board['properties']) == 40
+    assert response.cache_control.immutable
+
+    cached = client.get('/board', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+
+
+def test_game_state_only_carries_dynamic_fields(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    state = json.loads(client.get(f'/games/{game_id}', headers=headers[0]).data)
+
+    assert state['board_version'] == BOARD_VERSION
+    assert state['status'] == 'active'
+    assert [player['username'] for player in state['players']] == ['alice', 'bob']
+    assert len(state['properties']) == 40
+    assert set(state['properties'][0]) == {'id', 'position', 'owner_id', 'is_mortgaged', 'houses'}
+
+
+def test_game_state_of_missing_game(client, register):
+    _, headers = register('alice')
+    assert client.get('/games/404', headers=headers).status_code == 404
@@ -0,0 +1,83 @@
+import threading
+
+import rules
+from models import db, Game, Player, PlayerStats
+from stats import count, game_stats
+
+
+def players(game_id):
+    return {player.username: player for player in Player.query.filter_by(game_id=game_id)}
+
+
+def to_play(game_id, headers):
+    """Auth headers of the player whose turn it is (alice or bob)."""
+    current = db.session.get(Player, db.session.get(Game, game_id).current_player_id)
+    return headers[0] if current.username == 'alice' else headers[1], current
+
+
+def test_rolls_count_turns_doubles_and_landings(client, started_game, monkeypatch):
+    game_id, headers = started_game('alice', 'bob')
+    auth, player = to_play(game_id, headers)
+    rolls = iter([2, 2, 1, 2])
+    monkeypatch.setattr(rules.random, 'randint', lambda low, high: next(rolls))
+
+    # A double keeps the turn, then a 3 ends it
+    assert client.post(f'/games/{game_id}/roll', headers=auth).status_code == 200
+    assert client.post(f'/games/{game_id}/roll', headers=auth).status_code == 200
+
+    stats = client.get(f'/games/{game_id}/stats', headers=auth).get_json()
+    assert stats['turns'] == 1
+    assert stats['landings'][4] == 1 and stats['landings'][7] == 1
+    [mine] = [p for p in stats['players'] if p['player_id'] == player.id]
+    assert (mine['turns'], mine['doubles']) == (1, 1)
+
+
+def test_jail_fine_is_counted_in_dollars(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    alice = players(game_id)['alice']
+    alice.in_jail = True
+    db.session.commit()
+
+    assert client.post(f'/games/{game_id}/jail/pay', headers=headers[0]).status_code == 200
+    stats = client.get(f'/games/{game_id}/stats', headers=headers[0]).get_json()
+    [row] = [p for p in stats['players'] if p['player_id'] == alice.id]
+    assert row['jail_fines_paid'] == 50
+
+
+def test_unknown_game_is_404(client, register):
+    _, alice = register('alice')
+    assert client.get('/games/999/stats', headers=alice).status_code == 404
+
+
+def test_zero_counters_write_nothing(app, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    count(game_id, players(game_id)['alice'].id, turns=0)
+    db.session.commit()
+    assert PlayerStats.query.filter_by(game_id=game_id).count() == 0
+    assert game_stats(game_id)['players'] == []
+
+
+def test_concurrent_counts_are_not_lost(app, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    player_id = players(game_id)['alice'].id
+    errors = []
+
+    def work():
+        try:
+            with app.app_context():
+                for _ in range(20):
+                    count(game_id, player_id, landed=0, rent_paid=10)
+                    db.session.commit()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    stats = game_stats(game_id)
+    assert stats['landings'][0] == 160
+    assert stats['players'][0]['rent_paid'] == 1600
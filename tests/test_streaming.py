@@ -0,0 +1,66 @@
+from flask import json
+from sqlalchemy import event
+
+from main import stream_json_array
+from models import db, Player, Property, User
+
+
+def test_users_are_streamed_as_one_array(client, register):
+    for name in ('alice', 'bob', 'carol'):
+        register(name)
+    response = client.get('/users')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert [user['username'] for user in response.get_json()] == ['alice', 'bob', 'carol']
+    assert set(response.get_json()[0]) == {'id', 'username', 'games_played', 'games_won'}
+
+
+def test_empty_table_is_an_empty_array(client):
+    assert client.get('/users').get_json() == []
+    assert client.get('/games').get_json() == []
+
+
+def test_games_are_streamed_and_filtered(client, register, started_game):
+    game_id, _ = started_game('alice', 'bob')
+    _, carol = register('carol')
+    waiting_id = client.post('/games/create', headers=carol).get_json()['game_id']
+
+    games = client.get('/games').get_json()
+    assert [game['id'] for game in games] == [game_id, waiting_id]
+    assert [p['username'] for p in games[0]['players']] == ['alice', 'bob']
+    assert [game['id'] for game in client.get('/games?status=waiting').get_json()] == [waiting_id]
+    assert client.get('/games?status=bogus').get_json() == []
+
+
+def test_rows_are_fetched_in_chunks(app, register):
+    for name in ('alice', 'bob', 'carol'):
+        register(name)
+    with app.test_request_context():
+        response = stream_json_array(User.query.order_by(User.id), lambda user: user.username, chunk_size=2)
+        body = ''.join(chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in response.response)
+    assert json.loads(body) == ['alice', 'bob', 'carol']
+
+
+def test_placements_of_finished_games_are_loaded_per_chunk(client, started_game):
+    games = [started_game(*names) for names in (('alice', 'bob'), ('carol', 'dave'), ('erin', 'frank'))]
+    for game_id, headers in games:
+        second = Player.query.filter_by(game_id=game_id).order_by(Player.id.desc()).first()
+        Property.query.filter_by(game_id=game_id, position=39).one().owner_id = second.id
+        db.session.commit()
+        assert client.post(f'/games/{game_id}/end', headers=headers[0]).status_code == 200
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        summaries = client.get('/games?status=finished').get_json()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert len(summaries) == 3
+    for summary in summaries:
+        # Owning Boardwalk puts the second player first
+        assert [p['placement'] for p in summary['placements']] == [1, 2]
+        second = max(p['player_id'] for p in summary['placements'])
+        assert summary['placements'][0]['player_id'] == second
+    assert sum('FROM property' in statement for statement in statements) == 1
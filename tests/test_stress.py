@@ -0,0 +1,41 @@
+import importlib.util
+import os
+import random
+
+import pytest
+
+from models import db, Game, Player
+
+STRESS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'benchmarks', 'stress.py')
+
+
+@pytest.fixture(scope='module')
+def stress():
+    spec = importlib.util.spec_from_file_location('stress', STRESS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_scenarios_run_and_report(app, stress):
+    random.seed(1)
+    for name, scenario in stress.SCENARIOS.items():
+        results, violations, seconds = scenario(app, 4)
+        assert len(results) >= 4, name
+        assert all(isinstance(status, int) for status, _ in results), name
+        assert seconds > 0
+
+
+def test_racing_bids_and_end_keep_the_auction_consistent(app, stress):
+    random.seed(2)
+    for _ in range(3):
+        _, violations, _ = stress.scenario_auction(app, 8)
+        assert violations == []
+
+
+def test_check_turn_flags_a_bankrupt_turn_holder(app, stress):
+    rnd = stress.Round(app, 2)
+    game = db.session.get(Game, rnd.game_id)
+    db.session.get(Player, game.current_player_id).is_bankrupt = True
+    db.session.commit()
+    assert stress.check_turn(rnd.game_id) == [f'game {rnd.game_id}: turn held by invalid player {game.current_player_id}']
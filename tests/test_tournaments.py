@@ -0,0 +1,79 @@
+import pytest
+
+from models import db, Game, GameHistory, Property, TournamentRound
+from scheduler import scheduler
+
+
+@pytest.fixture
+def tournament(client, register):
+    """A tournament and four players; returns (tournament_id, operator headers, user ids)."""
+    _, operator = register('operator')
+    user_ids = [register(name)[0] for name in ('alice', 'bob', 'carol', 'dave')]
+    response = client.post('/tournaments', headers=operator, json={'name': 'Spring cup'})
+    assert response.status_code == 201
+    return response.get_json()['tournament_id'], operator, user_ids
+
+
+def start_round(client, tournament, **body):
+    tournament_id, operator, user_ids = tournament
+    body.setdefault('tables', [user_ids[:2], user_ids[2:]])
+    return client.post(f'/tournaments/{tournament_id}/rounds', headers=operator, json=body)
+
+
+def test_round_starts_every_table(client, tournament):
+    response = start_round(client, tournament)
+    assert response.status_code == 201
+    result = response.get_json()
+    assert result['round'] == 1 and len(result['games']) == 2
+
+    for table in result['games']:
+        game = db.session.get(Game, table['game_id'])
+        assert (game.status, game.tournament_id, game.round) == ('active', tournament[0], 1)
+        assert game.current_player_id == table['player_ids'][0]
+        assert Property.query.filter_by(game_id=game.id).count() == 40
+        assert GameHistory.query.filter_by(game_id=game.id, action='game_started').count() == 1
+        assert ('turn', game.id) in scheduler.wheel._timers
+        assert ('idle', game.id) in scheduler.wheel._timers
+
+
+def test_rounds_are_numbered_and_started_once(client, tournament):
+    assert start_round(client, tournament).get_json()['round'] == 1
+    assert start_round(client, tournament).get_json()['round'] == 2
+
+    response = start_round(client, tournament, round=1)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Round 1 already started'
+    assert TournamentRound.query.filter_by(tournament_id=tournament[0]).count() == 2
+    assert Game.query.filter_by(tournament_id=tournament[0]).count() == 4
+
+
+@pytest.mark.parametrize('body', [
+    {'round': True},
+    {'round': 0},
+    {'round': 32768},
+    {'max_players': True},
+    {'max_players': 9},
+    {'tables': [[True, 2]]},
+    {'tables': []},
+    {'tables': [[1]]},
+    {'tables': [[2, 3], [3, 4]]},
+    {'tables': [[2, 999]]},
+])
+def test_invalid_plans_are_rejected(client, tournament, body):
+    assert start_round(client, tournament, **body).status_code == 400
+    assert Game.query.count() == 0
+
+
+def test_round_cap_is_accepted(client, tournament):
+    assert start_round(client, tournament, round=32767).status_code == 201
+
+
+def test_unknown_tournament_and_non_operators(client, tournament, register):
+    _, operator, user_ids = tournament
+    response = client.post('/tournaments/999/rounds', headers=operator, json={'tables': [user_ids[:2]]})
+    assert response.status_code == 404
+
+    _, eve = register('eve')
+    assert client.post('/tournaments', headers=eve, json={'name': 'Mine'}).status_code == 403
+    response = client.post(f'/tournaments/{tournament[0]}/rounds', headers=eve, json={'tables': [user_ids[:2]]})
+    assert response.status_code == 403
@@ -0,0 +1,102 @@
+import pytest
+
+from cache import cache
+from models import db, Player, Property, Trade
+from trades import trade_index
+
+
+@pytest.fixture
+def table(client, started_game):
+    """Three players; alice owns Boardwalk. Returns (game_id, {name: player id}, {name: headers}, boardwalk id)."""
+    game_id, headers = started_game('alice', 'bob', 'carol')
+    players = {player.username: player.id for player in Player.query.filter_by(game_id=game_id)}
+    boardwalk = Property.query.filter_by(game_id=game_id, position=39).one()
+    boardwalk.owner_id = players['alice']
+    db.session.commit()
+    return game_id, players, dict(zip(['alice', 'bob', 'carol'], headers)), boardwalk.id
+
+
+def offer(client, table, receiver, price):
+    game_id, players, headers, boardwalk = table
+    response = client.post(f'/games/{game_id}/trade', headers=headers['alice'], json={
+        'sender_id': players['alice'],
+        'receiver_id': players[receiver],
+        'offer': [{'type': 'property', 'property_id': boardwalk}],
+        'request': [{'type': 'money', 'amount': price}],
+    })
+    assert response.status_code == 201
+    return response.get_json()['trade_id']
+
+
+def pending(client, table, name):
+    game_id, _, headers, _ = table
+    return [trade['id'] for trade in client.get(f'/games/{game_id}/trades', headers=headers[name]).get_json()]
+
+
+def test_accepting_a_trade_invalidates_competing_offers(client, table):
+    game_id, players, headers, boardwalk = table
+    to_bob = offer(client, table, 'bob', 500)
+    to_carol = offer(client, table, 'carol', 400)
+    assert pending(client, table, 'alice') == [to_bob, to_carol]
+    assert pending(client, table, 'carol') == [to_carol]
+
+    assert client.post(f'/games/{game_id}/trade/{to_bob}/accept', headers=headers['bob']).status_code == 200
+    assert db.session.get(Property, boardwalk).owner_id == players['bob']
+    assert db.session.get(Trade, to_carol).status == 'invalidated'
+    assert pending(client, table, 'carol') == []
+
+    response = client.post(f'/games/{game_id}/trade/{to_carol}/accept', headers=headers['carol'])
+    assert response.status_code == 400
+
+
+def test_rejected_trade_leaves_the_index(client, table):
+    game_id, _, headers, _ = table
+    trade_id = offer(client, table, 'bob', 500)
+    assert client.post(f'/games/{game_id}/trade/{trade_id}/reject', headers=headers['bob']).status_code == 200
+    assert pending(client, table, 'alice') == []
+
+
+def test_index_is_only_changed_by_committed_transactions(client, table):
+    game_id, _, _, boardwalk = table
+    trade_id = offer(client, table, 'bob', 500)
+    trade_index.properties_changed(game_id, [boardwalk])
+    db.session.rollback()
+
+    assert pending(client, table, 'bob') == [trade_id]
+    assert db.session.get(Trade, trade_id).status == 'pending'
+
+
+def test_players_only_list_their_own_trades(client, table):
+    game_id, players, headers, _ = table
+    offer(client, table, 'bob', 500)
+    # The player comes from the token; a player_id parameter is ignored
+    response = client.get(f'/games/{game_id}/trades?player_id={players["bob"]}', headers=headers['carol'])
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_index_reloads_trades_changed_by_another_worker(client, table):
+    game_id, _, headers, _ = table
+    trade_id = offer(client, table, 'bob', 500)
+    assert pending(client, table, 'bob') == [trade_id]
+
+    # Rejected elsewhere: the row and the trades version change, this index does not
+    db.session.get(Trade, trade_id).status = 'rejected'
+    cache.touch(['trades:%d' % game_id])
+    db.session.commit()
+    assert pending(client, table, 'bob') == []
+
+
+def test_other_game_changes_keep_the_index(client, table):
+    game_id, _, headers, _ = table
+    trade_id = offer(client, table, 'bob', 500)
+    assert pending(client, table, 'bob') == [trade_id]
+    loaded = trade_index._games[game_id]
+    # This worker's own trade changes are applied in place
+    second = offer(client, table, 'carol', 400)
+    assert pending(client, table, 'alice') == [trade_id, second]
+    assert trade_index._games[game_id] is loaded
+    # A move bumps the game version but not the trades version
+    assert client.post(f'/games/{game_id}/roll', headers=headers['alice']).status_code == 200
+    assert pending(client, table, 'bob') == [trade_id]
+    assert trade_index._games[game_id] is loaded
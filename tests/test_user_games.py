@@ -0,0 +1,38 @@
+from models import db, Game, Player, User
+
+
+def user_games(client, user_id, headers, **args):
+    response = client.get(f'/users/{user_id}/games', headers=headers, query_string=args)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_games_of_a_user_newest_first(client, started_game):
+    first_id, headers = started_game('alice', 'bob')
+    alice_id = User.query.filter_by(username='alice').one().id
+    second_id = client.post('/games/create', headers=headers[0]).get_json()['game_id']
+
+    games = user_games(client, alice_id, headers[0])
+    assert [game['game_id'] for game in games] == [second_id, first_id]
+    assert games[0]['status'] == 'waiting'
+    assert games[1]['balance'] == 1500 and not games[1]['is_bankrupt']
+    assert games[1]['player_id'] == Player.query.filter_by(game_id=first_id, user_id=alice_id).one().id
+
+    assert [game['game_id'] for game in user_games(client, alice_id, headers[0], active='true')] == [first_id]
+
+
+def test_my_turn_filter(client, started_game):
+    game_id, headers = started_game('alice', 'bob')
+    current = db.session.get(Player, db.session.get(Game, game_id).current_player_id)
+    waiting = 'bob' if current.username == 'alice' else 'alice'
+    current_user, waiting_user = (User.query.filter_by(username=name).one().id for name in (current.username, waiting))
+
+    [mine] = user_games(client, current_user, headers[0], my_turn='true')
+    assert mine['game_id'] == game_id and mine['my_turn']
+    assert user_games(client, waiting_user, headers[0], my_turn='true') == []
+    assert not user_games(client, waiting_user, headers[0])[0]['my_turn']
+
+
+def test_unknown_user_is_404(client, register):
+    _, alice = register('alice')
+    assert client.get('/users/999/games', headers=alice).status_code == 404
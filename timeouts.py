@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from flask import current_app
+
+from auctions import auction_book
+from models import db, Auction, Game, Player
+from rules import record_game_history, advance_turn, finish_game
+from scheduler import scheduler
+
+
+# Functions called with the game whenever a new turn starts
+turn_listeners = []
+
+def on_turn_change(func):
+    turn_listeners.append(func)
+    return func
+
+def schedule_turn_timeout(game):
+    """(Re)start the clock on the current player's turn."""
+    if game.status == 'active' and game.current_player_id:
+        scheduler.schedule(
+            ('turn', game.id), current_app.config['TURN_TIMEOUT'],
+            expire_turn, game.id, game.current_player_id
+        )
+        for listener in turn_listeners:
+            listener(game)
+
+def arm_game_timers(game):
+    """Start the turn and idle clocks of a game changed outside a request.
+
+    Requests get their idle clock pushed back by an after-request hook;
+    matchmaking and bot jobs have no such hook.
+    """
+    schedule_turn_timeout(game)
+    touch_game(game.id)
+
+def touch_game(game_id):
+    """Push back the idle deadline of a game after any activity.
+
+    The time is stored on the game, so activity seen by a worker that does
+    not run the scheduler still keeps the game alive.
+    """
+    Game.query.filter_by(id=game_id).update({'last_activity_at': datetime.utcnow()})
+    db.session.commit()
+    schedule_idle_expiry(game_id)
+
+def schedule_idle_expiry(game_id, delay=None):
+    scheduler.schedule(
+        ('idle', game_id),
+        current_app.config['GAME_IDLE_TIMEOUT'] if delay is None else delay,
+        expire_idle_game, game_id
+    )
+
+def _idle_time_left(game):
+    if game.last_activity_at is None:
+        return 0
+    idle = (datetime.utcnow() - game.last_activity_at).total_seconds()
+    return current_app.config['GAME_IDLE_TIMEOUT'] - idle
+
+def schedule_lobby_expiry(game, delay=None):
+    scheduler.schedule(
+        ('lobby', game.id),
+        current_app.config['LOBBY_TIMEOUT'] if delay is None else delay,
+        expire_lobby, game.id
+    )
+
+def expire_turn(game_id, player_id):
+    game = Game.query.get(game_id)
+    # The game may have ended since the timer was set
+    if not game or game.status != 'active':
+        return
+    if game.current_player_id != player_id:
+        # The player moved on, possibly through another worker that has no
+        # scheduler: start the clock on the turn that is running now. The
+        # worker that changed the turn already told the turn listeners.
+        if game.current_player_id:
+            scheduler.schedule(
+                ('turn', game_id), current_app.config['TURN_TIMEOUT'],
+                expire_turn, game_id, game.current_player_id
+            )
+        return
+    advance_turn(game, player_id)
+    db.session.commit()
+    record_game_history(game_id, player_id, 'turn_timed_out')
+    schedule_turn_timeout(game)
+
+def expire_idle_game(game_id):
+    game = Game.query.get(game_id)
+    if not game or game.status != 'active':
+        return
+    left = _idle_time_left(game)
+    if left > 0:
+        # Activity recorded since the timer was set, maybe by another worker
+        schedule_idle_expiry(game_id, left)
+        return
+    scheduler.cancel(('turn', game_id))
+    finish_game(game)
+
+def expire_lobby(game_id):
+    game = Game.query.get(game_id)
+    if not game or game.status != 'waiting':
+        return
+    Player.query.filter_by(game_id=game_id).delete()
+    db.session.delete(game)
+    db.session.commit()
+
+@scheduler.on_start
+def rearm_timers():
+    """Re-create the timers of open games after a restart."""
+    now = datetime.utcnow()
+    lobby_timeout = current_app.config['LOBBY_TIMEOUT']
+    games = db.session.query(Game).filter(Game.status.in_(['waiting', 'active']))
+    for game in games.yield_per(1000):
+        if game.status == 'waiting':
+            age = (now - game.created_at).total_seconds() if game.created_at else 0
+            schedule_lobby_expiry(game, max(0, lobby_timeout - age))
+        else:
+            schedule_turn_timeout(game)
+            schedule_idle_expiry(game.id, max(0, _idle_time_left(game)))
+    # Bids lived in the old process; open auctions again with a fresh clock
+    for auction in Auction.query.filter_by(status='active'):
+        auction_book.get(auction)
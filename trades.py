@@ -0,0 +1,169 @@
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache import cache
+from models import db, Trade, TradeItem
+
+
+def _trade_entry(trade, items):
+    return {
+        'id': trade.id,
+        'sender_id': trade.sender_id,
+        'receiver_id': trade.receiver_id,
+        'created_at': trade.created_at.isoformat() if trade.created_at else None,
+        'items': [{
+            'type': item.type,
+            'property_id': item.property_id,
+            'amount': item.amount,
+            'from_sender': item.from_sender
+        } for item in items]
+    }
+
+
+class GameTrades:
+    def __init__(self, version):
+        self.version = version  # of the game's trades when loaded
+        self.trades = {}        # trade_id -> entry
+        self.by_property = {}   # property_id -> {trade_id}
+        self.by_player = {}     # player_id -> {trade_id}
+
+    def add(self, entry):
+        self.trades[entry['id']] = entry
+        for player_id in (entry['sender_id'], entry['receiver_id']):
+            self.by_player.setdefault(player_id, set()).add(entry['id'])
+        for item in entry['items']:
+            if item['property_id'] is not None:
+                self.by_property.setdefault(item['property_id'], set()).add(entry['id'])
+
+    def remove(self, trade_id):
+        entry = self.trades.pop(trade_id, None)
+        if entry is None:
+            return None
+        for player_id in (entry['sender_id'], entry['receiver_id']):
+            self.by_player.get(player_id, set()).discard(trade_id)
+        for item in entry['items']:
+            self.by_property.get(item['property_id'], set()).discard(trade_id)
+        return entry
+
+
+class TradeIndex:
+    """Pending trades of each game, indexed by property and by player.
+
+    Ownership changes invalidate the pending trades that involve the
+    property (or a bankrupt player) as they happen, so acceptance never
+    has to discover a stale offer item by item.
+
+    Changes are queued on the session and applied once it commits, so a
+    rolled back transaction never leaves the index ahead of the database.
+    Each commit that changes a game's trades also bumps the ``trades:<id>``
+    cache version, and a game whose version moved past the one the index
+    knows (trades changed by another worker) is reloaded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._games = {}
+
+    def _game(self, game_id):
+        versions = cache.versions(['trades:%d' % game_id])
+        version = versions[0] if versions else None
+        game = self._games.get(game_id)
+        # Without a version (cache down) the index cannot tell, so it reloads
+        if game is None or version is None or game.version != version:
+            game = GameTrades(version)
+            trades = Trade.query.options(db.selectinload(Trade.items)).filter_by(
+                game_id=game_id, status='pending'
+            )
+            for trade in trades:
+                game.add(_trade_entry(trade, trade.items))
+            self._games[game_id] = game
+        return game
+
+    def _queue(self, change):
+        db.session.info.setdefault('trade_changes', []).append(change)
+        cache.touch(['trades:%d' % change[1]])
+
+    def apply(self, changes):
+        """Apply committed changes to the games loaded in this worker."""
+        with self._lock:
+            for kind, game_id, value in changes:
+                game = self._games.get(game_id)
+                if game is None:
+                    continue
+                if kind == 'add':
+                    game.add(value)
+                else:
+                    game.remove(value)
+            # The commit bumped each game's version once
+            for game_id in {game_id for _, game_id, _ in changes}:
+                game = self._games.get(game_id)
+                if game is not None and game.version is not None:
+                    game.version += 1
+
+    def add(self, trade, items):
+        """Index a new trade once the caller's transaction commits."""
+        self._queue(('add', trade.game_id, _trade_entry(trade, items)))
+
+    def remove(self, game_id, trade_id):
+        """Unindex a trade once the caller's transaction commits."""
+        self._queue(('remove', game_id, trade_id))
+
+    def pending_for_player(self, player):
+        """Pending trades sent or received by ``player``, the caller's seat."""
+        with self._lock:
+            game = self._game(player.game_id)
+            return sorted(
+                (game.trades[trade_id] for trade_id in game.by_player.get(player.id, ())),
+                key=lambda entry: entry['id']
+            )
+
+    def _invalidate(self, game_id, trade_ids):
+        # Trades this transaction already closed are not invalidated
+        closed = {value for kind, _, value in db.session.info.get('trade_changes', ()) if kind == 'remove'}
+        trade_ids = sorted(trade_ids - closed)
+        if trade_ids:
+            Trade.query.filter(Trade.id.in_(trade_ids), Trade.status == 'pending').update(
+                {'status': 'invalidated'}, synchronize_session=False
+            )
+            cache.touch(['game:%d' % game_id])
+            for trade_id in trade_ids:
+                self.remove(game_id, trade_id)
+        return trade_ids
+
+    def properties_changed(self, game_id, property_ids):
+        """Invalidate pending trades involving properties that changed hands.
+
+        Runs in the caller's transaction; the caller commits.
+        """
+        with self._lock:
+            game = self._game(game_id)
+            trade_ids = set()
+            for property_id in property_ids:
+                trade_ids |= game.by_property.get(property_id, set())
+        return self._invalidate(game_id, trade_ids)
+
+    def player_left(self, game_id, player_id):
+        """Invalidate every pending trade of a player who went bankrupt."""
+        with self._lock:
+            trade_ids = set(self._game(game_id).by_player.get(player_id, ()))
+        return self._invalidate(game_id, trade_ids)
+
+    def drop_game(self, game_id):
+        with self._lock:
+            self._games.pop(game_id, None)
+
+
+trade_index = TradeIndex()
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop('trade_changes', None)
+    if changes:
+        trade_index.apply(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('trade_changes', None)